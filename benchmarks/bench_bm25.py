@@ -0,0 +1,93 @@
+"""Query latency of scripts.bm25_index vs the previous per-posting Python loop.
+
+Builds a synthetic processed corpus with a Zipf-like vocabulary (so some query
+terms occur in most documents), indexes it, then times a mix of queries.
+
+    python -m benchmarks.bench_bm25 [n_docs]
+"""
+import sys
+import math
+import json
+import time
+import zlib
+import heapq
+import random
+import tempfile
+from array import array
+from itertools import accumulate
+from operator import itemgetter
+from pathlib import Path
+from scripts.bm25_index import update_index, BM25Index, tokenize
+
+COMMON = ["energy", "grid", "power", "market", "wind", "solar", "electricity", "policy"]
+QUERIES = ["energy", "energy grid market", "offshore wind auctions", "solar policy electricity price",
+           "hydrogen electrolyser subsidies", "grid"]
+
+def write_corpus(path, n_docs, seed=0):
+    rng = random.Random(seed)
+    vocab = COMMON + [f"term{i}" for i in range(50_000)] + ["offshore", "auctions", "hydrogen", "electrolyser"]
+    weights = [1.0 / (rank + 1) ** 1.1 for rank in range(len(vocab))]
+    types = ["wikipedia", "news", "arxiv", "government"]
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n_docs):
+            words = rng.choices(vocab, weights, k=rng.randint(40, 120))
+            f.write(json.dumps({"title": f"Document {i}", "url": f"https://example.eu/{i}",
+                                "document_type": types[i % 4], "content": " ".join(words)}) + "\n")
+
+def legacy_search(index, query, k=10, document_type=None):
+    """The previous scoring: a Python loop over every posting of every term."""
+    terms = list(dict.fromkeys(tokenize(query)))
+    type_id = index.doc_types.index(document_type) if document_type else None
+    entries = [[seg.lookup(t) for t in terms] for seg in index.segments]
+    df = [sum(e[i][0] for e in entries if e[i]) for i in range(len(terms))]
+    idf = [math.log(1 + (index.n_docs - d + 0.5) / (d + 0.5)) for d in df]
+    k1, b, avgdl = index.k1, index.b, index.avgdl
+    hits = []
+    for seg, seg_entries in zip(index.segments, entries):
+        scores = {}
+        doclens, doctypes = memoryview(seg.doclens).cast("B").cast("I"), seg.doctypes
+        for i, entry in enumerate(seg_entries):
+            if entry is None:
+                continue
+            n, p_off, p_len = entry
+            raw = zlib.decompress(seg.postings[p_off:p_off + p_len])
+            deltas, tfs = array("I"), array("H")
+            deltas.frombytes(raw[:4 * n])
+            tfs.frombytes(raw[4 * n:])
+            w = idf[i] * (k1 + 1)
+            for doc_id, tf in zip(accumulate(deltas), tfs):
+                if type_id is not None and doctypes[doc_id] != type_id:
+                    continue
+                norm = k1 * (1 - b + b * doclens[doc_id] / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + w * tf / (tf + norm)
+        hits.extend((score, seg, doc_id) for doc_id, score in heapq.nlargest(k, scores.items(), key=itemgetter(1)))
+    return [(round(score, 4), seg.base + doc_id) for score, seg, doc_id in heapq.nlargest(k, hits, key=itemgetter(0))]
+
+def timed(fn, runs=5):
+    fn()  # warm the page cache and per-segment norms
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1e3
+
+def main():
+    n_docs = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        processed, index_dir = Path(tmp) / "processed", Path(tmp) / "index"
+        processed.mkdir()
+        start = time.perf_counter()
+        write_corpus(processed / "corpus.jsonl", n_docs)
+        update_index(processed, index_dir)
+        print(f"{n_docs} documents indexed in {time.perf_counter() - start:.1f}s")
+        index = BM25Index(index_dir)
+        for query, doc_type in [(q, None) for q in QUERIES] + [("energy grid market", "government")]:
+            new = [(round(d["score"], 4)) for d in index.search(query, 10, doc_type)]
+            old = [score for score, _ in legacy_search(index, query, 10, doc_type)]
+            assert [round(x, 3) for x in new] == [round(x, 3) for x in old], query
+            t_new = timed(lambda: index.search(query, 10, doc_type))
+            t_old = timed(lambda: legacy_search(index, query, 10, doc_type), runs=1)
+            label = f"{query!r}" + (f" type={doc_type}" if doc_type else "")
+            print(f"{label:<48} legacy {t_old:9.1f} ms  new {t_new:7.1f} ms  ({t_old / t_new:.0f}x)")
+
+if __name__ == "__main__":
+    main()
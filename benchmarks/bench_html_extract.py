@@ -0,0 +1,53 @@
+"""Throughput of scripts.html_extract vs the previous BeautifulSoup code paths.
+
+    python -m benchmarks.bench_html_extract
+"""
+import re
+import timeit
+from bs4 import BeautifulSoup
+from scripts.html_extract import html_to_text, extract_html
+
+def legacy_strip_html(raw_html):
+    soup = BeautifulSoup(raw_html, "html.parser")
+    for script_or_style in soup(["script", "style"]):
+        script_or_style.decompose()
+    text = soup.get_text(separator=" ")
+    return re.sub(r"\s+", " ", text).strip()
+
+def legacy_page_content(html):
+    # extract_page_content + get_links_from_url parsed every page twice
+    for _ in range(2):
+        soup = BeautifulSoup(html, "html.parser")
+        title = soup.title.string.strip() if soup.title else ""
+        elems = soup.find_all(["p", "h1", "h2", "h3", "li"])
+        text = "\n".join(e.get_text(strip=True) for e in elems if e.get_text(strip=True))
+        links = [a["href"] for a in soup.find_all("a", href=True)]
+    return text, links, title
+
+def sample_page(n_paragraphs):
+    nav = "".join(f'<li><a href="/section-{i}_en">Section {i}</a></li>' for i in range(60))
+    body = "".join(
+        f"<h2>Heading {i}</h2><p>The wholesale <b>electricity</b> market in region {i} "
+        f"saw <a href='/doc-{i}_en.pdf'>new tariffs</a> and grid investments.</p>"
+        for i in range(n_paragraphs))
+    return (f"<html><head><title>Energy</title><style>p{{}}</style></head><body>"
+            f"<nav><ul>{nav}</ul></nav><main>{body}</main><footer>(c) EU</footer></body></html>")
+
+def plain_text(n_paragraphs):
+    return "\n\n".join(f"Paragraph {i} about renewable energy policy in Europe." for i in range(n_paragraphs))
+
+def bench(label, legacy, new, runs):
+    t_legacy = min(timeit.repeat(legacy, number=runs, repeat=3)) / runs
+    t_new = min(timeit.repeat(new, number=runs, repeat=3)) / runs
+    print(f"{label:<32} legacy {t_legacy * 1e3:9.2f} ms  new {t_new * 1e3:9.2f} ms  ({t_legacy / t_new:.1f}x)")
+
+def main():
+    for n in (50, 5000):
+        runs = 20 if n < 1000 else 2
+        page, text = sample_page(n), plain_text(n)
+        bench(f"strip_html markup ({len(page) // 1024} KiB)", lambda: legacy_strip_html(page), lambda: html_to_text(page), runs)
+        bench(f"strip_html plain ({len(text) // 1024} KiB)", lambda: legacy_strip_html(text), lambda: html_to_text(text), runs)
+        bench(f"gov page parse ({len(page) // 1024} KiB)", lambda: legacy_page_content(page), lambda: extract_html(page), runs)
+
+if __name__ == "__main__":
+    main()
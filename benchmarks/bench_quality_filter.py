@@ -0,0 +1,43 @@
+"""Throughput of the quality filter vs the previous per-character check.
+
+    python -m benchmarks.bench_quality_filter
+"""
+import string
+import random
+import timeit
+from scripts.quality_filter import QualityFilter, CORRUPTION_RULES
+
+def legacy_is_text_corrupted(text, threshold=0.3):
+    printable_chars = set(string.printable)
+    if not text:
+        return True
+    non_printable_count = sum(1 for c in text if c not in printable_chars)
+    corruption_ratio = non_printable_count / len(text)
+    return corruption_ratio > threshold
+
+def sample_text(n_chars, seed=0):
+    rng = random.Random(seed)
+    words = ["energy", "market", "Kommission", "réseau", "€", "2024", "grid", "directive", "ACER", "Müller"]
+    out, size = [], 0
+    while size < n_chars:
+        line = " ".join(rng.choice(words) for _ in range(12))
+        out.append(line)
+        size += len(line) + 1
+    return "\n".join(out)
+
+def main():
+    qf = QualityFilter(rules="all")
+    for n_chars in (10_000, 1_000_000, 5_000_000):
+        text = sample_text(n_chars)
+        runs = 3 if n_chars > 100_000 else 50
+        # Preprocessing runs the check twice per record (raw + stripped)
+        legacy = min(timeit.repeat(lambda: (legacy_is_text_corrupted(text), legacy_is_text_corrupted(text)),
+                                   number=runs, repeat=3)) / runs
+        new = min(timeit.repeat(lambda: (qf.failed_rule(text, CORRUPTION_RULES), qf.failed_rule(text)),
+                                number=runs, repeat=3)) / runs
+        mb = len(text.encode("utf-8")) / 1e6
+        print(f"{n_chars:>10,} chars  legacy {mb / legacy:8.1f} MB/s  "
+              f"quality_filter {mb / new:8.1f} MB/s  ({legacy / new:.1f}x)")
+
+if __name__ == "__main__":
+    main()
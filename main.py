@@ -1,12 +1,14 @@
 import os
-import json
+import re
+import socket
 import logging
 from pathlib import Path
-from scripts.wikipedia_scraper import get_energy_articles
-from scripts.news_scraper import get_energy_news
-from scripts.arxiv_scraper import search_arxiv_papers
-from scripts.gov_scraper import get_government_documents
-from scripts.preprocessing import preprocess_jsonl_file
+from contextlib import ExitStack
+from scripts.profiling import profile_stage
+from scripts.output_writer import get_writer, close_writers
+from scripts.sources import SOURCES, register_source, country_energy_topics
+# Collectors, preprocessing (langdetect, lxml), indexing and chunking are
+# imported where they are used, so a run only loads the stages it enables
 
 def configure_logging():
     logging.basicConfig(level=logging.INFO,
@@ -16,11 +18,35 @@ def configure_logging():
             logging.StreamHandler()
         ])
     
-def append_records(path, records):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "a", encoding="utf-8") as f:
-        for r in records:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+def append_records(path, records, store=None):
+    # `records` may be a generator: each record is handed to the file's
+    # background writer as soon as the collector yields it, so only a bounded
+    # queue of documents is held in memory and collectors never wait on disk.
+    if store is not None:
+        # Worker shards (gov.<worker>.jsonl) land in the same "gov" source
+        return store.insert_many(Path(path).name.split(".")[0], records)
+    writer = get_writer(path)
+    count = 0
+    for r in records:
+        writer.write(r)
+        count += 1
+    return count
+
+def _renewing(records, renew):
+    # Keep the queue lease alive while a long job is still producing records;
+    # once it is lost another worker re-runs the job, so stop writing
+    from scripts.work_queue import LeaseLost
+    for r in records:
+        if not renew():
+            raise LeaseLost()
+        yield r
+
+def shard_inputs(input_dir, source):
+    """The raw file for `source` plus any per-worker shards (e.g. gov.<worker>.jsonl)."""
+    stem = Path(source).stem
+    candidates = [input_dir / source] + sorted(input_dir.glob(f"{stem}.*.jsonl"))
+    existing = [p for p in candidates if p.exists()]
+    return existing or [input_dir / source]
 
 def main():
     configure_logging()
@@ -28,574 +54,16 @@ def main():
 
     WIKI_THRESHOLD = float(os.getenv("WIKI_RELEVANCE_THRESHOLD", 1.0))
 
-    RUN_WIKI  = os.getenv("RUN_WIKI", "1")  == "1"  # set to "0" to disable
-    RUN_NEWS  = os.getenv("RUN_NEWS", "1")  == "1"
-    RUN_ARXIV = os.getenv("RUN_ARXIV", "1") == "1"
-    RUN_GOV   = os.getenv("RUN_GOV", "1")   == "1"
-    logging.info(f"RUN_WIKI: {RUN_WIKI}, RUN_NEWS: {RUN_NEWS}, RUN_ARXIV: {RUN_ARXIV}, RUN_GOV: {RUN_GOV}")
+    # RUN_<SOURCE>=0 disables a source (RUN_WIKI, RUN_NEWS, RUN_ARXIV, RUN_GOV)
+    enabled = [name for name in SOURCES if os.getenv(f"RUN_{name.upper()}", "1") == "1"]
+    logging.info(f"Enabled sources: {', '.join(enabled) or 'none'}")
 
     RUN_PREPROCESSING = os.getenv("RUN_PREPROCESSING", "1") == "1"
     logging.info(f"RUN_PREPROCESSING: {RUN_PREPROCESSING}")
 
-    # Wikipedia-optimized topics (exact/official article titles)
-    wiki_topics = [
-        # Policy & Governance
-        "European Green Deal",
-        "Energy policy of the European Union",
-        "Fit for 55 (European Union)", 
-        "European Climate Law",
-        "European Union climate and energy package",
-        "European Green Deal Industrial Plan",
-        "European Climate Pact",
-        "REPowerEU",
-        "European Energy Certificate System",
-        "European Energy Security Strategy",
-        "European Climate Change Programme",
-        "European Union Emissions Trading System",
-        "European Climate Adaptation Strategy",
-        "European Union Renewable Energy Directive",
-        "European Union Energy Efficiency Directive",
-        "Energy Taxation Directive",
-        "European Union Energy Performance of Buildings Directive",
-        "EU taxonomy for sustainable activities",
-        "Energy Union",
-        "EU Carbon Border Adjustment Mechanism",
-        "European Climate, Infrastructure and Environment Executive Agency",
-        "European Environment Agency",
-        "European Energy Exchange",
-        "Renewable Energy Directive (EU)",
-        "European Union National Energy and Climate Plans",
-        "National Energy and Climate Plans",
-        "Just Transition Fund",
-        # Markets & Pricing
-        "Energy market liberalization in the European Union",
-        "European Network of Transmission System Operators for Electricity (ENTSO-E)",
-        "European Network of Transmission System Operators for Gas (ENTSOG)",
-        "European Union Agency for the Cooperation of Energy Regulators (ACER)",    
-        "Electricity market in the European Union",
-        "Electricity pricing",
-        "Net metering",
-        "European Energy Exchange",
-        "Nord Pool",
-        "Ancillary services",
-        "Forward market",
-        "Balancing market",
-        "Power purchase agreement",
-        "Spot market",
-        "Green certificate",
-        "Energy derivative",
-        "Merit order",
-        "Locational marginal pricing",
-        "Market clearing",
-        "Renewable Energy Certificate",
-        "Feed-in tariff",
-        "Local energy markets",
-        "Energy market",
-        "Wholesale electricity market",
-        "Capacity market",
-        # Renewables & Storage
-        "WindEurope",
-        "SolarPower Europe",
-        "Community wind energy",
-        "European Renewable Energy Council",
-        "Solar photovoltaic energy",
-        "Offshore wind power",
-        "Onshore wind power",
-        "Green hydrogen", 
-        "Hydrogen economy",
-        "Community solar",
-        "European Battery Alliance",
-        "Net-Zero Industry Act", 
-        "Wind power",
-        "Energy storage",
-        "Electric vehicle",
-        "Vehicle-to-grid",
-        "Smart grid",
-        "SuperSmart Grid",
-        "Power-to-X",
-        "Power-to-Gas",
-        "Power-to-Heat",
-        "Medgrid",
-        "Desertec",
-        "Microgrid",
-        "Distributed energy resources",
-        "Demand-side management",
-        "Peer-to-peer energy trading",
-        "Electric vehicle integration",
-        # Efficiency & Buildings
-        "Passive house",
-        "Nearly zero-energy building",
-        "Zero-energy building",
-        "Energy-plus building",
-        "Green building",
-        "Energy efficiency in buildings",
-        "Energy performance of buildings",
-        "European Union energy label",
-        "Energy Performance of Buildings Directive",
-        "Energy Efficiency Directive",
-        "European Union energy label",
-        "Ecodesign Directive",
-        "Building insulation",
-        "Building automation (smart buildings)",
-        "Smart meter",
-        "Smart home",
-        "Smart thermostat",
-        "Energy management system",
-        "Energy performance contracting",
-        "Energy audit",
-        "Energy service company (ESCO)",
-        "Heat pump",
-        "Energy demand management",
-        "Renovation Wave",
-        "Energy efficiency",
-        # Poverty & Equity
-        "Energy poverty",
-        "Fuel poverty",
-        "Rural electrification",
-        "Climate justice",
-        "Energy Democracy",
-        "Just energy transition",
-        "Consumer rights in energy",
-        "Energy justice",
-        # Prosumer & Community
-        "Prosumer (energy)",
-        "Local Energy Community",
-        "Citizen energy community",
-        "Renewable energy cooperative",
-        "Microgeneration",
-        "net metering",
-        "Renewable energy cooperative",
-        "Peer-to-peer energy",
-        "Virtual power plant",
-        "Association of Issuing Bodies",
-        "Demand-side management",
-        # Funding & Incentives
-        "Horizon Europe",
-        "LIFE programme",
-        "Grants for home renovation",
-        "Modernisation Fund",
-        "Social Climate Fund",
-        "Innovation Fund",
-        "Green Climate Fund",
-        "Just Energy Transition Partnership (JETP)",
-        "Guarantee of origin",
-        "Next Generation EU",
-        "Just Transition Mechanism" 
-    ]
-
-    eu_countries = [
-    "Austria", "Belgium", "Bulgaria", "Croatia", "Cyprus", "the Czech Republic",
-    "Denmark", "Estonia", "Finland", "France", "Germany", "Greece", "Hungary",
-    "Ireland", "Italy", "Latvia", "Lithuania", "Luxembourg", "Malta",
-    "the Netherlands", "Poland", "Portugal", "Romania", "Slovakia",
-    "Slovenia", "Spain", "Sweden"
-    ]
-
-    country_level_topics = [
-    "Energy in {}",
-    "Electricity sector in {}",
-    "Renewable energy in {}",
-    "List of power stations in {}",
-    "Wind power in {}",
-    "Solar power in {}",
-    "Hydroelectricity in {}",
-    "Geothermal power in {}",
-    "Nuclear power in {}",
-    "Coal in {}",
-    "Natural gas in {}",
-    "Climate change in {}",
-    "Energy policy of {}",
-    "Plug-in electric vehicles in {}"
-    ]
-
-    country_energy_topics = [
-    topic.format(country) for country in eu_countries for topic in country_level_topics
-    ]
-
-    # NewsAPI-optimized topics (short, headline-friendly keywords/phrases)
-    news_topics = [
-        # Policy & Governance
-        "Green Deal",
-        "European Green Deal",
-        "Energy Union",
-        "Renewable Energy Directive",
-        "National Energy and Climate Plans",
-        "Just Transition Fund",
-        "EU climate policy",
-        "Fit for 55",
-        "EU emissions targets",
-        "EU Emissions Trading System",
-        "carbon neutrality",
-        "REPowerEU",
-        "net zero",
-        "carbon tax",
-        "climate law",
-        "Carbon Border Adjustment Mechanism",
-        "emissions trading",
-
-        # Markets & Pricing
-        "Electricity prices",
-        "gas prices",
-        "energy bills",
-        "rising energy bills",
-        "energy crisis",
-        "gas crisis",
-        "cost of living crisis",
-        "energy subsidies",
-        "energy market",
-        "capacity market",
-        "net metering",
-        "feed in tariff",
-
-        # Renewables & Storage
-        "solar panels",
-        "rooftop solar",
-        "solar power",
-        "wind farms",
-        "offshore wind",
-        "energy storage",
-        "battery storage",
-        "electric vehicles",
-        "electric cars",
-        "EV charging",
-        "vehicle to grid",
-        "smart grid",
-        "microgrids",
-        "green hydrogen",
-        "renewable energy investment",
-        "green energy projects",
-        "energy independence",
-
-        # Efficiency & Buildings
-        "energy efficiency",
-        "energy efficiency measures",
-        "energy saving tips",
-        "passive house",
-        "nearly zero energy buildings",
-        "building performance",
-        "home insulation",
-        "heat pumps",
-        "smart meters",
-
-        # Poverty & Equity
-        "energy poverty",
-        "fuel poverty",
-        "just transition",
-        "consumer energy rights",
-        "heating costs",
-
-        # Prosumer & Community
-        "prosumers",
-        "citizen energy communities",
-        "community energy",
-        "energy cooperatives",
-        "peer to peer energy",
-        "demand response",
-        "community solar",
-
-        # Funding & Incentives
-        "Horizon Europe",
-        "LIFE programme",
-        "Energy service companies",
-        "home renovation grants",
-        "solar panel grants",
-        "heat pump incentives",
-        "energy efficiency funding",
-        "renovation wave",
-
-        # Climate Impacts & Extreme Weather
-        "heatwave",
-        "drought",
-        "wildfires",
-        "floods",
-        "extreme weather",
-        "climate crisis",
-
-        # Fossil Fuels and Transition
-        "coal phase out",
-        "fossil fuel subsidies",
-        "oil prices",
-        "natural gas shortage",
-        "Russian gas",
-        "energy security",
-        "gas imports",
-        "renewables vs fossil fuels",
-
-        # International & Global Context
-        "Paris Agreement",
-        "UN climate summit",
-        "Climate change",
-        "Global warming",
-        "Decarbonization",
-        "Renewable energy",
-        "Clean energy",
-        "Energy transition",
-        "Energy policy",
-        "Power Purchase Agreements",
-        "Capacity mechanisms",
-        "Grid balancing",
-        "Energy arbitrage",
-        "Carbon capture and storage",
-        "Hydrogen economy",
-        "Nuclear energy",
-        "Small modular reactors",
-        "Virtual power plant",
-        "AI in energy",
-        "Digital twin",
-        "Blockchain energy trading",
-        "IoT in energy",
-        "Energy digitalization",
-        "LNG imports",
-        "Russian energy dependence",
-        "Middle East oil supply",
-        "OPEC",
-        "Energy diplomacy",
-        "Strategic reserves",
-        "Energy security",
-        "Energy independence",
-        "Energy sanctions",
-        "Gas pipelines",
-        "Climate adaptation",
-        "Climate resilience",
-    ]
-
-    arxiv_topics = [
-        'all:"renewable energy sources"',
-        'all:"energy transition"',
-        'all:"solar photovoltaic systems"',
-        'all:"wind energy harvesting"',
-        'all:"battery energy storage systems"',
-        'all:"thermal energy storage"',
-        'all:"hydrogen energy storage"',
-        'all:"power-to-gas"',
-        'all:"demand response"',
-        'all:"smart grid"',
-        'all:"energy markets"',
-        'all:"microgrid control"',
-        'all:"distributed energy resources"',
-        'all:"demand-side management"',
-        'all:"peer-to-peer energy trading"',
-        'all:"electric vehicle integration"',
-        'all:"electric vehicle charging infrastructure"',
-        'all:"vehicle-to-grid"',
-        'all:"building energy modeling"',
-        'all:"energy efficiency in buildings"',
-        'all: "net zero energy buildings"',
-        'all:"heat pump systems"',
-        'all:"hydrogen economy"',
-        'all:"energy consumption forecasting"',
-        'all:"electricity pricing mechanisms"',
-        'all:"energy market optimization"',
-        'all:"capacity market design"',
-        'all:"energy flexibility markets"',
-        'all:"large language models energy"',
-        'all:"grid stability and reliability"',
-        'all:"power system resilience"',
-        'all:"renewable energy economics"',
-        'all:"carbon neutrality strategies"',
-        'all:"decarbonization pathways"',
-        'all:"climate resilient energy systems"'
-        'all:"machine learning for energy systems"',
-        'all:"IoT in smart metering"',
-        'all:"IoT energy systems"',
-        'all:"digital twin energy systems"'
-        'all:"energy data analytics"',
-        'all:"renewable energy policy modeling"',
-        'all:"renewable energy"',
-        'all:"energy poverty"',
-        'all:"carbon pricing mechanisms"',
-        'all:"feed-in tariffs renewable energy"',
-        'all:"reinforcement learning energy management"',
-        'all:"energy pricing models"',
-        'all:"Paris Agreement energy policy"'
-        'all:"energy justice"',
-        'all:"energy democracy"',
-        'all:"clean energy subsidies"',
-        'all:"net zero energy transition"',
-        'all:"electricity market design"',
-        'all:"just transition"',
-        'all:"prosumer behavior"',
-        'all:"household energy decision-making"',
-        'all:"energy consumption behavior"',
-        'all:"renewable energy incentives"',
-        'all:"energy awareness"',
-        'all:"energy literacy"',
-        'all:"social acceptance of renewable energy"',
-        'all:"energy communities"',
-        'all:"citizen energy communities"',
-        'all:"energy behavior change"',
-        'all:"renewable energy adoption"',
-        'all:"energy poverty assessment"',
-        'all:"energy transition modeling"',
-        'all:"energy performance of buildings"',
-        'all:"local energy markets"',
-        'all:"transactive energy"',
-        'all:"electrical vehicle charging infrastructure"',
-        'all:"European green deal"',
-        'all:"Fit for 55"',
-        'all:"REPowerEU"',
-        'all:"clean energy package"',
-        'all:"renewable energy directive"',
-        'all:"EU climate policy"',
-        'all:"EU energy policy"',
-        'all:"power purchase agreements"',
-        'all:"energy union"',
-        'all:"blockchain energy trading"',
-        'all:"European electricity market"',
-        'all:"European energy security"',
-        'all:"European energy transition"',
-        'all:"sustainable power systems"'
-    ]
-
-    # 2. EU & national gov/reg URLs
-    gov_urls = [
-
-        # EU-level Institutions
-        "https://energy.ec.europa.eu/index_en",                   # EU DG Energy portal
-        "https://acer.europa.eu/",                                # Agency for Cooperation of Energy Regulators (ACER)
-        "https://ceer.eu/",                                       # Council of European Energy Regulators (CEER)
-        "https://entsoe.eu/",                                     # European Network of TSOs for Electricity (ENTSO-E)
-        "https://entsog.eu/",                                     # European Network of TSOs for Gas (ENTSO-G)
-        "https://cinea.ec.europa.eu/",                            # European Climate, Infrastructure and Environment Executive Agency (CINEA)
-        "https://cordis.europa.eu/",                              # CORDIS – EU research projects portal
-        "https://ec.europa.eu/programmes/horizon2020/",           # Horizon Europe funding program
-        "https://research-and-innovation.ec.europa.eu/funding/funding-opportunities/funding-programmes-and-open-calls/horizon-europe_en",
-        "https://www.energy-community.org/",                      # Energy Community Treaty Organization
-        "https://cinea.ec.europa.eu/connecting-europe-facility/energy_en",  # Connecting Europe Facility – Energy
-        "https://cinea.ec.europa.eu/programmes/innovation-fund_en",     # EU Innovation Fund
-        "https://cinea.ec.europa.eu/programmes/life_en",                # LIFE Programme
-        "https://www.eib.org/en/projects/sectors/energy/index.htm",     # EIB – Energy projects
-        "https://www.iea.org/regions/europe",
-        "https://www.eurelectric.org/",
-        "https://energy.ec.europa.eu/topics/infrastructure/high-level-groups/north-seas-energy-cooperation_en",
-        "https://fedarene.org/",
-        "https://enr-network.org/",
-        "https://www.irena.org/",
-        "https://unece.org/",
-        "https://www.worldenergy.org/",
-        "https://www.odyssee-mure.eu/",
-        "https://setis.ec.europa.eu/index_en",
-        "https://bridge-smart-grid-storage-systems-digital-projects.ec.europa.eu/",
-        "https://www.ren21.net/",
-        "https://www.cleanenergyministerial.org/",
-        "https://www.ief.org/",
-        "https://eudsoentity.eu",
-
-        # National Energy Regulatory and Government Bodies
-        "https://www.e-control.at/en",                            # Austria (E-Control)
-        "https://www.creg.be/en",                                 # Belgium (CREG)
-        "https://www.dker.bg/en/home/",                           # Bulgaria (Energy & Water Regulatory Commission - EWRC)
-        "https://hera.hr/en/html/",                               # Croatia (Croatian Energy Regulatory Agency - HERA)
-        "https://www.cera.org.cy/en-gb/home/",                    # Cyprus (Energy Regulatory Authority - CERA)
-        "https://www.eru.cz/en/",                                 # Czech Republic (Energy Regulatory Office - ERÚ)
-        "https://www.konkurentsiamet.ee/en",                      # Estonia (Estonian Competition Authority)
-        "https://energiavirasto.fi/en/frontpage",                 # Finland (Energy Authority)
-        "https://www.cre.fr/en",                                  # France (Commission de Régulation de l'Énergie - CRE)
-        "https://www.bundesnetzagentur.de/EN/",                   # Germany (Federal Network Agency - BNetzA)
-        "https://www.rae.gr/en/",                                 # Greece (Regulatory Authority for Energy - RAE)
-        "https://www.mekh.hu/home",                               # Hungary (Energy and Public Utility Regulatory Authority - MEKH)
-        "https://www.cru.ie/",                                    # Ireland (Commission for Regulation of Utilities - CRU)
-        "https://www.arera.it/en/",                               # Italy (ARERA)
-        "https://www.sprk.gov.lv/en",                             # Latvia (Public Utilities Commission - SPRK)
-        "https://www.vert.lt/en/Pages/updates.aspx",              # Lithuania (National Energy Regulatory Council - VERT)
-        "https://web.ilr.lu/EN/",                                 # Luxembourg (Institute of Regulation - ILR)
-        "https://www.rews.org.mt/",                               # Malta (Regulator for Energy and Water Services - REWS)
-        "https://www.acm.nl/en",                                  # Netherlands (Authority for Consumers & Markets - ACM)
-        "https://www.ure.gov.pl/en",                              # Poland (Energy Regulatory Office - URE)
-        "https://www.erse.pt/en/home/",                           # Portugal (Energy Services Regulatory Authority - ERSE)
-        "https://www.urso.gov.sk/en/",                            # Slovakia (Regulatory Office for Network Industries - ÚRSO)
-        "https://www.agen-rs.si/en",                              # Slovenia (Energy Agency - AGEN-RS)
-        "https://ei.se/ei-in-english",                            # Sweden (Swedish Energy Markets Inspectorate - Ei)
-        # Austria
-        "https://www.apg.at/en",
-        "https://www.bmimi.gv.at/en.html",
-        # Belgium
-        "https://www.elia.be/en",
-        "https://economie.fgov.be/en",
-        # Bulgaria
-        "https://www.eso.bg/index.php?en",
-        "https://www.me.government.bg/en",
-        # Croatia
-        "https://www.hops.hr/en",
-        # Cyprus
-        "https://www.eac.com.cy/EN",
-        "https://www.gov.cy/meci/en/",
-        # Czech Republic
-        "https://www.ceps.cz/en",
-        "https://mpo.gov.cz/en",
-        # Denmark
-        "https://en.energinet.dk",
-        "https://ens.dk/en",
-        # Estonia
-        "https://elering.ee/en",
-        "https://kliimaministeerium.ee/en",
-        # Finland
-        "https://www.fingrid.fi/en",
-        "https://tem.fi/en",
-        # France
-        "https://www.rte-france.com/en/home",
-        "https://www.ecologie.gouv.fr/en",
-        # Germany
-        "https://www.tennet.eu",
-        "https://www.amprion.net/index-2.html",
-        "https://www.50hertz.com/en/",
-        "https://www.transnetbw.de/en",
-        "https://www.bmwk.de/Navigation/EN/Home/home.html",
-        # Greece
-        "https://www.admie.gr/en",
-        "https://deddie.gr/en",
-        "https://www.ypen.gov.gr",
-        # Hungary
-        "https://www.mavir.hu/web/mavir-en",
-        # Ireland
-        "https://www.eirgrid.com",
-        "https://esbnetworks.ie",
-        "https://www.gov.ie/decc/",
-        # Italy
-        "https://www.terna.it/en",
-        # Latvia
-        "https://www.ast.lv/en",
-        "https://www.em.gov.lv/en",
-        # Lithuania
-        "https://www.litgrid.eu/index.php?lang=2",
-        "https://enmin.lrv.lt/en",
-        # Luxembourg
-        "https://www.creos-net.lu/en/homepage",
-        "https://meco.gouvernement.lu/en/domaines-activites/energie.html",
-        # Malta
-        "https://www.enemalta.com.mt",
-        "https://sustainability.gov.mt",
-        # Netherlands
-        "https://www.tennet.eu",
-        "https://www.government.nl/ministries/ministry-of-economic-affairs",
-        # Poland
-        "https://www.pse.pl/web/pse-eng",
-        "https://www.gov.pl/web/climate",
-        # Portugal
-        "https://www.ren.pt/en-GB",
-        "https://www.portugal.gov.pt/en/gc24",
-        # Romania
-        "https://www.transelectrica.ro/en/web/tel/home",
-        # Slovakia
-        "https://www.sepsas.sk/en",
-        "https://www.economy.gov.sk/en",
-        # Slovenia
-        "https://www.eles.si/en/",
-        "https://www.gov.si/en/ministries/ministry-of-the-environment-climate-and-energy",
-        # Spain
-        "https://www.ree.es/en",
-
-        # Market Operators & Exchanges
-        "https://www.eex.com/en",                                     # European Energy Exchange
-        "https://www.epexspot.com/en",                                # EPEX SPOT
-        "https://www.mercatoelettrico.org/En/Default.aspx",           # GME (Italy)
-        "https://www.nordpoolgroup.com",                              # Nord Pool
-        "https://www.omie.es/en",                                     # OMIE (Spain/Portugal)
-        "https://www.enexgroup.gr/web/guest/home",                    # EnExGroup (Greece)
-        # Denmark public–private climate portal
-        "https://stateofgreen.com/en",
-
-    ]
+    RUN_INDEXING = os.getenv("RUN_INDEXING", "0") == "1"
+    RUN_CHUNKING = os.getenv("RUN_CHUNKING", "0") == "1"
+    logging.info(f"RUN_INDEXING: {RUN_INDEXING}, RUN_CHUNKING: {RUN_CHUNKING}")
 
     # env-controlled maxima
     mw = int(os.getenv("MAX_WIKI_ARTICLES", 5))
@@ -603,83 +71,229 @@ def main():
     ma = int(os.getenv("MAX_ARXIV_PAPERS", 5))
     mp = int(os.getenv("MAX_GOV_PAGES", 30))
     md = int(os.getenv("MAX_GOV_DEPTH", 3))
+    gov_best_first = os.getenv("GOV_CRAWL_ORDER", "bfs").lower() == "best_first"
+    gov_discovery = os.getenv("GOV_DISCOVERY", "crawl").lower()
+    sitemap_state = os.getenv("SITEMAP_STATE_PATH", "output/sitemap_state.json")
 
     # NewsAPI key
     news_key = os.getenv("NEWS_API_KEY")
-    if not news_key:
+    if "news" in enabled and not news_key:
         logging.error("Missing NEWS_API_KEY—exiting.")
         return
 
     # -- Wikipedia --
     RUN_WIKI_COUNTRY_ONLY = os.getenv("RUN_WIKI_COUNTRY_ONLY", "0") == "1"
+    wiki_exact = RUN_WIKI_COUNTRY_ONLY
+    # WIKI_SOURCE=dump reads a local pages-articles-multistream dump instead of the API
+    WIKI_SOURCE = os.getenv("WIKI_SOURCE", "api").lower()
+    wiki_dump = os.getenv("WIKI_DUMP_PATH")
+    if "wiki" in enabled and WIKI_SOURCE == "dump":
+        if not wiki_dump:
+            logging.error("WIKI_SOURCE=dump needs WIKI_DUMP_PATH—exiting.")
+            return
+        register_source("wiki", "scripts.wiki_dump", "get_dump_articles", None,
+                        key_arg="dump_path", label="Wiki dump", unit="articles")
+    logging.info(f"WIKI_SOURCE: {WIKI_SOURCE}")
+
+    # -- arXiv: ARXIV_SOURCE=snapshot searches a local metadata snapshot instead of the API --
+    ARXIV_SOURCE = os.getenv("ARXIV_SOURCE", "api").lower()
+    arxiv_metadata = os.getenv("ARXIV_METADATA_PATH")
+    if "arxiv" in enabled and ARXIV_SOURCE == "snapshot":
+        if not arxiv_metadata:
+            logging.error("ARXIV_SOURCE=snapshot needs ARXIV_METADATA_PATH—exiting.")
+            return
+        register_source("arxiv", "scripts.arxiv_snapshot", "search_snapshot_papers", "arxiv_topics.txt",
+                        label="arXiv snapshot", unit="papers")
+    logging.info(f"ARXIV_SOURCE: {ARXIV_SOURCE}")
+
+    # Per-source collector arguments; topics/URLs come from data/*.txt
+    options = {
+        "wiki": dict(max_articles=mw, threshold=WIKI_THRESHOLD, exact=wiki_exact),
+        "news": dict(api_key=news_key, max_articles=mn, language="en", from_date="2022-01-01T00:00:00Z"),
+        "arxiv": dict(max_papers=ma),
+        "gov": dict(max_pages=mp, max_depth=md, best_first=gov_best_first,
+                    discovery=gov_discovery, sitemap_state_path=sitemap_state),
+    }
+    if WIKI_SOURCE == "dump":
+        # One job covers the whole dump; country-only mode keeps just the exact titles
+        options["wiki"] = dict(
+            index_path=os.getenv("WIKI_DUMP_INDEX") or None, threshold=WIKI_THRESHOLD,
+            titles=country_energy_topics() if RUN_WIKI_COUNTRY_ONLY else None,
+            workers=int(os.getenv("WIKI_DUMP_WORKERS", 0)) or None,
+            max_articles=int(os.getenv("WIKI_DUMP_MAX_ARTICLES", 0)))
+    if ARXIV_SOURCE == "snapshot":
+        # All topics are passed so the first query indexes every topic's words in one pass
+        options["arxiv"] = dict(
+            metadata_path=arxiv_metadata, pdf_source=os.getenv("ARXIV_PDF_DIR") or None,
+            max_papers=int(os.getenv("ARXIV_SNAPSHOT_MAX_PAPERS", 0)),
+            workers=int(os.getenv("ARXIV_SNAPSHOT_WORKERS", 0)) or None,
+            queries=SOURCES["arxiv"].topics())
+
+    def topics_for(name):
+        if name == "wiki" and WIKI_SOURCE == "dump":
+            return [wiki_dump]
+        if name == "wiki" and RUN_WIKI_COUNTRY_ONLY:
+            return country_energy_topics()
+        return SOURCES[name].topics()
+
+    # -- Storage backend: append-only JSONL files (default) or the SQLite document store --
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "jsonl").lower()
+    store = None
+    if STORAGE_BACKEND == "sqlite":
+        from scripts.document_store import DocumentStore
+        store = DocumentStore(os.getenv("STORE_PATH", "output/documents.db"),
+                              batch_size=int(os.getenv("STORE_BATCH_SIZE", 500)))
+    logging.info(f"STORAGE_BACKEND: {STORAGE_BACKEND}")
+
+    # -- Shared work queue (several containers drain one run) --
+    QUEUE_MODE = os.getenv("QUEUE_MODE", "").lower()  # "seed" or "work"; unset runs everything in-process
+    if QUEUE_MODE:
+        from scripts.work_queue import WorkQueue
+        queue = WorkQueue(os.getenv("QUEUE_PATH", "output/queue.db"),
+                          lease_seconds=int(os.getenv("QUEUE_LEASE_SECONDS", 900)),
+                          max_attempts=int(os.getenv("QUEUE_MAX_ATTEMPTS", 3)))
+        if QUEUE_MODE == "seed":
+            for kind in enabled:
+                added = queue.enqueue_many(kind, topics_for(kind))
+                logging.info(f"Queue: seeded {added} new '{kind}' jobs")
+            logging.info(f"Queue status: {queue.counts()}")
+        elif QUEUE_MODE == "work":
+            worker_id = re.sub(r"[^A-Za-z0-9_.-]", "_", os.getenv("WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}")
+
+            def enqueue_pdf(title, pdf):
+                queue.enqueue("gov_pdf", pdf, {"title": title})
+
+            def handle(job, renew):
+                kind, key = job["kind"], job["key"]
+                if kind == "gov":
+                    records = SOURCES[kind].collect(key, **options[kind], pdf_handler=enqueue_pdf)
+                elif kind in SOURCES:
+                    records = SOURCES[kind].collect(key, **options[kind])
+                elif kind == "gov_pdf":
+                    from scripts.gov_scraper import get_pdf_document
+                    record = get_pdf_document(job["payload"].get("title", key), key)
+                    if record is None:
+                        raise Exception(f"PDF parse failed for {key}")
+                    records = [record]
+                else:
+                    raise ValueError(f"Unknown job kind '{kind}'")
+                source = "gov" if kind == "gov_pdf" else kind
+                path = f"output/{source}.{worker_id}.jsonl"
+                count = append_records(path, _renewing(records, renew), store=store)
+                if store is None:
+                    # On disk before the job is marked complete
+                    get_writer(path).sync()
+                logging.info(f"Worker {worker_id}: {kind} '{key}': {count} records")
+
+            with profile_stage(f"queue_worker_{worker_id}"):
+                queue.drain(worker_id, handle, poll_seconds=int(os.getenv("QUEUE_POLL_SECONDS", 10)))
+            from scripts.rate_control import get_rate_controller
+            get_rate_controller().log_rates()
+        else:
+            logging.error(f"Unknown QUEUE_MODE '{QUEUE_MODE}' (expected 'seed' or 'work')")
+        queue.close()
+        close_writers()
+        if store is not None:
+            store.close()
+        # Preprocessing runs as a separate step once every worker has finished
+        return
 
-    if RUN_WIKI_COUNTRY_ONLY:
-        active_wiki_topics = country_energy_topics          
-        wiki_exact = True                                   
-    else:
-        active_wiki_topics = wiki_topics                    
-        wiki_exact = False
-
-    if RUN_WIKI:
-        for t in active_wiki_topics:
-            try:
-                w = get_energy_articles(query=t, max_articles=mw, threshold=WIKI_THRESHOLD, exact=wiki_exact)
-                append_records("output/wiki.jsonl", w)
-                logging.info(f"Wiki '{t}': {len(w)} articles")
-            except Exception as e:
-                logging.error(f"Wiki '{t}' failed: {e}")
-
-    # -- News --
-    if RUN_NEWS:
-
-        for t in news_topics:
-            try:
-                n = get_energy_news(api_key=news_key, query=t, max_articles=mn, language="en", from_date="2022-01-01T00:00:00Z")
-                append_records("output/news.jsonl", n)
-                logging.info(f"News '{t}': {len(n)} articles")
-            except Exception as e:
-                logging.error(f"News '{t}' failed: {e}")
-
-    # -- arXiv --
-    if RUN_ARXIV:
-        for t in arxiv_topics:
-            try:
-                a = search_arxiv_papers(query=t, max_papers=ma)
-                append_records("output/arxiv.jsonl", a)
-                logging.info(f"arXiv '{t}': {len(a)} papers")
-            except Exception as e:
-                logging.error(f"arXiv '{t}' failed: {e}")
-
-    # -- Government / Regulatory --
-    if RUN_GOV:
-        for url in gov_urls:
-            try:
-                g = get_government_documents(start_url=url, max_pages=mp, max_depth=md)
-                append_records("output/gov.jsonl", g)
-                logging.info(f"Gov '{url}': {len(g)} docs")
-            except Exception as e:
-                logging.error(f"Gov '{url}' failed: {e}")
-
+    # -- Collection: without BUDGET_* every topic runs in order; with a budget
+    # the scheduler favours the sources yielding the most new documents --
+    scheduler = None
+    if enabled:
+        from scripts.scheduler import Budget, CollectionScheduler
+        from scripts.rate_control import get_rate_controller, BudgetExhausted
+        rate_control = get_rate_controller()
+        budget = Budget.from_env()
+        logging.info(f"Collection budget: {budget}")
+        scheduler = CollectionScheduler(
+            {name: topics_for(name) for name in enabled}, budget,
+            counters=lambda: (rate_control.total_requests, rate_control.total_bytes),
+            set_deadline=rate_control.set_deadline, set_request_limit=rate_control.set_request_limit)
+        # One profile stage per run of consecutive jobs from a source: the whole
+        # source when unbudgeted, each slice the scheduler gives it otherwise
+        profiled, stage = None, ExitStack()
+        with stage:
+            for job in scheduler:
+                if job.source != profiled:
+                    stage.close()
+                    stage.enter_context(profile_stage(f"collect_{job.source}"))
+                    profiled = job.source
+                source, t = SOURCES[job.source], job.topic
+                try:
+                    records = scheduler.track(job, source.collect(t, **options[job.source]))
+                    count = append_records(f"output/{job.source}.jsonl", records, store=store)
+                    logging.info(f"{source.label} '{t}': {count} {source.unit}")
+                except BudgetExhausted as e:
+                    logging.info(f"{source.label} '{t}' stopped: {e}")
+                except Exception as e:
+                    logging.error(f"{source.label} '{t}' failed: {e}")
+                finally:
+                    scheduler.finish(job)
+
+    # Drain the background writers so preprocessing sees every record
+    close_writers()
+    if scheduler is not None:
+        scheduler.log_summary()
+        # Final per-host rates, also written to logs/rate_control.json
+        rate_control.log_rates()
     logging.info("=== Collection complete. Check output/*.jsonl for results. ===")
 
     # --- Preprocessing Step ---
     if RUN_PREPROCESSING:
+        from scripts.preprocessing import preprocess_jsonl_file, preprocess_store
         logging.info("=== Starting Preprocessing of collected data ===")
-        sources = ["wiki.jsonl", "news.jsonl", "arxiv.jsonl", "gov.jsonl"]
+        sources = [f"{name}.jsonl" for name in SOURCES]
         input_dir = Path("output")
         output_dir = Path("output/processed")
         output_dir.mkdir(exist_ok=True, parents=True)
 
         for source in sources:
-            input_file = input_dir / source
+            input_files = shard_inputs(input_dir, source)
             output_file = output_dir / source
             try:
-                preprocess_jsonl_file(input_file, output_file)
+                with profile_stage(f"preprocess_{output_file.stem}"):
+                    if store is not None:
+                        preprocess_store(store, output_file.stem)
+                        if os.getenv("STORE_EXPORT_JSONL", "0") == "1":
+                            store.export_jsonl(f"processed/{output_file.stem}", output_file)
+                    else:
+                        preprocess_jsonl_file(input_files, output_file)
                 logging.info(f"Preprocessed '{source}' successfully.")
             except Exception as e:
                 logging.error(f"Preprocessing '{source}' failed: {e}")
 
+    if store is not None:
+        store.close()
+
     logging.info("=== Preprocessing complete. Check output/processed/*.jsonl for results. ===")
+
+    # --- BM25 indexing of the processed corpus (incremental) ---
+    if RUN_INDEXING:
+        try:
+            from scripts.bm25_index import update_index
+            with profile_stage("index_bm25"):
+                update_index("output/processed", os.getenv("INDEX_DIR", "output/index"))
+            logging.info("=== Indexing complete. Query with: python -m scripts.bm25_index query \"...\" ===")
+        except Exception as e:
+            logging.error(f"Indexing failed: {e}")
+
+    # --- Chunking into packed training shards ---
+    if RUN_CHUNKING:
+        try:
+            from scripts.chunking import chunk_corpus
+            with profile_stage("chunking"):
+                chunk_corpus(
+                    "output/processed", os.getenv("CHUNK_DIR", "output/chunks"),
+                    tokenizer=os.getenv("CHUNK_TOKENIZER", "regex"),
+                    max_tokens=int(os.getenv("CHUNK_MAX_TOKENS", 1024)),
+                    overlap=int(os.getenv("CHUNK_OVERLAP", 128)),
+                    shard_size=int(os.getenv("CHUNK_SHARD_SIZE", 10000)),
+                    workers=int(os.getenv("CHUNK_WORKERS", 0)) or None)
+            logging.info("=== Chunking complete. Check output/chunks/manifest.json for results. ===")
+        except Exception as e:
+            logging.error(f"Chunking failed: {e}")
     
 if __name__ == "__main__":
     main()
\ No newline at end of file
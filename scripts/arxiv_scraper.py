@@ -1,13 +1,19 @@
 import logging
-import requests
 import tempfile
 import os
 import arxiv
 import fitz
+from scripts.pdf_cache import cached_pdf_text
+from scripts.rate_control import polite_get, get_rate_controller
+
+ARXIV_API_HOST = "export.arxiv.org"
+
+# Part of the PDF cache key: bump when pdf_to_text changes
+PDF_EXTRACTOR = f"arxiv-fitz-v1/{fitz.VersionBind}"
 
 def download_pdf(pdf_url):
     logging.info(f"Downloading PDF: {pdf_url}")
-    resp = requests.get(pdf_url, timeout=10)
+    resp = polite_get(pdf_url, timeout=10)
     resp.raise_for_status()
     return resp.content
 
@@ -28,7 +34,7 @@ def pdf_to_text(pdf_bytes):
 
 def download_and_parse_pdf(pdf_url):
     pdf_bytes = download_pdf(pdf_url)
-    raw_text = pdf_to_text(pdf_bytes)
+    raw_text = cached_pdf_text(pdf_bytes, PDF_EXTRACTOR, pdf_to_text)
     return raw_text
 
 def search_arxiv_papers(query="renewable energy", max_papers=2):
@@ -38,8 +44,10 @@ def search_arxiv_papers(query="renewable energy", max_papers=2):
         max_results=max_papers,
         sort_by=arxiv.SortCriterion.SubmittedDate
     )
-    papers = []
-    for res in search.results():
+    # The arxiv client makes its own requests; pace the search as one call
+    with get_rate_controller().paced(ARXIV_API_HOST, backoff_on=(arxiv.HTTPError,)):
+        results = list(search.results())
+    for res in results:
         paper = {
             "title": res.title,
             "url": res.pdf_url,
@@ -50,5 +58,4 @@ def search_arxiv_papers(query="renewable energy", max_papers=2):
         except Exception as e:
             logging.warning(f"arXiv PDF fallback for '{res.title}': {e}")
             paper["content"] = res.summary
-        papers.append(paper)
-    return papers
+        yield paper
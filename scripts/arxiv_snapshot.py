@@ -0,0 +1,353 @@
+"""Bulk arXiv source: papers from a local metadata snapshot instead of the API.
+
+Reads the arXiv metadata snapshot (arxiv-metadata-oai-snapshot.json, one
+JSON object per line). The first query builds an in-memory inverted index
+over the title, abstract and categories, restricted to the words used by the
+configured arxiv_topics. Worker processes, one pool kept for every topic,
+scan byte ranges of the snapshot in parallel, and postings are line offsets, so matched papers are read back with
+a seek. Queries use the API syntax (all:/ti:/abs:/cat: terms, quoted phrases,
+AND / OR / ANDNOT); candidates from the postings are checked exactly against
+the paper's text. PDF text comes from a local directory or tar archive of
+arXiv PDFs, extracted in a process pool through the same PyMuPDF + PDF cache
+path as the live source; papers without a PDF fall back to the abstract.
+
+    python -m scripts.arxiv_snapshot arxiv-metadata-oai-snapshot.json --pdfs pdf/ --workers 8
+"""
+import os
+import re
+import sys
+import json
+import logging
+import tarfile
+import argparse
+from array import array
+from pathlib import Path
+from multiprocessing import Pool
+
+FIELDS = ("all", "ti", "abs", "cat")
+# Not indexed: phrases containing them are still matched exactly on the text
+STOPWORDS = frozenset("a an and as at by for from in into of on or the to via with".split())
+
+_word_re = re.compile(r"[a-z0-9]+")
+_term_re = re.compile(r'\b(ANDNOT|AND|OR)\b|(\w+):\s*(?:"([^"]*)"|(\S+))')
+
+def tokenize(text):
+    return _word_re.findall(text.lower())
+
+# --- queries ---
+
+class Term:
+    """One `field:"phrase"` term of an API query."""
+    __slots__ = ("field", "words", "category")
+
+    def __init__(self, field, value):
+        if field not in FIELDS:
+            raise ValueError(f"Unsupported arXiv query field '{field}'")
+        self.field = field
+        value = value.strip()
+        # all: also matches a category code such as eess.SY
+        self.category = value.lower() if field == "cat" or (field == "all" and " " not in value) else None
+        self.words = [] if field == "cat" else tokenize(value)
+
+    def keys(self):
+        """Alternative lists of index keys: a matching paper has every key of at least one list."""
+        alternatives = []
+        if self.words:
+            alternatives.append([w for w in self.words if w not in STOPWORDS] or self.words)
+        if self.category:
+            alternatives.append([f"cat:{self.category}"])
+        return alternatives
+
+    def matches(self, paper):
+        if self.category and self.category in paper["categories"]:
+            return True
+        if not self.words:
+            return False
+        texts = {"ti": ("title",), "abs": ("abstract",)}.get(self.field, ("title", "abstract"))
+        return any(_contains(paper[t], self.words) for t in texts)
+
+def _contains(tokens, phrase):
+    n = len(phrase)
+    first = phrase[0]
+    return any(tokens[i:i + n] == phrase for i, t in enumerate(tokens) if t == first)
+
+def parse_query(query):
+    """[(operator, Term)] for an API query; the first operator is None."""
+    terms, op = [], None
+    for m in _term_re.finditer(query):
+        if m.group(1):
+            op = m.group(1)
+            continue
+        terms.append((op if terms else None, Term(m.group(2).lower(), m.group(3) or m.group(4))))
+        op = "AND"
+    if not terms:
+        raise ValueError(f"No search terms in arXiv query '{query}'")
+    return terms
+
+def evaluate(terms, paper):
+    result = False
+    for op, term in terms:
+        if op is None:
+            result = term.matches(paper)
+        elif op == "AND":
+            result = result and term.matches(paper)
+        elif op == "OR":
+            result = result or term.matches(paper)
+        else:
+            result = result and not term.matches(paper)
+    return result
+
+# --- index ---
+
+def _paper_tokens(meta):
+    return {
+        "title": tokenize(meta.get("title") or ""),
+        "abstract": tokenize(meta.get("abstract") or ""),
+        "categories": (meta.get("categories") or "").lower().split(),
+    }
+
+_worker = {}
+
+def _init_worker(path):
+    _worker.update(path=path, tars={})
+
+def _scan_range(task):
+    """Postings {key: array of line offsets} for the words of `vocabulary` in
+    one byte range (worker side)."""
+    start, end, vocabulary = task
+    postings = {}
+    with open(_worker["path"], "rb") as f:
+        if start:
+            # Skip the line straddling `start` (it belongs to the previous
+            # range) unless a line begins exactly at `start`
+            f.seek(start - 1)
+            f.readline()
+        offset = f.tell()
+        while offset <= end:
+            line = f.readline()
+            if not line:
+                break
+            try:
+                paper = _paper_tokens(json.loads(line))
+            except ValueError:
+                offset = f.tell()
+                continue
+            keys = set(paper["title"]).union(paper["abstract"]) & vocabulary
+            keys.update(k for k in (f"cat:{c}" for c in paper["categories"]) if k in vocabulary)
+            for key in keys:
+                postings.setdefault(key, array("Q")).append(offset)
+            offset = f.tell()
+    return postings
+
+class SnapshotIndex:
+    """Inverted index of the snapshot over the words used by a set of queries."""
+
+    def __init__(self, path, workers=None):
+        self.path = Path(path)
+        self.workers = workers or os.cpu_count() or 1
+        self.postings = {}
+        self.vocabulary = set()
+        self.emitted = set()
+        self._pool = None
+
+    def pool(self):
+        """Worker pool shared by indexing and PDF extraction for every query."""
+        if self._pool is None:
+            self._pool = Pool(self.workers, initializer=_init_worker, initargs=(str(self.path),))
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    def ensure(self, queries):
+        """Index any query words not indexed yet (one parallel pass over the file)."""
+        missing = {key for q in queries for _, term in parse_query(q)
+                   for keys in term.keys() for key in keys} - self.vocabulary
+        if not missing:
+            return
+        size = self.path.stat().st_size
+        step = max(size // (self.workers * 4), 1 << 20)
+        spans = [(start, min(start + step, size) - 1, missing) for start in range(0, size, step)]
+        logging.info(f"arXiv snapshot: indexing {len(missing)} query words over {size / 1024 ** 2:.0f} MiB "
+                     f"({len(spans)} ranges, {self.workers} workers)")
+        for part in self.pool().imap(_scan_range, spans):
+            # Ranges come back in file order, so offsets stay sorted
+            for key, offsets in part.items():
+                self.postings.setdefault(key, array("Q")).extend(offsets)
+        self.vocabulary |= missing
+        logging.info(f"arXiv snapshot: {len(self.postings)} keys, "
+                     f"{sum(len(p) for p in self.postings.values())} postings")
+
+    def candidates(self, terms):
+        """Line offsets that may match: a superset checked by evaluate()."""
+        result = set()
+        for op, term in terms:
+            found = set()
+            for keys in term.keys():
+                offsets = set(self.postings.get(keys[0], ()))
+                for key in keys[1:]:
+                    offsets.intersection_update(self.postings.get(key, ()))
+                found |= offsets
+            if op is None or op == "OR":
+                result |= found
+            elif op == "AND":
+                result &= found
+        return sorted(result)
+
+    def search(self, query):
+        """Metadata of the papers matching `query`, most recently updated first."""
+        terms = parse_query(query)
+        self.ensure([query])
+        matches = []
+        with open(self.path, "rb") as f:
+            for offset in self.candidates(terms):
+                f.seek(offset)
+                meta = json.loads(f.readline())
+                if evaluate(terms, _paper_tokens(meta)):
+                    matches.append(meta)
+        matches.sort(key=lambda m: m.get("update_date") or "", reverse=True)
+        return matches
+
+_indexes = {}
+
+def get_snapshot_index(path, workers=None):
+    key = str(Path(path).resolve())
+    if key not in _indexes:
+        _indexes[key] = SnapshotIndex(path, workers)
+    return _indexes[key]
+
+# --- local PDFs ---
+
+def _pdf_key(name):
+    """arXiv id without version from a PDF file name: 2301.00001v2.pdf -> 2301.00001,
+    hep-th9901001v1.pdf -> hep-th9901001."""
+    return re.sub(r"v\d+$", "", Path(name).name[:-4])
+
+def _version(name):
+    m = re.search(r"v(\d+)\.pdf$", name)
+    return int(m.group(1)) if m else 0
+
+def find_local_pdfs(source):
+    """{arXiv id key: location} for a directory of PDFs and/or .tar archives, or
+    one archive; the highest version of each paper wins."""
+    source = Path(source)
+    found = {}
+
+    def add(key, name, location):
+        if key not in found or _version(name) > found[key][0]:
+            found[key] = (_version(name), location)
+
+    archives = [source] if source.is_file() else sorted(p for p in source.rglob("*.tar*") if tarfile.is_tarfile(p))
+    if source.is_dir():
+        for p in source.rglob("*.pdf"):
+            add(_pdf_key(p.name), p.name, ("file", str(p)))
+    for archive in archives:
+        with tarfile.open(archive) as tar:
+            # Uncompressed archives (arXiv's bulk PDF tars) are read by offset
+            plain = archive.suffix == ".tar"
+            for m in tar:
+                if m.isfile() and m.name.endswith(".pdf"):
+                    location = (("tar", str(archive), m.offset_data, m.size) if plain
+                                else ("tarmember", str(archive), m.name))
+                    add(_pdf_key(m.name), m.name, location)
+    logging.info(f"arXiv snapshot: {len(found)} local PDFs in {source}")
+    return {key: location for key, (_, location) in found.items()}
+
+def _read_pdf(location):
+    kind, path = location[0], location[1]
+    if kind == "file":
+        return Path(path).read_bytes()
+    if kind == "tar":
+        with open(path, "rb") as f:
+            f.seek(location[2])
+            return f.read(location[3])
+    # Compressed archive: keep it open per worker
+    tars = _worker.setdefault("tars", {})
+    if path not in tars:
+        tars[path] = tarfile.open(path)
+    return tars[path].extractfile(location[2]).read()
+
+_pdf_indexes = {}
+
+def get_local_pdfs(source):
+    key = str(Path(source).resolve())
+    if key not in _pdf_indexes:
+        _pdf_indexes[key] = find_local_pdfs(source)
+    return _pdf_indexes[key]
+
+# --- records ---
+
+def _paper_key(arxiv_id):
+    return arxiv_id.replace("/", "")
+
+def _record(meta):
+    versions = meta.get("versions") or []
+    version = versions[-1]["version"] if versions else ""
+    return {
+        "title": " ".join((meta.get("title") or "").split()),
+        "url": f"http://arxiv.org/pdf/{meta['id']}{version}",
+        "document_type": "arxiv",
+        "content": " ".join((meta.get("abstract") or "").split()),
+    }
+
+def _extract(job):
+    """(record, error) with the PDF text as content when it can be read (worker side)."""
+    record, location = job
+    if location is None:
+        return record, None
+    from scripts.arxiv_scraper import PDF_EXTRACTOR, pdf_to_text
+    from scripts.pdf_cache import cached_pdf_text
+    try:
+        text = cached_pdf_text(_read_pdf(location), PDF_EXTRACTOR, pdf_to_text)
+    except Exception as e:
+        return record, str(e)
+    if text.strip():
+        record["content"] = text
+    return record, None
+
+def search_snapshot_papers(query, metadata_path, pdf_source=None, max_papers=0, workers=None, queries=None):
+    """Yield arxiv.jsonl records for snapshot papers matching an API-style query.
+
+    `queries` (all configured topics) lets the first call index every topic's
+    words in one pass. Papers already yielded for an earlier query are skipped.
+    """
+    index = get_snapshot_index(metadata_path, workers)
+    index.ensure(queries or [query])
+    matches = [m for m in index.search(query) if m["id"] not in index.emitted]
+    if max_papers:
+        matches = matches[:max_papers]
+    pdfs = get_local_pdfs(pdf_source) if pdf_source else {}
+    jobs = [(_record(m), pdfs.get(_paper_key(m["id"]))) for m in matches]
+    with_pdf = sum(1 for _, location in jobs if location is not None)
+    logging.info(f"arXiv snapshot: '{query}': {len(matches)} papers, {with_pdf} with local PDFs")
+    results = index.pool().imap(_extract, jobs) if with_pdf and index.workers > 1 else map(_extract, jobs)
+    for (record, error), meta in zip(results, matches):
+        if error:
+            logging.warning(f"arXiv PDF fallback for '{record['title']}': {error}")
+        index.emitted.add(meta["id"])
+        yield record
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract arXiv papers matching the topics from a metadata snapshot.")
+    parser.add_argument("metadata")
+    parser.add_argument("--pdfs", default=os.getenv("ARXIV_PDF_DIR") or None)
+    parser.add_argument("--out", default="output/arxiv.jsonl")
+    parser.add_argument("--max-papers", type=int, default=0, help="per topic; 0 keeps every match")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("ARXIV_SNAPSHOT_WORKERS", 0)) or None)
+    args = parser.parse_args(argv)
+    from scripts.sources import load_list
+    queries = load_list("arxiv_topics.txt")
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "a", encoding="utf-8") as f:
+        for query in queries:
+            for record in search_snapshot_papers(query, args.metadata, args.pdfs, args.max_papers,
+                                                 args.workers, queries):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    get_snapshot_index(args.metadata, args.workers).close()
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    sys.exit(main())
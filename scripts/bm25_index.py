@@ -0,0 +1,352 @@
+"""On-disk BM25 index over output/processed/*.jsonl.
+
+Layout of the index directory:
+
+    manifest.json        segments, per-file watermarks, document-type names
+    seg-00001/
+        terms.bin        sorted UTF-8 terms, concatenated
+        lexicon.bin      fixed-size entries: term offset/length, df, postings offset/length
+        postings.bin     per term: zlib(delta-encoded uint32 doc ids + uint16 term frequencies)
+        doclens.bin      uint32 token count per document
+        doctypes.bin     uint8 document-type id per document
+        docs.bin         JSON line per document (title, url, document_type, file, offset)
+        docs.idx         uint64 offsets into docs.bin
+
+Segments are immutable and memory-mapped at query time; `update` appends a
+segment for lines added since the last run. Arrays use native byte order.
+Queries score each segment's postings with numpy (one vectorized pass per
+query term) and select the top k with argpartition, so a common term costs a
+decompress and a few array operations rather than a Python loop per posting;
+`python -m benchmarks.bench_bm25` measures query latency.
+
+    python -m scripts.bm25_index build [--full]
+    python -m scripts.bm25_index query "offshore wind auctions" -k 10 --type government
+"""
+import os
+import re
+import sys
+import json
+import math
+import mmap
+import zlib
+import heapq
+import shutil
+import struct
+import hashlib
+import logging
+import argparse
+from array import array
+from collections import Counter
+from operator import itemgetter
+from pathlib import Path
+import numpy as np
+
+LEXICON_ENTRY = struct.Struct("<QIIQI")  # term offset, term length, df, postings offset, postings length
+MANIFEST_VERSION = 1
+TAIL_BYTES = 4096
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by for from has have in is it its of on or that the
+this to was were will with which not no can into than then there these those also
+""".split())
+
+_token_re = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text):
+    return [t for t in _token_re.findall(text.lower()) if t not in STOPWORDS and len(t) < 64]
+
+def _tail_hash(path, offset):
+    """Hash of the bytes just before `offset`, to detect rewritten files cheaply."""
+    start = max(0, offset - TAIL_BYTES)
+    with open(path, "rb") as f:
+        f.seek(start)
+        return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+def _new_manifest():
+    return {"version": MANIFEST_VERSION, "segments": [], "files": {}, "doc_types": []}
+
+def _load_manifest(index_dir):
+    path = index_dir / "manifest.json"
+    if path.exists():
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+        logging.warning(f"Index format changed, rebuilding {index_dir}")
+    return None
+
+def _save_manifest(index_dir, manifest):
+    tmp = index_dir / "manifest.json.tmp"
+    tmp.write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+    tmp.replace(index_dir / "manifest.json")
+
+class _SegmentWriter:
+    """Accumulates the postings of one segment in memory."""
+
+    def __init__(self, doc_types):
+        self.doc_types = doc_types
+        self.postings = {}
+        self.doclens = array("I")
+        self.doctypes = array("B")
+        self.docs = []
+
+    def __len__(self):
+        return len(self.doclens)
+
+    def add(self, record, file_name, offset):
+        doc_id = len(self.doclens)
+        tokens = tokenize(f"{record.get('title') or ''}\n{record.get('content') or ''}")
+        for term, tf in Counter(tokens).items():
+            entry = self.postings.get(term)
+            if entry is None:
+                self.postings[term] = entry = (array("I"), array("H"))
+            entry[0].append(doc_id)
+            entry[1].append(min(tf, 65535))
+        doc_type = record.get("document_type") or ""
+        if doc_type not in self.doc_types:
+            if len(self.doc_types) >= 255:
+                raise ValueError("Too many document types for the index")
+            self.doc_types.append(doc_type)
+        self.doclens.append(len(tokens))
+        self.doctypes.append(self.doc_types.index(doc_type))
+        self.docs.append({"title": record.get("title"), "url": record.get("url"),
+                          "document_type": doc_type, "file": file_name, "offset": offset})
+
+    def write(self, seg_dir):
+        seg_dir.mkdir(parents=True)
+        with open(seg_dir / "terms.bin", "wb") as terms_f, \
+             open(seg_dir / "lexicon.bin", "wb") as lex_f, \
+             open(seg_dir / "postings.bin", "wb") as post_f:
+            term_off = post_off = 0
+            for term in sorted(self.postings):
+                ids, tfs = self.postings[term]
+                deltas = array("I", ids)
+                for i in range(len(deltas) - 1, 0, -1):
+                    deltas[i] -= deltas[i - 1]
+                blob = zlib.compress(deltas.tobytes() + tfs.tobytes(), 1)
+                encoded = term.encode("utf-8")
+                terms_f.write(encoded)
+                post_f.write(blob)
+                lex_f.write(LEXICON_ENTRY.pack(term_off, len(encoded), len(ids), post_off, len(blob)))
+                term_off += len(encoded)
+                post_off += len(blob)
+        with open(seg_dir / "doclens.bin", "wb") as f:
+            self.doclens.tofile(f)
+        with open(seg_dir / "doctypes.bin", "wb") as f:
+            self.doctypes.tofile(f)
+        offsets = array("Q", [0])
+        with open(seg_dir / "docs.bin", "wb") as f:
+            for doc in self.docs:
+                line = (json.dumps(doc, ensure_ascii=False) + "\n").encode("utf-8")
+                f.write(line)
+                offsets.append(offsets[-1] + len(line))
+        with open(seg_dir / "docs.idx", "wb") as f:
+            offsets.tofile(f)
+        return {"name": seg_dir.name, "docs": len(self.doclens), "total_len": sum(self.doclens)}
+
+def _iter_new_lines(path, offset):
+    """Yield (line offset, end offset, record or None) for complete lines after `offset`."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                return  # partially written line, picked up next time
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                record = None
+            yield offset, offset + len(line), record
+            offset += len(line)
+
+def update_index(processed_dir="output/processed", index_dir="output/index", full=False, segment_docs=100000):
+    """Index lines appended to processed_dir/*.jsonl since the last update.
+
+    A file that shrank or whose already-indexed bytes changed triggers a full
+    rebuild. Returns the number of newly indexed documents.
+    """
+    processed_dir, index_dir = Path(processed_dir), Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    manifest = None if full else _load_manifest(index_dir)
+
+    files = sorted(processed_dir.glob("*.jsonl"))
+    if manifest:
+        names = {p.name for p in files}
+        for name, mark in manifest["files"].items():
+            path = processed_dir / name
+            if name not in names or path.stat().st_size < mark["offset"] or _tail_hash(path, mark["offset"]) != mark["tail"]:
+                logging.info(f"Index: {name} was rewritten or removed, rebuilding the index")
+                manifest = None
+                break
+    if not manifest:
+        for child in index_dir.glob("seg-*"):
+            shutil.rmtree(child)
+        manifest = _new_manifest()
+
+    # Numbering also skips directories left behind by an interrupted update
+    next_seg = max((int(p.name.split("-")[1]) for p in index_dir.glob("seg-*")), default=0) + 1
+    writer = _SegmentWriter(manifest["doc_types"])
+    added = 0
+
+    def flush():
+        nonlocal writer, next_seg
+        if len(writer):
+            seg = writer.write(index_dir / f"seg-{next_seg:05d}")
+            manifest["segments"].append(seg)
+            next_seg += 1
+            writer = _SegmentWriter(manifest["doc_types"])
+
+    for path in files:
+        offset = manifest["files"].get(path.name, {"offset": 0})["offset"]
+        for line_offset, offset, record in _iter_new_lines(path, offset):
+            if record is None:
+                continue
+            writer.add(record, path.name, line_offset)
+            added += 1
+            if len(writer) >= segment_docs:
+                flush()
+        flush()
+        manifest["files"][path.name] = {"offset": offset, "tail": _tail_hash(path, offset)}
+        _save_manifest(index_dir, manifest)
+
+    _save_manifest(index_dir, manifest)
+    if len(manifest["segments"]) > 32:
+        logging.warning(f"Index has {len(manifest['segments'])} segments; a --full rebuild will speed up queries")
+    logging.info(f"Index: added {added} documents ({sum(s['docs'] for s in manifest['segments'])} total)")
+    return added
+
+def _mmap(path):
+    if os.path.getsize(path) == 0:
+        return b""  # empty files cannot be mapped
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+class _Segment:
+    def __init__(self, seg_dir, base):
+        self.base = base
+        self.terms = _mmap(seg_dir / "terms.bin")
+        self.lexicon = _mmap(seg_dir / "lexicon.bin")
+        self.postings = _mmap(seg_dir / "postings.bin")
+        self.doclens = np.frombuffer(_mmap(seg_dir / "doclens.bin"), dtype=np.uint32)
+        self.doctypes = np.frombuffer(_mmap(seg_dir / "doctypes.bin"), dtype=np.uint8)
+        self.docs = _mmap(seg_dir / "docs.bin")
+        self.doc_offsets = memoryview(_mmap(seg_dir / "docs.idx")).cast("Q")
+        self.n_terms = len(self.lexicon) // LEXICON_ENTRY.size
+        self._norm = None
+
+    def lookup(self, term):
+        """Binary search of the lexicon; returns (df, postings offset, length) or None."""
+        key = term.encode("utf-8")
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            t_off, t_len, df, p_off, p_len = LEXICON_ENTRY.unpack_from(self.lexicon, mid * LEXICON_ENTRY.size)
+            current = self.terms[t_off:t_off + t_len]
+            if current < key:
+                lo = mid + 1
+            elif current > key:
+                hi = mid
+            else:
+                return df, p_off, p_len
+        return None
+
+    def postings_for(self, entry):
+        """(doc ids, term frequencies) of one term as numpy arrays."""
+        df, p_off, p_len = entry
+        raw = zlib.decompress(self.postings[p_off:p_off + p_len])
+        ids = np.cumsum(np.frombuffer(raw, dtype=np.uint32, count=df), dtype=np.int64)
+        tfs = np.frombuffer(raw, dtype=np.uint16, count=df, offset=4 * df)
+        return ids, tfs
+
+    def norm(self, k1, b, avgdl):
+        """BM25 length normalization k1 * (1 - b + b * dl / avgdl) per document, cached."""
+        if self._norm is None or self._norm[0] != (k1, b, avgdl):
+            self._norm = ((k1, b, avgdl), k1 * (1 - b + b * self.doclens / avgdl))
+        return self._norm[1]
+
+    def doc(self, doc_id):
+        return json.loads(self.docs[self.doc_offsets[doc_id]:self.doc_offsets[doc_id + 1]])
+
+class BM25Index:
+    """Query side: memory-maps every segment of an index directory."""
+
+    def __init__(self, index_dir="output/index", k1=1.2, b=0.75):
+        self.index_dir = Path(index_dir)
+        self.k1, self.b = k1, b
+        manifest = _load_manifest(self.index_dir) or _new_manifest()
+        self.doc_types = manifest["doc_types"]
+        self.segments = []
+        base = 0
+        for seg in manifest["segments"]:
+            self.segments.append(_Segment(self.index_dir / seg["name"], base))
+            base += seg["docs"]
+        self.n_docs = base
+        total_len = sum(seg["total_len"] for seg in manifest["segments"])
+        self.avgdl = total_len / self.n_docs if self.n_docs else 0.0
+
+    def search(self, query, k=10, document_type=None):
+        """Top-k documents by BM25, optionally restricted to one document_type."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.n_docs:
+            return []
+        type_id = None
+        if document_type is not None:
+            if document_type not in self.doc_types:
+                return []
+            type_id = self.doc_types.index(document_type)
+
+        # Lexicon lookups first: idf needs the document frequency over all segments
+        entries = [[seg.lookup(t) for t in terms] for seg in self.segments]
+        df = [sum(e[i][0] for e in entries if e[i]) for i in range(len(terms))]
+        idf = [math.log(1 + (self.n_docs - d + 0.5) / (d + 0.5)) for d in df]
+
+        k1p1 = self.k1 + 1
+        hits = []
+        for seg, seg_entries in zip(self.segments, entries):
+            if not any(seg_entries):
+                continue
+            norm = seg.norm(self.k1, self.b, self.avgdl)
+            scores = np.zeros(len(seg.doclens))
+            for i, entry in enumerate(seg_entries):
+                if entry is None:
+                    continue
+                ids, tfs = seg.postings_for(entry)
+                tfs = tfs.astype(np.float64)
+                # Doc ids within a term are unique, so fancy-index += is safe
+                scores[ids] += idf[i] * k1p1 * tfs / (tfs + norm[ids])
+            if type_id is not None:
+                scores[seg.doctypes != type_id] = 0.0
+            candidates = np.flatnonzero(scores)
+            if len(candidates) > k:
+                candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+            hits.extend((float(scores[doc_id]), seg, int(doc_id)) for doc_id in candidates)
+
+        results = []
+        for score, seg, doc_id in heapq.nlargest(k, hits, key=itemgetter(0)):
+            doc = seg.doc(doc_id)
+            doc["score"] = round(score, 4)
+            results.append(doc)
+        return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the BM25 index of the processed corpus.")
+    parser.add_argument("--index-dir", default=os.getenv("INDEX_DIR", "output/index"))
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build")
+    build.add_argument("--processed-dir", default="output/processed")
+    build.add_argument("--full", action="store_true", help="discard the index and rebuild it")
+    query = sub.add_parser("query")
+    query.add_argument("text")
+    query.add_argument("-k", type=int, default=10)
+    query.add_argument("--type", dest="document_type")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        update_index(args.processed_dir, args.index_dir, full=args.full)
+    else:
+        index = BM25Index(args.index_dir)
+        for doc in index.search(args.text, k=args.k, document_type=args.document_type):
+            print(json.dumps(doc, ensure_ascii=False))
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    sys.exit(main())
@@ -0,0 +1,330 @@
+"""Split processed documents into overlapping token- or character-bounded
+windows and write them as fixed-size JSONL shards with a manifest.
+
+    python -m scripts.chunking --max-tokens 1024 --overlap 128 --workers 4
+"""
+import os
+import re
+import sys
+import json
+import hashlib
+import logging
+import argparse
+from pathlib import Path
+from itertools import islice
+from multiprocessing import Pool
+
+_paragraph_re = re.compile(r"\n\s*\n")
+_sentence_re = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(\[])")
+
+class RegexTokenizer:
+    """Fallback when no local tokenizer is configured: words and punctuation."""
+    name = "regex"
+    _token_re = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+    def count_batch(self, texts):
+        return [len(self._token_re.findall(t)) for t in texts]
+
+class CharCounter:
+    name = "chars"
+
+    def count_batch(self, texts):
+        return [len(t) for t in texts]
+
+class _HFTokenizer:
+    def __init__(self, name, encode_batch):
+        self.name = name
+        self._encode_batch = encode_batch
+
+    def count_batch(self, texts):
+        return [len(ids) for ids in self._encode_batch(texts)]
+
+def load_tokenizer(spec):
+    """Resolve a locally available tokenizer.
+
+    `spec` is "chars", "regex" (default), "tiktoken:<encoding>", a
+    tokenizer.json file (tokenizers) or a local model directory (transformers).
+    Nothing is downloaded.
+    """
+    if not spec or spec == "regex":
+        return RegexTokenizer()
+    if spec == "chars":
+        return CharCounter()
+    if spec.startswith("tiktoken:"):
+        import tiktoken
+        enc = tiktoken.get_encoding(spec.split(":", 1)[1])
+        return _HFTokenizer(spec, enc.encode_ordinary_batch)
+    path = Path(spec)
+    if path.is_file():
+        from tokenizers import Tokenizer
+        tok = Tokenizer.from_file(str(path))
+        return _HFTokenizer(spec, lambda texts: [e.ids for e in tok.encode_batch(texts, add_special_tokens=False)])
+    if path.is_dir():
+        from transformers import AutoTokenizer
+        tok = AutoTokenizer.from_pretrained(str(path), local_files_only=True)
+        return _HFTokenizer(spec, lambda texts: tok(texts, add_special_tokens=False)["input_ids"])
+    raise ValueError(f"Tokenizer '{spec}' is not available locally")
+
+def split_units(text, max_chars):
+    """Yield (sentence, starts_paragraph); sentences longer than max_chars are
+    split further at word boundaries."""
+    for para in _paragraph_re.split(text):
+        para = para.strip()
+        if not para:
+            continue
+        first = True
+        for sentence in _sentence_re.split(para):
+            if len(sentence) <= max_chars:
+                yield sentence, first
+                first = False
+                continue
+            piece, size = [], 0
+            for word in sentence.split(" "):
+                if piece and size + len(word) + 1 > max_chars:
+                    yield " ".join(piece), first
+                    first = False
+                    piece, size = [], 0
+                piece.append(word)
+                size += len(word) + 1
+            if piece:
+                yield " ".join(piece), first
+                first = False
+
+def _fit_units(units_per_doc, counts, max_size, tokenizer):
+    """Hard-split units still over max_size tokens after the word split (runs
+    of digits, symbols or table cells without spaces) into character pieces,
+    recounting until every unit fits."""
+    units = [(d, u) for d, doc in enumerate(units_per_doc) for u in doc]
+    while True:
+        over = [c > max_size and len(u[0]) > 1 for c, (_, u) in zip(counts, units)]
+        if not any(over):
+            break
+        split, split_counts, pieces = [], [], []
+        for (d, (text, new_para)), count, too_big in zip(units, counts, over):
+            if not too_big:
+                split.append((d, (text, new_para)))
+                split_counts.append(count)
+                continue
+            step = -(-len(text) // (-(-count // max_size) + 1))
+            for j in range(0, len(text), step):
+                split.append((d, (text[j:j + step], new_para and not j)))
+                split_counts.append(None)
+                pieces.append(text[j:j + step])
+        recounted = iter(tokenizer.count_batch(pieces))
+        units = split
+        counts = [next(recounted) if c is None else c for c in split_counts]
+    grouped = [[] for _ in units_per_doc]
+    for d, unit in units:
+        grouped[d].append(unit)
+    return grouped, counts
+
+def _windows(units, counts, max_size, overlap):
+    """Greedy packing of units into windows of at most max_size.
+
+    A full window is preferably cut at a paragraph start within its last
+    quarter; the units after the cut move to the next window, which also
+    repeats trailing units worth up to `overlap` from the emitted one.
+    """
+    window, sizes = [], []
+    for unit, size in zip(units, counts):
+        if window and sum(sizes) + size > max_size:
+            cut, tail = len(window), 0
+            for j in range(len(window) - 1, 0, -1):
+                tail += sizes[j]
+                if tail > max_size // 4:
+                    break
+                if window[j][1]:
+                    cut = j
+                    break
+            if sum(sizes[cut:]) + size > max_size:
+                cut = len(window)
+            emit, emit_sizes = window[:cut], sizes[:cut]
+            window, sizes = window[cut:], sizes[cut:]
+            yield emit, sum(emit_sizes)
+
+            room = max_size - sum(sizes) - size
+            carried = 0
+            for u, s in zip(reversed(emit), reversed(emit_sizes)):
+                if carried + s > min(overlap, room):
+                    break
+                window.insert(0, u)
+                sizes.insert(0, s)
+                carried += s
+        window.append(unit)
+        sizes.append(size)
+    if window:
+        yield window, sum(sizes)
+
+def _join(window):
+    parts = []
+    for i, (unit, new_para) in enumerate(window):
+        if i:
+            parts.append("\n\n" if new_para else " ")
+        parts.append(unit)
+    return "".join(parts)
+
+def _pack(units_per_doc, counts_per_doc, max_size, overlap, tokenizer):
+    """Windows of every document as (text, n_tokens), counted on the joined text.
+
+    Subword tokenizers can merge across the joining whitespace, so a window's
+    count may differ from the sum of its units; a document with a window over
+    max_size is repacked with its budget reduced by the excess.
+    """
+    budgets = [max_size] * len(units_per_doc)
+    packed = [[] for _ in units_per_doc]
+    todo = list(range(len(units_per_doc)))
+    while todo:
+        texts = []
+        for d in todo:
+            packed[d] = [_join(w) for w, _ in _windows(units_per_doc[d], counts_per_doc[d], budgets[d], overlap)]
+            texts.extend(packed[d])
+        sizes = iter(tokenizer.count_batch(texts) if texts else [])
+        retry = []
+        for d in todo:
+            packed[d] = [(text, next(sizes)) for text in packed[d]]
+            excess = max((n for _, n in packed[d]), default=0) - max_size
+            # Single-unit windows always fit, so the budget never needs to drop below 1
+            if excess > 0 and budgets[d] > 1:
+                budgets[d] = max(1, budgets[d] - excess)
+                retry.append(d)
+        todo = retry
+    return packed
+
+_worker_tokenizer = None
+
+def _init_worker(tokenizer_spec):
+    global _worker_tokenizer
+    _worker_tokenizer = load_tokenizer(tokenizer_spec)
+
+def chunk_batch(args):
+    """Chunk a batch of records, tokenizing all of their units in one call."""
+    records, max_size, overlap, max_unit_chars = args
+    units_per_doc = [list(split_units(r.get("content") or "", max_unit_chars)) for r in records]
+    flat = [u for units in units_per_doc for u, _ in units]
+    counts = _worker_tokenizer.count_batch(flat) if flat else []
+    if any(c > max_size for c in counts):
+        units_per_doc, counts = _fit_units(units_per_doc, counts, max_size, _worker_tokenizer)
+    counts_per_doc, pos = [], 0
+    for units in units_per_doc:
+        counts_per_doc.append(counts[pos:pos + len(units)])
+        pos += len(units)
+    out = []
+    packed = _pack(units_per_doc, counts_per_doc, max_size, overlap, _worker_tokenizer)
+    for record, windows in zip(records, packed):
+        for i, (text, size) in enumerate(windows):
+            out.append({
+                "title": record.get("title"),
+                "url": record.get("url"),
+                "document_type": record.get("document_type"),
+                "chunk_index": i,
+                "n_tokens": size,
+                "text": text,
+            })
+    return out
+
+def _iter_records(paths):
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+def _batches(records, batch_size):
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
+
+class _ShardWriter:
+    def __init__(self, out_dir, shard_size):
+        self.out_dir = out_dir
+        self.shard_size = shard_size
+        self.shards = []
+        self.f = None
+        self.count = self.tokens = 0
+        self.sha = None
+
+    def write(self, chunk):
+        if self.f is None:
+            name = f"shard-{len(self.shards):05d}.jsonl"
+            self.f = open(self.out_dir / f"{name}.tmp", "w", encoding="utf-8")
+            self.name, self.count, self.tokens, self.sha = name, 0, 0, hashlib.sha256()
+        line = json.dumps(chunk, ensure_ascii=False) + "\n"
+        self.f.write(line)
+        self.sha.update(line.encode("utf-8"))
+        self.count += 1
+        self.tokens += chunk["n_tokens"]
+        if self.count >= self.shard_size:
+            self.close()
+
+    def close(self):
+        if self.f is None:
+            return
+        self.f.close()
+        os.replace(self.out_dir / f"{self.name}.tmp", self.out_dir / self.name)
+        self.shards.append({"file": self.name, "chunks": self.count, "tokens": self.tokens,
+                            "sha256": self.sha.hexdigest()})
+        self.f = None
+
+def chunk_corpus(processed_dir="output/processed", out_dir="output/chunks", tokenizer="regex",
+                 max_tokens=1024, overlap=128, shard_size=10000, workers=None, batch_size=64):
+    """Chunk every processed/*.jsonl file into out_dir/shard-*.jsonl plus manifest.json."""
+    if overlap >= max_tokens:
+        raise ValueError("overlap must be smaller than max_tokens")
+    processed_dir, out_dir = Path(processed_dir), Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for old in out_dir.glob("shard-*.jsonl*"):
+        old.unlink()
+
+    # Units are pre-split at a character bound so one unit cannot dwarf a window
+    chars_per_unit = max_tokens if tokenizer == "chars" else max_tokens * 4
+    paths = sorted(processed_dir.glob("*.jsonl"))
+    jobs = ((batch, max_tokens, overlap, chars_per_unit) for batch in _batches(_iter_records(paths), batch_size))
+    writer = _ShardWriter(out_dir, shard_size)
+    n_docs = n_chunks = 0
+
+    # Fail fast on a bad spec: a raising Pool initializer makes the pool respawn
+    # workers forever instead of surfacing the error
+    load_tokenizer(tokenizer)
+    workers = workers or os.cpu_count() or 1
+    with Pool(workers, initializer=_init_worker, initargs=(tokenizer,)) as pool:
+        for chunks in pool.imap(chunk_batch, jobs):
+            n_docs += sum(1 for c in chunks if c["chunk_index"] == 0)
+            for chunk in chunks:
+                writer.write(chunk)
+                n_chunks += 1
+    writer.close()
+
+    manifest = {
+        "tokenizer": tokenizer, "max_tokens": max_tokens, "overlap": overlap,
+        "shard_size": shard_size, "inputs": [p.name for p in paths],
+        "documents": n_docs, "chunks": n_chunks,
+        "tokens": sum(s["tokens"] for s in writer.shards), "shards": writer.shards,
+    }
+    tmp = out_dir / "manifest.json.tmp"
+    tmp.write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+    tmp.replace(out_dir / "manifest.json")
+    logging.info(f"Chunking: {n_docs} documents -> {n_chunks} chunks in {len(writer.shards)} shards ({out_dir})")
+    return manifest
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chunk processed documents into packed training shards.")
+    parser.add_argument("--processed-dir", default="output/processed")
+    parser.add_argument("--out-dir", default=os.getenv("CHUNK_DIR", "output/chunks"))
+    parser.add_argument("--tokenizer", default=os.getenv("CHUNK_TOKENIZER", "regex"))
+    parser.add_argument("--max-tokens", type=int, default=int(os.getenv("CHUNK_MAX_TOKENS", 1024)))
+    parser.add_argument("--overlap", type=int, default=int(os.getenv("CHUNK_OVERLAP", 128)))
+    parser.add_argument("--shard-size", type=int, default=int(os.getenv("CHUNK_SHARD_SIZE", 10000)))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("CHUNK_WORKERS", 0)) or None)
+    args = parser.parse_args(argv)
+    chunk_corpus(args.processed_dir, args.out_dir, args.tokenizer, args.max_tokens,
+                 args.overlap, args.shard_size, args.workers)
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    sys.exit(main())
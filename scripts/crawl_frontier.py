@@ -0,0 +1,114 @@
+import re
+import heapq
+import itertools
+from collections import deque
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that never change the page content
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "_ga", "_gl",
+    "ref", "ref_src", "igshid", "yclid"
+}
+
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+# Energy-domain terms used to rank links when crawling best-first
+LINK_KEYWORDS = [
+    "energy", "electricity", "power", "renewable", "solar", "wind",
+    "photovoltaic", "hydro", "hydrogen", "battery", "storage", "grid",
+    "market", "tariff", "pricing", "prosumer", "demand", "efficiency",
+    "emission", "carbon", "climate", "gas", "network", "regulation",
+    "directive", "report", "publication", "policy", "transition", "consumer"
+]
+
+# Site chrome that rarely leads to documents
+NAVIGATION_HINTS = [
+    "login", "log-in", "signin", "sign-in", "register", "contact", "cookie",
+    "privacy", "legal-notice", "disclaimer", "accessibility", "sitemap",
+    "search", "careers", "vacanc", "jobs", "newsletter", "subscribe", "rss",
+    "feed", "share", "print", "tag/", "tags/", "calendar", "gallery", "video"
+]
+
+_kw_re = re.compile(r"|".join(map(re.escape, LINK_KEYWORDS)), re.I)
+_nav_re = re.compile(r"|".join(map(re.escape, NAVIGATION_HINTS)), re.I)
+
+def normalize_url(url):
+    """Canonical form used for dedup: lower-case scheme/host, no default port,
+    no fragment, tracking parameters dropped and the query string sorted.
+    User info is kept as is. Raises ValueError for a malformed port."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"
+    port = parts.port
+    netloc = host if port is None or str(port) == DEFAULT_PORTS.get(scheme) else f"{host}:{port}"
+    userinfo = parts.netloc.rpartition("@")[0]
+    if userinfo:
+        netloc = f"{userinfo}@{netloc}"
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    ]
+    query.sort()
+    return urlunsplit((scheme, netloc, parts.path or "/", urlencode(query), ""))
+
+def link_relevance(url, anchor=""):
+    """Energy-relevance score of a link from its anchor text and URL path."""
+    path = urlsplit(url).path.lower()
+    anchor = (anchor or "").lower()
+    score = 0.0
+    score += min(len(_kw_re.findall(anchor)), 3) * 1.0
+    score += min(len(_kw_re.findall(path)), 3) * 0.5
+    if _nav_re.search(path) or _nav_re.search(anchor):
+        score -= 2.0
+    if path.endswith(".pdf"):
+        score += 0.5
+    return score
+
+class CrawlFrontier:
+    """URL frontier with enqueue-time dedup on normalized URLs.
+
+    FIFO (breadth-first) by default with O(1) pops; with best_first=True,
+    links are served by descending `scorer(url, anchor)` score, ties broken
+    by depth and then discovery order.
+    """
+
+    def __init__(self, best_first=False, scorer=link_relevance):
+        self.best_first = best_first
+        self.scorer = scorer
+        self._seen = set()
+        self._fifo = deque()
+        self._heap = []
+        self._order = itertools.count()
+
+    def push(self, url, depth, anchor=""):
+        """Enqueue `url` unless it was seen before or is malformed; returns True if added."""
+        try:
+            url = normalize_url(url)
+        except ValueError:
+            return False
+        if url in self._seen:
+            return False
+        self._seen.add(url)
+        if self.best_first:
+            score = self.scorer(url, anchor)
+            heapq.heappush(self._heap, (-score, depth, next(self._order), url))
+        else:
+            self._fifo.append((url, depth))
+        return True
+
+    def pop(self):
+        if self.best_first:
+            _, depth, _, url = heapq.heappop(self._heap)
+            return url, depth
+        return self._fifo.popleft()
+
+    def __contains__(self, url):
+        try:
+            return normalize_url(url) in self._seen
+        except ValueError:
+            return False
+
+    def __len__(self):
+        return len(self._heap) if self.best_first else len(self._fifo)
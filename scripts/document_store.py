@@ -0,0 +1,210 @@
+import sys
+import json
+import sqlite3
+import hashlib
+import logging
+import argparse
+from itertools import islice
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    source        TEXT NOT NULL,
+    url           TEXT,
+    title         TEXT,
+    title_hash    INTEGER,
+    content_hash  INTEGER,
+    document_type TEXT,
+    record        TEXT NOT NULL,
+    UNIQUE (source, url)
+);
+CREATE INDEX IF NOT EXISTS documents_url ON documents (url);
+CREATE INDEX IF NOT EXISTS documents_title_hash ON documents (source, title_hash);
+CREATE INDEX IF NOT EXISTS documents_content_hash ON documents (content_hash);
+"""
+
+UPSERT = """
+INSERT INTO documents (source, url, title, title_hash, content_hash, document_type, record)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (source, url) DO UPDATE SET
+    title=excluded.title, title_hash=excluded.title_hash, content_hash=excluded.content_hash,
+    document_type=excluded.document_type, record=excluded.record
+"""
+
+def text_hash(text):
+    """Signed 64-bit hash, so it fits an indexed SQLite INTEGER column."""
+    digest = hashlib.blake2b((text or "").encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+class DocumentStore:
+    """SQLite (WAL) document store indexed by URL, title hash and content hash.
+
+    Records are grouped by `source` ("wiki", "gov", "processed/wiki", ...)
+    and upserted on (source, url); the full record is kept as JSON.
+    """
+
+    def __init__(self, path, batch_size=500):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=60000")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _row(self, source, r):
+        title = (r.get("title") or "").strip()
+        return (source, r.get("url"), title, text_hash(title), text_hash(r.get("content")),
+                r.get("document_type"), json.dumps(r, ensure_ascii=False))
+
+    def insert_many(self, source, records):
+        """Upsert `records` (any iterable, consumed lazily) in batched transactions; returns the count."""
+        records = iter(records)
+        count = 0
+        while True:
+            batch = []
+            try:
+                batch.extend(self._row(source, r) for r in islice(records, self.batch_size))
+            finally:
+                # Records collected before the producer stopped (e.g. at the
+                # collection deadline) are still stored
+                if batch:
+                    self._write_batch(batch)
+                    count += len(batch)
+            if len(batch) < self.batch_size:
+                return count
+
+    def replace_source(self, source, records):
+        """Swap every record of `source` for `records` in one transaction, so a
+        failure midway keeps the previous records; returns the count."""
+        records = iter(records)
+        count = 0
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute("DELETE FROM documents WHERE source=?", (source,))
+            while True:
+                batch = [self._row(source, r) for r in islice(records, self.batch_size)]
+                self.conn.executemany(UPSERT, batch)
+                count += len(batch)
+                if len(batch) < self.batch_size:
+                    break
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return count
+
+    def _write_batch(self, batch):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.executemany(UPSERT, batch)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def get_by_url(self, url, source=None):
+        sql, args = "SELECT record FROM documents WHERE url=?", [url]
+        if source:
+            sql, args = sql + " AND source=?", args + [source]
+        row = self.conn.execute(sql + " LIMIT 1", args).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def has_title(self, source, title):
+        title = (title or "").strip()
+        return self.conn.execute(
+            "SELECT 1 FROM documents WHERE source=? AND title_hash=? AND title=? LIMIT 1",
+            (source, text_hash(title), title)).fetchone() is not None
+
+    def has_content(self, content):
+        return self.conn.execute(
+            "SELECT 1 FROM documents WHERE content_hash=? LIMIT 1",
+            (text_hash(content),)).fetchone() is not None
+
+    def count(self, source=None):
+        if source is None:
+            return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        return self.conn.execute("SELECT COUNT(*) FROM documents WHERE source=?", (source,)).fetchone()[0]
+
+    def sources(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT source FROM documents ORDER BY source")]
+
+    def delete_source(self, source):
+        self.conn.execute("DELETE FROM documents WHERE source=?", (source,))
+
+    def iter_records(self, source, after_id=0):
+        """Stream records of `source` in insertion order, fetching in pages of batch_size."""
+        while True:
+            rows = self.conn.execute(
+                "SELECT id, record FROM documents WHERE source=? AND id>? ORDER BY id LIMIT ?",
+                (source, after_id, self.batch_size)).fetchall()
+            if not rows:
+                return
+            for after_id, record in rows:
+                yield json.loads(record)
+
+    def export_jsonl(self, source, path):
+        """Write `source` back out as JSON-Lines; returns the number of records."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        count = 0
+        with path.open("w", encoding="utf-8") as f:
+            for r in self.iter_records(source):
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+                count += 1
+        logging.info(f"Exported {count} '{source}' records to {path}")
+        return count
+
+    def import_jsonl(self, source, path):
+        """Load an existing JSON-Lines file into the store; returns the number of records."""
+        def records():
+            with Path(path).open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+        return self.insert_many(source, records())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect, import and export the SQLite document store.")
+    parser.add_argument("--db", default="output/documents.db")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("sources")
+    exp = sub.add_parser("export")
+    exp.add_argument("source")
+    exp.add_argument("path")
+    imp = sub.add_parser("import")
+    imp.add_argument("source")
+    imp.add_argument("path")
+    get = sub.add_parser("get")
+    get.add_argument("url")
+    args = parser.parse_args(argv)
+
+    store = DocumentStore(args.db)
+    try:
+        if args.command == "sources":
+            for source in store.sources():
+                print(f"{source}\t{store.count(source)}")
+        elif args.command == "export":
+            store.export_jsonl(args.source, args.path)
+        elif args.command == "import":
+            print(store.import_jsonl(args.source, args.path))
+        elif args.command == "get":
+            record = store.get_by_url(args.url)
+            if record is None:
+                return 1
+            json.dump(record, sys.stdout, ensure_ascii=False)
+            print()
+    finally:
+        store.close()
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    sys.exit(main())
@@ -1,12 +1,14 @@
 import os
 import re
-import time
 import logging
 import tempfile
-import requests
 import fitz 
 from urllib.parse import urlparse, urljoin
-from bs4 import BeautifulSoup
+from scripts.html_extract import extract_html
+from scripts.pdf_cache import cached_pdf_text
+from scripts.rate_control import polite_get
+from scripts.crawl_frontier import CrawlFrontier, normalize_url
+from scripts.sitemap_discovery import load_robots, find_sitemaps, discover_urls, SitemapState
 
 def is_english_link(url):
     if url.endswith('_en'):
@@ -28,94 +30,176 @@ def is_english_pdf(url):
             return False
     return any(ind in path for ind in ['/en/','_en','english'])
 
-def extract_page_content(url):
+def _is_english_url(url):
+    return is_english_pdf(url) if url.lower().endswith('.pdf') else is_english_link(url)
+
+def parse_page(url, html, base_domain=None):
+    """Single streaming parse of a page: (text, pdfs, title, links).
+
+    `links` holds (normalized url, anchor text) pairs on `base_domain`; it is
+    empty when no domain is given.
+    """
+    page = extract_html(html)
+    title = page["title"] or url
+    text = "\n\n".join(page["blocks"])
+    pdfs = set()
+    # normalized href -> anchor text (keep the most descriptive anchor)
+    links = {}
+    for href, anchor in page["links"]:
+        try:
+            href = urljoin(url, href)
+            netloc = urlparse(href).netloc
+        except ValueError:
+            # e.g. a broken IPv6 literal; losing one link beats losing the page
+            continue
+        if href.lower().endswith('.pdf') and is_english_pdf(href):
+            pdfs.add(href)
+        if base_domain and base_domain in netloc and is_english_link(href):
+            try:
+                href = normalize_url(href)
+            except ValueError:
+                # Malformed port
+                continue
+            if len(anchor) > len(links.get(href, "")):
+                links[href] = anchor
+            else:
+                links.setdefault(href, anchor)
+    return text, list(pdfs), title, list(links.items())
+
+def fetch_page(url, base_domain=None):
     logging.info(f"Gov crawl: fetching {url}")
     try:
-        resp = requests.get(url, timeout=10)
+        resp = polite_get(url, timeout=10)
         if resp.status_code != 200:
             logging.warning(f"Failed {url}: {resp.status_code}")
-            return "", [], ""
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        title = soup.title.string.strip() if soup.title else url
-        elems = soup.find_all(['p','h1','h2','h3','li'])
-        text = "\n".join(e.get_text(strip=True) for e in elems if e.get_text(strip=True))
-        pdfs = []
-        for a in soup.find_all('a', href=True):
-            href = urljoin(url, a['href'])
-            if href.lower().endswith('.pdf') and is_english_pdf(href):
-                pdfs.append(href)
-        return text, list(set(pdfs)), title
+            return "", [], "", []
+        return parse_page(url, resp.text, base_domain)
     except Exception as e:
         logging.error(f"Error fetching {url}: {e}")
-        return "", [], ""
+        return "", [], "", []
+
+def extract_page_content(url):
+    text, pdfs, title, _ = fetch_page(url)
+    return text, pdfs, title
 
 def get_links_from_url(url, base_domain):
-    try:
-        resp = requests.get(url, timeout=10)
-        if resp.status_code != 200:
-            return []
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        out = []
-        for a in soup.find_all('a', href=True):
-            href = urljoin(url, a['href'])
-            if base_domain in urlparse(href).netloc and is_english_link(href):
-                out.append(href)
-        return list(set(out))
-    except Exception as e:
-        logging.error(f"Link extraction failed for {url}: {e}")
-        return []
+    return fetch_page(url, base_domain)[3]
 
-def crawl_site(start_url, max_pages=30, max_depth=3):
+def crawl_site(start_url, max_pages=30, max_depth=3, best_first=False):
     base = urlparse(start_url).netloc
-    to_visit = [(start_url, 0)]
-    visited = set()
-    data = {}
-    while to_visit and len(visited) < max_pages:
-        url, depth = to_visit.pop(0)
-        if url in visited:
-            continue
-        links = get_links_from_url(url, base)
-        text, pdfs, title = extract_page_content(url)
-        data[url] = {"links": links, "text": text, "pdfs": pdfs, "title": title}
-        visited.add(url)
+    # Links are normalized and deduplicated when enqueued, so every pop is a
+    # new page; best_first spends the page budget on energy-relevant links.
+    frontier = CrawlFrontier(best_first=best_first)
+    frontier.push(start_url, 0)
+    visited = 0
+    while frontier and visited < max_pages:
+        url, depth = frontier.pop()
+        # One request and one parse yield both the page text and its links
+        text, pdfs, title, links = fetch_page(url, base)
+        visited += 1
         if depth < max_depth:
-            for link in links:
-                if link not in visited:
-                    to_visit.append((link, depth+1))
-        time.sleep(1)
-    return data
-
-def get_government_documents(start_url, max_pages=30, max_depth=3):
-    logging.info(f"Starting gov crawl at {start_url}")
-    site = crawl_site(start_url, max_pages, max_depth)
-    docs = []
-    for url, d in site.items():
-        if d["text"]:
-            docs.append({
-                "title": d["title"],
-                "url": url,
-                "document_type": "government",
-                "content": d["text"]
-            })
-        for i, pdf in enumerate(d["pdfs"], 1):
-            try:
-                pdf_text = download_and_parse_pdf_fitz(pdf)
-                docs.append({
-                    "title": f"{d['title']} (PDF {i})",
-                    "url": pdf,
+            for link, anchor in links:
+                frontier.push(link, depth+1, anchor)
+        # Hand each page to the caller as soon as it is fetched so only one
+        # page's text is held at a time.
+        yield url, {"links": [link for link, _ in links], "text": text, "pdfs": pdfs, "title": title}
+
+def sitemap_site(start_url, sitemaps, robots, max_pages=30, state=None):
+    """Like crawl_site, but pages come from the site's sitemaps instead of
+    link-following; pages whose lastmod is unchanged in `state` are skipped.
+    PDFs listed directly in a sitemap are yielded with `is_pdf` set. Each page
+    carries its sitemap `lastmod`; the caller marks it in `state` once the
+    page (or PDF) was fetched successfully."""
+    fetched = 0
+    for url, lastmod in discover_urls(start_url, sitemaps, robots, state, accept=_is_english_url):
+        if fetched >= max_pages:
+            break
+        is_pdf = url.lower().endswith('.pdf')
+        if state is not None and not state.is_changed(url, lastmod):
+            continue
+        if is_pdf:
+            title = os.path.basename(urlparse(url).path)
+            yield url, {"links": [], "text": "", "pdfs": [], "title": title, "is_pdf": True, "lastmod": lastmod}
+        else:
+            text, pdfs, title = extract_page_content(url)
+            yield url, {"links": [], "text": text, "pdfs": pdfs, "title": title, "lastmod": lastmod}
+        fetched += 1
+
+def get_pdf_document(title, pdf):
+    try:
+        pdf_text = download_and_parse_pdf_fitz(pdf)
+    except Exception:
+        logging.error(f"Failed to parse PDF {pdf}")
+        return None
+    return {
+        "title": title,
+        "url": pdf,
+        "document_type": "government",
+        "content": pdf_text
+    }
+
+def get_government_documents(start_url, max_pages=30, max_depth=3, best_first=False,
+                             discovery="crawl", sitemap_state_path="output/sitemap_state.json",
+                             pdf_handler=None):
+    # With `pdf_handler(title, pdf_url)` set, linked PDFs are handed off
+    # (e.g. to the work queue) instead of being downloaded inline.
+    state = None
+    pages = None
+    if discovery == "sitemap":
+        robots = load_robots(start_url)
+        sitemaps = find_sitemaps(start_url, robots)
+        if sitemaps:
+            logging.info(f"Starting gov sitemap discovery at {start_url} ({len(sitemaps)} sitemaps)")
+            state = SitemapState(sitemap_state_path)
+            pages = sitemap_site(start_url, sitemaps, robots, max_pages, state)
+        else:
+            logging.info(f"No sitemap for {start_url}, falling back to crawl")
+    if pages is None:
+        logging.info(f"Starting gov crawl at {start_url}")
+        pages = crawl_site(start_url, max_pages, max_depth, best_first=best_first)
+
+    try:
+        for url, d in pages:
+            if d.get("is_pdf"):
+                if pdf_handler:
+                    # The queued job retries failures itself
+                    pdf_handler(d["title"], url)
+                    if state is not None:
+                        state.mark(url, d["lastmod"])
+                else:
+                    record = get_pdf_document(d["title"], url)
+                    if record:
+                        yield record
+                        # Marked only once the record was consumed, so failures are retried
+                        if state is not None:
+                            state.mark(url, d["lastmod"])
+                continue
+            if d["text"]:
+                yield {
+                    "title": d["title"],
+                    "url": url,
                     "document_type": "government",
-                    "content": pdf_text
-                })
-            except Exception:
-                logging.error(f"Failed to parse PDF {pdf}")
-    return docs
+                    "content": d["text"]
+                }
+                if state is not None:
+                    state.mark(url, d["lastmod"])
+            for i, pdf in enumerate(d["pdfs"], 1):
+                if pdf_handler:
+                    pdf_handler(f"{d['title']} (PDF {i})", pdf)
+                    continue
+                record = get_pdf_document(f"{d['title']} (PDF {i})", pdf)
+                if record:
+                    yield record
+    finally:
+        if state is not None:
+            state.save()
 
-def download_and_parse_pdf_fitz(pdf_url):
-    resp = requests.get(pdf_url, timeout=15)
-    if resp.status_code != 200:
-        raise Exception("PDF download failed")
+# Part of the PDF cache key: bump when the extraction below changes
+PDF_EXTRACTOR = f"gov-fitz-text-v1/{fitz.VersionBind}"
+
+def parse_pdf_fitz(pdf_bytes):
     with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-        tmp.write(resp.content)
+        tmp.write(pdf_bytes)
         pdf_path = tmp.name
     text = ""
     try:
@@ -123,4 +207,11 @@ def download_and_parse_pdf_fitz(pdf_url):
             text = "\n\n".join(page.get_text("text") for page in doc)
     finally:
         os.remove(pdf_path)
-    return text
\ No newline at end of file
+    return text
+
+def download_and_parse_pdf_fitz(pdf_url):
+    resp = polite_get(pdf_url, timeout=15)
+    if resp.status_code != 200:
+        raise Exception("PDF download failed")
+    # Identical PDFs linked from many pages cost a hash instead of a parse
+    return cached_pdf_text(resp.content, PDF_EXTRACTOR, parse_pdf_fitz)
\ No newline at end of file
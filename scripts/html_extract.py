@@ -0,0 +1,196 @@
+import re
+import html
+from lxml import etree
+
+# Subtrees whose text is never content. <form> is not one: ASP.NET and
+# SharePoint pages wrap the whole body in a form
+SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+    "nav", "footer", "aside", "button", "select", "dialog"
+}
+
+# Elements holding the main content; a <header> inside them is the article's
+# own heading, not site chrome
+CONTENT_LANDMARKS = {"article", "main"}
+
+# Elements that start a new line of text
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "dl", "dt", "dd",
+    "h1", "h2", "h3", "h4", "h5", "h6", "br", "hr", "tr", "td", "th", "table",
+    "blockquote", "pre", "figcaption", "title"
+}
+
+# Elements the gov scraper keeps as page text
+CONTENT_TAGS = {"p", "h1", "h2", "h3", "li"}
+
+# class/id tokens marking navigation, cookie banners and similar chrome; a
+# token matches whole or as a -/_ separated part ("site-nav", not "shareholder").
+# "header" is left out: "page-header"/"entry-header" usually hold the <h1>,
+# while site headers are <header> elements or role="banner"
+_boilerplate_re = re.compile(
+    r"(?:^|[\s_-])(?:cookies?|consent|gdpr|banner|breadcrumbs?|nav|navbar|navigation|menu|"
+    r"footer|sidebar|social|share|sharing|newsletter|skip-?link|pagination)(?=$|[\s_-])",
+    re.I)
+_landmark_roles = {"navigation", "banner", "contentinfo", "search", "dialog", "alertdialog"}
+
+_markup_re = re.compile(r"<(?:[a-zA-Z][a-zA-Z0-9-]*[\s/>]|/[a-zA-Z]|!--|!doctype)", re.I)
+_ws_re = re.compile(r"\s+")
+_paragraph_re = re.compile(r"\n[^\S\n]*\n\s*")
+
+def has_markup(text):
+    return _markup_re.search(text) is not None
+
+def normalize_whitespace(text):
+    return _ws_re.sub(" ", text).strip()
+
+def normalize_paragraphs(text):
+    """Whitespace collapsed within paragraphs; paragraphs (split at blank
+    lines) joined by a single blank line."""
+    paragraphs = (normalize_whitespace(p) for p in _paragraph_re.split(text))
+    return "\n\n".join(p for p in paragraphs if p)
+
+def _is_boilerplate(tag, attrib, in_content=False):
+    if tag in SKIP_TAGS or (tag == "header" and not in_content):
+        return True
+    if attrib.get("role", "").lower() in _landmark_roles or attrib.get("aria-hidden") == "true":
+        return True
+    marker = f"{attrib.get('id', '')} {attrib.get('class', '')}"
+    return bool(marker.strip()) and _boilerplate_re.search(marker) is not None
+
+class _TextCollector:
+    """lxml parser target: receives SAX-style events, so no tree is built and
+    memory stays proportional to the extracted text, not the markup."""
+
+    def __init__(self, content_tags):
+        self.content_tags = content_tags
+        self.stack = []        # (tag, skipped, opened_block) per open element
+        self.skip_depth = 0
+        self.content_depth = 0 # open <article>/<main> elements
+        self.parts = []        # full text, with "\n\n" at block boundaries
+        self.blocks = []       # text of outermost content_tags elements
+        self.block = None      # pieces of the block being collected
+        self.title = []
+        self.in_title = False
+        self.links = []        # (href, anchor text), including links in boilerplate
+        self.anchor = None
+
+    def start(self, tag, attrib):
+        tag = tag.lower() if isinstance(tag, str) else ""
+        skipped = _is_boilerplate(tag, attrib, self.content_depth > 0)
+        if skipped:
+            self.skip_depth += 1
+        if tag in CONTENT_LANDMARKS:
+            self.content_depth += 1
+        opened_block = False
+        if tag == "title":
+            self.in_title = True
+        elif tag == "a" and attrib.get("href"):
+            if self.anchor is not None:
+                self.links.append((self.anchor[0], normalize_whitespace("".join(self.anchor[1]))))
+            self.anchor = (attrib["href"], [])
+        if not self.skip_depth:
+            if tag in BLOCK_TAGS:
+                self.parts.append("\n\n")
+                if self.block is not None:
+                    self.block.append(" ")
+            if tag in self.content_tags and self.block is None:
+                self.block = []
+                opened_block = True
+        self.stack.append((tag, skipped, opened_block))
+
+    def end(self, tag):
+        if not self.stack:
+            return
+        tag, skipped, opened_block = self.stack.pop()
+        if opened_block:
+            text = normalize_whitespace("".join(self.block))
+            if text:
+                self.blocks.append(text)
+            self.block = None
+        if skipped:
+            self.skip_depth -= 1
+        if tag in CONTENT_LANDMARKS:
+            self.content_depth -= 1
+        if tag == "title":
+            self.in_title = False
+        elif tag == "a" and self.anchor is not None:
+            self.links.append((self.anchor[0], normalize_whitespace("".join(self.anchor[1]))))
+            self.anchor = None
+        if tag in BLOCK_TAGS and not self.skip_depth:
+            self.parts.append("\n\n")
+            if self.block is not None:
+                self.block.append(" ")
+
+    def data(self, data):
+        if self.in_title:
+            self.title.append(data)
+            return
+        if self.anchor is not None:
+            self.anchor[1].append(data)
+        if self.skip_depth:
+            return
+        self.parts.append(data)
+        if self.block is not None:
+            self.block.append(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        if self.anchor is not None:
+            self.links.append((self.anchor[0], normalize_whitespace("".join(self.anchor[1]))))
+            self.anchor = None
+        return {
+            "title": normalize_whitespace("".join(self.title)),
+            "text": "".join(self.parts),
+            "blocks": self.blocks,
+            "links": self.links,
+        }
+
+def _chunks(source, chunk_size):
+    if isinstance(source, (str, bytes)):
+        for i in range(0, len(source), chunk_size):
+            yield source[i:i + chunk_size]
+    elif hasattr(source, "read"):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        yield from source
+
+def extract_html(source, content_tags=CONTENT_TAGS, chunk_size=1 << 16):
+    """Parse HTML from a string, bytes, file object or iterable of chunks.
+
+    Returns {"title", "text", "blocks", "links"}: `text` is all visible text
+    outside boilerplate (scripts, nav, footers, cookie banners, ...),
+    `blocks` the text of each outermost `content_tags` element, and `links`
+    every (href, anchor text) pair, including navigation links.
+    """
+    collector = _TextCollector(content_tags)
+    parser = etree.HTMLParser(target=collector, recover=True, no_network=True)
+    fed = False
+    for chunk in _chunks(source, chunk_size):
+        if chunk:
+            parser.feed(chunk)
+            fed = True
+    if not fed:
+        return collector.close()
+    try:
+        return parser.close()
+    except etree.XMLSyntaxError:
+        return collector.close()
+
+def html_to_text(raw, chunk_size=1 << 16, paragraphs=False):
+    """Visible text with whitespace collapsed; plain text skips the parser entirely.
+
+    With `paragraphs`, blank lines in plain text and HTML block boundaries
+    are kept as paragraph breaks ("\n\n").
+    """
+    if not raw:
+        return ""
+    normalize = normalize_paragraphs if paragraphs else normalize_whitespace
+    if not has_markup(raw):
+        return normalize(html.unescape(raw) if "&" in raw else raw)
+    return normalize(extract_html(raw, content_tags=(), chunk_size=chunk_size)["text"])
@@ -1,11 +1,12 @@
 import logging
 import requests
+from scripts.rate_control import polite_get
 
 def get_energy_news(api_key, query="renewable energy", max_articles=10, language="en", from_date=None):
     logging.info(f"GNews: querying '{query}' (max {max_articles}, lang={language})")
 
     url = "https://gnews.io/api/v4/search"
-    articles = []
+    yielded = 0
     page_size = 10  # Maximum allowed per request by GNews
     total_retrieved = 0
     
@@ -24,7 +25,7 @@ def get_energy_news(api_key, query="renewable energy", max_articles=10, language
             params["from"] = from_date
 
         try:
-            response = requests.get(url, params=params, timeout=10)
+            response = polite_get(url, params=params, timeout=10)
             response.raise_for_status()
             data = response.json()
             page_articles = data.get("articles", [])
@@ -34,18 +35,21 @@ def get_energy_news(api_key, query="renewable energy", max_articles=10, language
                 break  # No more articles available
 
             for item in page_articles:
+                if yielded >= max_articles:
+                    break  # Ensure exact max_articles
                 title = item.get("title")
                 news_url = item.get("url")
                 content = item.get("content") or item.get("description") or ""
 
-                articles.append({
+                yielded += 1
+                yield {
                     "title": title,
                     "url": news_url,
                     "publishedAt": item.get("publishedAt"),
                     "source": item.get("source", {}).get("name"),
                     "document_type": "news",
                     "content": content
-                })
+                }
 
             total_retrieved += len(page_articles)
 
@@ -57,6 +61,4 @@ def get_energy_news(api_key, query="renewable energy", max_articles=10, language
             logging.error(f"GNews API request error (page {page}): {e}")
             break
 
-    logging.info(f"Total articles retrieved for '{query}': {len(articles)}")
-
-    return articles[:max_articles]  # Ensure exact max_articles
\ No newline at end of file
+    logging.info(f"Total articles retrieved for '{query}': {yielded}")
\ No newline at end of file
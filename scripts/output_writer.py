@@ -0,0 +1,162 @@
+"""Background JSONL writers: one thread owns each output file."""
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from pathlib import Path
+
+_STOP = object()
+
+class OutputWriter:
+    """Queues at most `queue_bytes` of encoded lines; with `rotate_bytes`, a full file
+    is renamed to <stem>.rot<n>.jsonl and a fresh one started."""
+    def __init__(self, path, queue_bytes=4 * 1024 ** 2, batch_size=256, flush_interval=1.0,
+                 fsync=True, rotate_bytes=0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.rotate_bytes = rotate_bytes
+        self.written = self.skipped = 0
+        self.error = None
+        self.queue_bytes = queue_bytes
+        self._queue = queue.Queue()
+        self._pending = 0      # bytes of lines queued but not yet written
+        self._room = threading.Condition()
+        # Opened here so a bad path fails in the caller, not the thread
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, name=f"writer-{self.path.name}", daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        """Queue `record`; returns False (and logs) if it cannot be serialized."""
+        self._check()
+        try:
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+        except (TypeError, ValueError) as e:
+            self.skipped += 1
+            logging.error(f"Skipping unserializable record for {self.path} "
+                          f"({str(record.get('title') if isinstance(record, dict) else '')[:80]!r}): {e}")
+            return False
+        size = len(line.encode("utf-8"))
+        with self._room:
+            while self._pending and self._pending + size > self.queue_bytes and self._thread.is_alive():
+                self._room.wait()
+            self._pending += size
+        self._queue.put(line)
+        return True
+
+    def sync(self):
+        """Block until every record written so far is on disk."""
+        if not self._thread.is_alive():
+            return self._check()
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+        self._check()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        self._check()
+
+    def _check(self):
+        if self.error is not None:
+            raise IOError(f"Writer for {self.path} failed: {self.error}")
+
+    def _run(self):
+        f = self._file
+        last_flush = time.monotonic()
+        stopping = False
+        while not stopping:
+            batch, waiters = [], []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                while True:
+                    if item is _STOP:
+                        stopping = True
+                    elif isinstance(item, threading.Event):
+                        waiters.append(item)
+                    else:
+                        batch.append(item)
+                    if stopping or len(batch) >= self.batch_size:
+                        break
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                if batch and self.error is None:
+                    f.write("".join(batch))
+                    self.written += len(batch)
+                if waiters or stopping or time.monotonic() - last_flush >= self.flush_interval:
+                    self._flush(f)
+                    last_flush = time.monotonic()
+                if self.rotate_bytes and f.tell() >= self.rotate_bytes:
+                    f = self._rotate(f)
+            except Exception as e:
+                # Keep draining so producers never block forever; write() re-raises
+                self.error = e
+                logging.error(f"Writer for {self.path} failed: {e}")
+            if batch:
+                with self._room:
+                    self._pending -= sum(len(line.encode("utf-8")) for line in batch)
+                    self._room.notify_all()
+            for done in waiters:
+                done.set()
+        f.close()
+
+    def _flush(self, f):
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def _rotate(self, f):
+        self._flush(f)
+        f.close()
+        # A distinct marker keeps worker shards (gov.<worker>.jsonl) out of the numbering
+        prefix, suffix = f"{self.path.stem}.rot", self.path.suffix
+        n = 1 + max((int(p.name[len(prefix):-len(suffix)]) for p in self.path.parent.glob(f"{prefix}*{suffix}")
+                     if p.name[len(prefix):-len(suffix)].isdigit()), default=0)
+        rotated = self.path.with_name(f"{prefix}{n:05d}{suffix}")
+        os.replace(self.path, rotated)
+        logging.info(f"Rotated {self.path} -> {rotated.name}")
+        self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
+
+_writers = {}
+_lock = threading.Lock()
+
+def get_writer(path):
+    """Shared writer for `path`, configured by the OUTPUT_* environment variables."""
+    key = str(Path(path).resolve())
+    with _lock:
+        if key not in _writers:
+            _writers[key] = OutputWriter(
+                path,
+                queue_bytes=int(float(os.getenv("OUTPUT_QUEUE_MB", 4)) * 1024 ** 2),
+                batch_size=int(os.getenv("OUTPUT_BATCH_SIZE", 256)),
+                flush_interval=float(os.getenv("OUTPUT_FLUSH_SECONDS", 1.0)),
+                fsync=os.getenv("OUTPUT_FSYNC", "1") == "1",
+                rotate_bytes=int(float(os.getenv("OUTPUT_ROTATE_MB", 0)) * 1024 ** 2))
+        return _writers[key]
+
+def close_writers():
+    """Drain, fsync and close every writer; raises if any of them failed."""
+    with _lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    errors = []
+    for w in writers:
+        try:
+            w.close()
+        except IOError as e:
+            errors.append(str(e))
+    if errors:
+        raise IOError("; ".join(errors))
+
+atexit.register(close_writers)
@@ -0,0 +1,131 @@
+import os
+import zlib
+import hashlib
+import logging
+from pathlib import Path
+
+class PdfTextCache:
+    """On-disk cache of extracted PDF text keyed by SHA-256 of the PDF bytes
+    and the extractor version, stored zlib-compressed.
+
+    Entries are evicted least-recently-used first (by file mtime, refreshed
+    on every hit) once the cache grows beyond `max_bytes`. Writes go through
+    a temp file and os.replace, so concurrent workers can share a directory.
+    """
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        self.total_bytes = sum(p.stat().st_size for p in self.cache_dir.glob("*/*.z"))
+
+    def key(self, pdf_bytes):
+        """SHA-256 of the PDF; pass it to get/put to hash the bytes only once."""
+        return hashlib.sha256(pdf_bytes).hexdigest()
+
+    def _path(self, digest, extractor):
+        version = hashlib.sha256(extractor.encode("utf-8")).hexdigest()[:12]
+        return self.cache_dir / digest[:2] / f"{digest}-{version}.z"
+
+    def get(self, pdf_bytes, extractor, digest=None):
+        path = self._path(digest or self.key(pdf_bytes), extractor)
+        try:
+            data = path.read_bytes()
+        except OSError as e:
+            if not isinstance(e, FileNotFoundError):
+                logging.warning(f"PDF cache: could not read {path.name}: {e}")
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # only delays eviction of this entry
+        try:
+            text = zlib.decompress(data).decode("utf-8")
+        except (zlib.error, UnicodeDecodeError):
+            logging.warning(f"Dropping corrupt PDF cache entry {path.name}")
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return text
+
+    def put(self, pdf_bytes, extractor, text, digest=None):
+        """Store `text`; best effort, so a full or read-only disk only logs a warning."""
+        path = self._path(digest or self.key(pdf_bytes), extractor)
+        data = zlib.compress(text.encode("utf-8"), 6)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(exist_ok=True)
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            logging.warning(f"PDF cache: could not store {path.name}: {e}")
+            try:
+                tmp.unlink(missing_ok=True)
+            except OSError:
+                pass
+            return
+        self.total_bytes += len(data)
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache is at 90% of max_bytes."""
+        entries = []
+        for p in self.cache_dir.glob("*/*.z"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for _, size, p in entries:
+            if total <= target:
+                break
+            try:
+                p.unlink(missing_ok=True)
+            except OSError as e:
+                logging.warning(f"PDF cache: could not evict {p.name}: {e}")
+                continue
+            total -= size
+            removed += 1
+        self.total_bytes = total
+        logging.info(f"PDF cache: evicted {removed} entries, {total / 1024 ** 2:.0f} MiB left")
+
+    def get_or_extract(self, pdf_bytes, extractor, extract):
+        """Cached text for `pdf_bytes`, calling `extract(pdf_bytes)` only on a miss."""
+        digest = self.key(pdf_bytes)
+        text = self.get(pdf_bytes, extractor, digest)
+        if text is None:
+            text = extract(pdf_bytes)
+            self.put(pdf_bytes, extractor, text, digest)
+        return text
+
+_cache = None
+_disabled = False
+
+def get_pdf_cache():
+    """Process-wide cache configured by PDF_CACHE_DIR / PDF_CACHE_MAX_MB; None if PDF_CACHE=0."""
+    global _cache, _disabled
+    if _disabled or os.getenv("PDF_CACHE", "1") != "1":
+        return None
+    if _cache is None:
+        try:
+            _cache = PdfTextCache(os.getenv("PDF_CACHE_DIR", "output/cache/pdf_text"),
+                                  max_bytes=int(os.getenv("PDF_CACHE_MAX_MB", 2048)) * 1024 ** 2)
+        except OSError as e:
+            logging.warning(f"PDF cache disabled: {e}")
+            _disabled = True
+            return None
+    return _cache
+
+def cached_pdf_text(pdf_bytes, extractor, extract):
+    cache = get_pdf_cache()
+    if cache is None:
+        return extract(pdf_bytes)
+    return cache.get_or_extract(pdf_bytes, extractor, extract)
@@ -1,17 +1,18 @@
+import os
 import json
-import re
+import shutil
+import hashlib
 import logging
 from pathlib import Path
-from bs4 import BeautifulSoup
 from langdetect import detect, DetectorFactory
-import string
+from scripts.html_extract import html_to_text
+from scripts.quality_filter import QualityFilter, CORRUPTION_RULES
+from scripts.fingerprint_set import make_seen_set, describe
 
 def strip_html(raw_html: str) -> str:
-    soup = BeautifulSoup(raw_html, "html.parser")
-    for script_or_style in soup(["script", "style"]):
-        script_or_style.decompose()
-    text = soup.get_text(separator=" ")
-    return re.sub(r"\s+", " ", text).strip()
+    # Plain-text records (most Wikipedia/arXiv content) never reach a parser;
+    # paragraph breaks are kept for chunking
+    return html_to_text(raw_html, paragraphs=True)
 
 def is_english(text: str) -> bool:
     DetectorFactory.seed = 0
@@ -20,67 +21,250 @@ def is_english(text: str) -> bool:
     except Exception:
         return False
 
-def is_text_corrupted(text, threshold=0.3):
-    printable_chars = set(string.printable)
-    if not text:
-        return True
-    non_printable_count = sum(1 for c in text if c not in printable_chars)
-    corruption_ratio = non_printable_count / len(text)
-    return corruption_ratio > threshold
+def _iter_lines(paths):
+    for path in paths:
+        with path.open("r", encoding="utf-8") as fin:
+            yield from fin
 
-def preprocess_jsonl_file(input_path: Path, output_path: Path):
+def _parse_lines(lines):
+    for line in lines:
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            yield None  # still counted as an input line
+
+def _seen_titles_path(name):
+    # DEDUP_DIR keeps the title fingerprints in an mmap'd file instead of RAM
+    dedup_dir = os.getenv("DEDUP_DIR")
+    if not dedup_dir:
+        return None
+    return Path(dedup_dir) / f"{Path(name).stem}.{os.getenv('DEDUP_MODE', 'exact').lower()}"
+
+def preprocess_records(records, name, quality_filter=None, seen_titles=None):
+    """Yield cleaned copies of `records` (None entries count as unparsable input).
+
+    `seen_titles` is a scripts.fingerprint_set set; by default a new one
+    configured by DEDUP_MODE / DEDUP_FP_RATE / DEDUP_DIR.
+    """
+    quality_filter = quality_filter or QualityFilter.from_env()
     original_count = 0
     dedup_removed = 0
     lang_removed = 0
     corruption_removed = 0
+    quality_removed = 0
     final_count = 0
 
-    seen_titles = set()
+    own_seen = seen_titles is None
+    if own_seen:
+        path = _seen_titles_path(name)
+        if path is not None:
+            path.unlink(missing_ok=True)
+        seen_titles = make_seen_set(path=path)
 
     # Combined steps (HTML stripping, deduplication, language, corruption check)
-    with input_path.open("r", encoding="utf-8") as fin, \
-         output_path.open("w", encoding="utf-8") as fout:
-
-        for line in fin:
-            original_count += 1
-            try:
-                obj = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-
-            title = obj.get("title", "").strip()
-            if not title or title in seen_titles:
-                dedup_removed += 1
-                continue
-            seen_titles.add(title)
-
-            raw = obj.get("content", "").strip()
-            # 1) drop PDF‐gibberish *before* any BeautifulSoup pass
-            if is_text_corrupted(raw):
-                corruption_removed += 1
-                continue
-
-            # 2) now do the expensive HTML strip
-            content = strip_html(raw)
-
-            # 3) language filter
-            if len(content) >= 50 and not is_english(content):
-                lang_removed += 1
-                continue
-
-            if is_text_corrupted(content):
-                corruption_removed += 1
-                continue
-
-            obj["content"] = content
-            json.dump(obj, fout, ensure_ascii=False)
-            fout.write("\n")
-            final_count += 1
-
-            if original_count % 10000 == 0:
-                logging.info(f"Processed {original_count} lines from {input_path.name}...")
-
-    logging.info(f"Deduplication removed {dedup_removed} articles from {input_path.name}")
-    logging.info(f"Language filtering removed {lang_removed} articles from {input_path.name}")
-    logging.info(f"Corruption filtering removed {corruption_removed} articles from {input_path.name}")
-    logging.info(f"Processed {input_path.name}: {original_count} -> {final_count} articles")
\ No newline at end of file
+    for obj in records:
+        original_count += 1
+        if obj is None:
+            continue
+
+        title = obj.get("title", "").strip()
+        if not title or not seen_titles.add(title):
+            dedup_removed += 1
+            continue
+
+        raw = obj.get("content", "").strip()
+        # 1) drop PDF‐gibberish *before* any HTML parsing
+        if quality_filter.check(raw, CORRUPTION_RULES):
+            corruption_removed += 1
+            continue
+
+        # 2) now do the expensive HTML strip
+        content = strip_html(raw)
+
+        # 3) language filter
+        if len(content) >= 50 and not is_english(content):
+            lang_removed += 1
+            continue
+
+        # 4) full quality rules on the plain text
+        if quality_filter.check(content):
+            quality_removed += 1
+            continue
+
+        obj["content"] = content
+        final_count += 1
+        yield obj
+
+        if original_count % 10000 == 0:
+            logging.info(f"Processed {original_count} lines from {name}...")
+
+    logging.info(f"Deduplication removed {dedup_removed} articles from {name}")
+    logging.info(f"Language filtering removed {lang_removed} articles from {name}")
+    logging.info(f"Corruption filtering removed {corruption_removed} articles from {name}")
+    logging.info(f"Quality filtering removed {quality_removed} articles from {name}")
+    quality_filter.log_drops(name)
+    logging.info(f"Title {describe(seen_titles)} ({name})")
+    if own_seen:
+        seen_titles.close()
+    logging.info(f"Processed {name}: {original_count} -> {final_count} articles")
+
+STATE_VERSION = 1
+TAIL_BYTES = 4096
+
+def _file_id(path):
+    # Survives renames, so a rotated file (wiki.jsonl -> wiki.rot00001.jsonl) keeps its watermark
+    st = path.stat()
+    return f"{st.st_dev}:{st.st_ino}"
+
+def _tail_hash(path, offset):
+    """Hash of the bytes just before `offset`, to detect rewritten files cheaply."""
+    start = max(0, offset - TAIL_BYTES)
+    with open(path, "rb") as f:
+        f.seek(start)
+        return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+def _iter_new_lines(paths, marks):
+    """Complete lines after each file's watermark; marks[file id] advances as lines are read."""
+    for path in paths:
+        key = _file_id(path)
+        offset = marks.get(key, {}).get("offset", 0)
+        with path.open("rb") as fin:
+            fin.seek(offset)
+            for line in fin:
+                if not line.endswith(b"\n"):
+                    break  # partially written line, picked up next time
+                offset += len(line)
+                marks[key] = {"name": path.name, "offset": offset}
+                yield line.decode("utf-8", errors="replace")
+
+def _state_paths(output_path):
+    state_dir = output_path.parent / ".state"
+    return state_dir, state_dir / f"{output_path.stem}.json"
+
+def _dedup_file(state_dir, output_path, generation, mode):
+    return state_dir / f"{output_path.stem}.{generation}.{mode}"
+
+def _load_state(output_path, input_paths, dedup_mode):
+    """The previous run's state if an incremental run can continue from it, else None."""
+    state_dir, state_file = _state_paths(output_path)
+    if not state_file.exists():
+        return None, "no previous state"
+    state = json.loads(state_file.read_text(encoding="utf-8"))
+    if state.get("version") != STATE_VERSION or state.get("dedup_mode") != dedup_mode:
+        return None, "state format or DEDUP_MODE changed"
+    if not _dedup_file(state_dir, output_path, state["generation"], dedup_mode).exists():
+        return None, "dedup state missing"
+    if not output_path.exists() or output_path.stat().st_size < state["output_size"]:
+        return None, "processed output shrank"
+    current = {_file_id(p): p for p in input_paths if p.exists()}
+    marks = {}
+    for key, mark in state["files"].items():
+        path = current.get(key)
+        if path is None:
+            continue  # raw file removed; its documents stay in the output
+        if path.stat().st_size < mark["offset"] or _tail_hash(path, mark["offset"]) != mark["tail"]:
+            return None, f"{path.name} was rewritten"
+        marks[key] = {"name": path.name, "offset": mark["offset"]}
+    state["files"] = marks
+    return state, None
+
+def _save_state(output_path, state):
+    state_dir, state_file = _state_paths(output_path)
+    tmp = state_file.with_name(state_file.name + ".tmp")
+    tmp.write_text(json.dumps(state, indent=1), encoding="utf-8")
+    os.replace(tmp, state_file)
+
+def preprocess_jsonl_file(input_path, output_path: Path, store=None, mode=None):
+    """Preprocess raw JSONL file(s) into `output_path`.
+
+    `input_path` may also be a list of files (e.g. per-worker shards) that are
+    deduplicated together into one output file. In incremental mode (default,
+    PREPROCESS_MODE=incremental) only lines appended since the last run are
+    read, titles are deduplicated against every earlier run, and the results
+    are appended; a rewritten input, changed DEDUP_MODE or missing state falls
+    back to a full rebuild (PREPROCESS_MODE=full). Missing inputs are skipped;
+    without any input the output is left untouched.
+    """
+    input_paths = [input_path] if isinstance(input_path, Path) else list(input_path)
+    for path in input_paths:
+        if not path.exists():
+            logging.warning(f"Preprocessing {output_path.name}: input {path} not found, skipping it")
+    input_paths = [p for p in input_paths if p.exists()]
+    if not input_paths:
+        return
+
+    if store is not None:
+        # Target the document store instead: the new build replaces "processed/<name>"
+        cleaned = preprocess_records(_parse_lines(_iter_lines(input_paths)), output_path.name)
+        store.replace_source(f"processed/{output_path.stem}", cleaned)
+        return
+
+    mode = (mode or os.getenv("PREPROCESS_MODE", "incremental")).lower()
+    dedup_mode = os.getenv("DEDUP_MODE", "exact").lower()
+    if dedup_mode == "set":
+        # A Python set of titles cannot be persisted between runs
+        mode = "full"
+
+    state, reason = (None, "full rebuild requested") if mode == "full" else _load_state(output_path, input_paths, dedup_mode)
+    if mode != "full" and state is None:
+        logging.info(f"Preprocessing {output_path.name}: full rebuild ({reason})")
+
+    state_dir, state_file = _state_paths(output_path)
+    state_dir.mkdir(parents=True, exist_ok=True)
+    if state is None:
+        # The old state must never be paired with the rebuilt output, even if
+        # the rebuild crashes or (DEDUP_MODE=set) saves no state of its own
+        state_file.unlink(missing_ok=True)
+    old_generation = state["generation"] if state else None
+    generation = (old_generation or 0) + 1
+    old_dedup = _dedup_file(state_dir, output_path, old_generation, dedup_mode) if state else None
+    new_dedup = _dedup_file(state_dir, output_path, generation, dedup_mode)
+    new_dedup.unlink(missing_ok=True)
+    if old_dedup is not None:
+        # Work on a copy: the previous generation stays valid until the new state is saved
+        shutil.copyfile(old_dedup, new_dedup)
+    seen_titles = make_seen_set(dedup_mode, path=None if dedup_mode == "set" else new_dedup)
+
+    marks = dict(state["files"]) if state else {}
+    cleaned = preprocess_records(_parse_lines(_iter_new_lines(input_paths, marks)), output_path.name,
+                                 seen_titles=seen_titles)
+    if state:
+        # Drop whatever a crashed run appended after the last saved state
+        with output_path.open("r+b") as fout:
+            fout.truncate(state["output_size"])
+        out_file, out_mode = output_path, "a"
+    else:
+        out_file, out_mode = output_path.with_name(output_path.name + ".tmp"), "w"
+    try:
+        with out_file.open(out_mode, encoding="utf-8") as fout:
+            for obj in cleaned:
+                json.dump(obj, fout, ensure_ascii=False)
+                fout.write("\n")
+            fout.flush()
+            os.fsync(fout.fileno())
+        if out_file != output_path:
+            os.replace(out_file, output_path)
+    finally:
+        if out_file != output_path:
+            out_file.unlink(missing_ok=True)
+        seen_titles.close()
+
+    if dedup_mode == "set":
+        return
+    for key, mark in marks.items():
+        path = next(p for p in input_paths if p.name == mark["name"])
+        mark["tail"] = _tail_hash(path, mark["offset"])
+    _save_state(output_path, {
+        "version": STATE_VERSION, "dedup_mode": dedup_mode, "generation": generation,
+        "output_size": output_path.stat().st_size, "files": marks,
+    })
+    if old_dedup is not None:
+        old_dedup.unlink(missing_ok=True)
+    for stale in state_dir.glob(f"{output_path.stem}.*.{dedup_mode}"):
+        if stale != new_dedup:
+            stale.unlink(missing_ok=True)
+
+def preprocess_store(store, source):
+    """Preprocess raw `source` records held in the document store into "processed/<source>"."""
+    cleaned = preprocess_records(store.iter_records(source), f"{source} (store)")
+    store.replace_source(f"processed/{source}", cleaned)
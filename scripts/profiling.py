@@ -0,0 +1,99 @@
+import os
+import re
+import time
+import logging
+import cProfile
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+PROFILE_MODES = ("cpu", "memory")
+
+def profile_modes():
+    """Parse the PROFILE env flag, e.g. "cpu", "memory" or "cpu,memory"."""
+    raw = os.getenv("PROFILE", "").strip().lower()
+    if raw in ("", "0", "off", "none"):
+        return set()
+    if raw in ("1", "all"):
+        return set(PROFILE_MODES)
+    modes = {m.strip() for m in raw.split(",") if m.strip()}
+    unknown = modes - set(PROFILE_MODES)
+    if unknown:
+        logging.warning(f"Ignoring unknown PROFILE modes: {sorted(unknown)}")
+    return modes & set(PROFILE_MODES)
+
+def _stage_prefix(stage, out_dir):
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", stage).strip("_") or "stage"
+    prefix = f"{safe}-{time.strftime('%Y%m%d-%H%M%S')}"
+    # A stage can run several times within a second (e.g. one slice per scheduler job)
+    n = 1
+    while any(out_dir.glob(f"{prefix}.*")):
+        n += 1
+        prefix = f"{safe}-{time.strftime('%Y%m%d-%H%M%S')}-{n}"
+    return prefix
+
+def _write_cpu_report(profiler, base, top_n):
+    profiler.dump_stats(f"{base}.prof")
+    with open(f"{base}.cpu.txt", "w", encoding="utf-8") as f:
+        stats = pstats.Stats(profiler, stream=f)
+        stats.sort_stats("cumulative").print_stats(top_n)
+        stats.sort_stats("tottime").print_stats(top_n)
+
+def _write_memory_report(snapshot, peak, base, top_n):
+    snapshot.dump(f"{base}.tracemalloc")
+    top = snapshot.statistics("lineno")[:top_n]
+    with open(f"{base}.memory.txt", "w", encoding="utf-8") as f:
+        f.write(f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB\n")
+        f.write(f"Top {len(top)} allocation sites:\n")
+        for stat in top:
+            f.write(f"{stat}\n")
+
+@contextmanager
+def profile_stage(stage, profile_dir=None, top_n=None):
+    """Profile a pipeline stage when PROFILE=cpu|memory is set; no-op otherwise.
+
+    Writes <stage>-<timestamp>.prof / .cpu.txt (cProfile) and
+    .tracemalloc / .memory.txt (tracemalloc) into PROFILE_DIR (logs/profiles).
+    """
+    modes = profile_modes()
+    if not modes:
+        yield
+        return
+
+    out_dir = Path(profile_dir or os.getenv("PROFILE_DIR", "logs/profiles"))
+    out_dir.mkdir(parents=True, exist_ok=True)
+    top_n = top_n or int(os.getenv("PROFILE_TOP_N", 30))
+    base = out_dir / _stage_prefix(stage, out_dir)
+
+    profiler = cProfile.Profile() if "cpu" in modes else None
+    # Nested stages share the outer tracemalloc session instead of resetting it.
+    own_tracing = "memory" in modes and not tracemalloc.is_tracing()
+    if own_tracing:
+        tracemalloc.start()
+    elif "memory" in modes:
+        tracemalloc.reset_peak()
+
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+        elapsed = time.perf_counter() - start
+        try:
+            if profiler:
+                _write_cpu_report(profiler, base, top_n)
+            if "memory" in modes:
+                snapshot = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                _write_memory_report(snapshot, peak, base, top_n)
+                logging.info(f"Profile '{stage}': peak traced memory {peak / 1024 / 1024:.1f} MiB")
+        except Exception as e:
+            logging.error(f"Writing profile for '{stage}' failed: {e}")
+        finally:
+            if own_tracing:
+                tracemalloc.stop()
+        logging.info(f"Profile '{stage}': {elapsed:.1f}s, reports in {out_dir}/{base.name}.*")
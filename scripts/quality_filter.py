@@ -0,0 +1,159 @@
+import os
+import re
+import logging
+from collections import Counter
+
+# Byte classes counted with bytes.translate(None, ...), which runs in C.
+# ASCII whitespace (incl. the form feeds of PDF text) is printable, as in
+# string.printable. Non-ASCII UTF-8 bytes are deliberately absent: accented
+# EU names and "€" are legitimate text, not corruption.
+CONTROL_BYTES = bytes(b for b in range(32) if b not in (9, 10, 11, 12, 13)) + b"\x7f"
+DIGIT_BYTES = b"0123456789"
+SYMBOL_BYTES = b"#$%&*+<=>@[\\]^_`{|}~"
+WHITESPACE_BYTES = b" \t\n\r\x0b\x0c"
+
+# UTF-8 forms of C1 controls (U+0080-U+009F) and private-use characters
+# (U+E000-U+F8FF), typical of broken PDF fonts. Each pattern starts with a
+# literal byte so the regex engine can skip ahead with a fast search.
+_c1_re = re.compile(rb"\xc2[\x80-\x9f]")
+_private_use_re = re.compile(rb"\xef[\x80-\xa3]")
+
+DEFAULT_THRESHOLDS = {
+    "min_chars": 1,
+    "min_printable_ratio": 0.7,
+    "max_replacement_ratio": 0.05,
+    "max_symbol_ratio": 0.25,
+    "max_digit_ratio": 0.5,
+    "min_avg_word_length": 2.0,
+    "max_avg_word_length": 15.0,
+    "max_repeated_line_ratio": 0.5,
+    # Word-length and repeated-line rules only apply to texts this large
+    "min_words_for_word_rules": 20,
+    "min_lines_for_line_rules": 10,
+}
+
+# Rules that are meaningful on raw (possibly HTML) content, before stripping;
+# these are the only ones on by default
+CORRUPTION_RULES = ("empty", "printable", "replacement")
+# Opt-in content rules (QUALITY_RULES=all or e.g. QUALITY_RULES=symbols,repeated_lines)
+CONTENT_RULES = ("symbols", "digits", "word_length", "repeated_lines")
+ALL_RULES = CORRUPTION_RULES + CONTENT_RULES
+
+def text_stats(text, full=True):
+    """Text-quality statistics computed with a handful of C-level scans.
+
+    With full=False only the corruption statistics (printable and
+    replacement-char ratios) are computed.
+    """
+    n_chars = len(text)
+    data = text.encode("utf-8", "replace")
+    n_bytes = len(data)
+    control = n_bytes - len(data.translate(None, CONTROL_BYTES))
+    if n_bytes != n_chars:
+        control += len(_c1_re.findall(data)) + data.count(b"\xee") + len(_private_use_re.findall(data))
+    replacement = text.count("\ufffd")
+    denom = n_chars or 1
+    stats = {
+        "chars": n_chars,
+        "printable_ratio": 1.0 - control / denom,
+        "replacement_ratio": replacement / denom,
+    }
+    if not full:
+        return stats
+
+    n_words = len(data.split())
+    word_bytes = len(data.translate(None, WHITESPACE_BYTES))
+    # Measured in bytes, so words with accented letters count slightly longer
+    avg_word_length = word_bytes / n_words if n_words else 0.0
+
+    lines = text.splitlines()
+    unique = set(lines)
+    blank = "" in unique
+    n_lines = len(lines) - lines.count("") if blank else len(lines)
+    repeated_line_ratio = (n_lines - (len(unique) - blank)) / n_lines if n_lines else 0.0
+
+    digits = n_bytes - len(data.translate(None, DIGIT_BYTES))
+    symbols = n_bytes - len(data.translate(None, SYMBOL_BYTES))
+    stats.update({
+        "words": n_words,
+        "lines": n_lines,
+        "symbol_ratio": symbols / denom,
+        "digit_ratio": digits / denom,
+        "avg_word_length": avg_word_length,
+        "repeated_line_ratio": repeated_line_ratio,
+    })
+    return stats
+
+class QualityFilter:
+    """Configurable text-quality rules with per-rule drop counts.
+
+    `check(text)` returns the name of the first failing enabled rule, or None
+    if the text passes; `drops` counts how often each rule fired. Only the
+    corruption rules are enabled unless `rules` says otherwise.
+    """
+
+    def __init__(self, rules=CORRUPTION_RULES, **thresholds):
+        if rules == "all":
+            rules = ALL_RULES
+        unknown = set(rules) - set(ALL_RULES)
+        if unknown:
+            raise ValueError(f"Unknown quality rules: {sorted(unknown)}")
+        unknown = set(thresholds) - set(DEFAULT_THRESHOLDS)
+        if unknown:
+            raise ValueError(f"Unknown quality thresholds: {sorted(unknown)}")
+        self.rules = set(rules) | {"empty"}
+        self.thresholds = {**DEFAULT_THRESHOLDS, **thresholds}
+        self.drops = Counter()
+
+    @classmethod
+    def from_env(cls):
+        """Rules from QUALITY_RULES ("all" or a comma list of CONTENT_RULES added to
+        the corruption rules); thresholds overridable as QUALITY_<NAME>, e.g.
+        QUALITY_MAX_SYMBOL_RATIO=0.3."""
+        raw_rules = os.getenv("QUALITY_RULES", "").strip().lower()
+        if raw_rules == "all":
+            rules = ALL_RULES
+        else:
+            rules = CORRUPTION_RULES + tuple(r.strip() for r in raw_rules.split(",") if r.strip())
+        overrides = {}
+        for name, default in DEFAULT_THRESHOLDS.items():
+            raw = os.getenv(f"QUALITY_{name.upper()}")
+            if raw is not None:
+                overrides[name] = type(default)(raw)
+        return cls(rules, **overrides)
+
+    def failed_rule(self, text, rules=None):
+        t = self.thresholds
+        if not text or len(text) < t["min_chars"]:
+            return "empty"
+        active = self.rules if rules is None else self.rules & set(rules)
+        full = any(r not in CORRUPTION_RULES for r in active)
+        s = text_stats(text, full=full)
+        checks = [
+            ("printable", s["printable_ratio"] < t["min_printable_ratio"]),
+            ("replacement", s["replacement_ratio"] > t["max_replacement_ratio"]),
+        ]
+        if full:
+            checks += [
+                ("symbols", s["symbol_ratio"] > t["max_symbol_ratio"]),
+                ("digits", s["digit_ratio"] > t["max_digit_ratio"]),
+                ("word_length", s["words"] >= t["min_words_for_word_rules"] and not
+                    (t["min_avg_word_length"] <= s["avg_word_length"] <= t["max_avg_word_length"])),
+                ("repeated_lines", s["lines"] >= t["min_lines_for_line_rules"] and
+                    s["repeated_line_ratio"] > t["max_repeated_line_ratio"]),
+            ]
+        for rule, failed in checks:
+            if failed and rule in active:
+                return rule
+        return None
+
+    def check(self, text, rules=None):
+        """Like failed_rule, but also records the drop."""
+        rule = self.failed_rule(text, rules)
+        if rule is not None:
+            self.drops[rule] += 1
+        return rule
+
+    def log_drops(self, name):
+        summary = ", ".join(f"{rule}={n}" for rule, n in self.drops.most_common()) or "none"
+        logging.info(f"Quality filter drops for {name}: {summary}")
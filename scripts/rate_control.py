@@ -0,0 +1,234 @@
+"""Per-host adaptive rate control (AIMD) shared by every HTTP collector.
+
+Each host starts at RATE_INITIAL requests/second. Fast successful responses
+add RATE_STEP req/s, slow responses trim the rate, and 429/503 responses or
+connection errors halve it. A Retry-After header pauses the host for the
+given time. Client libraries that make their own requests (Wikipedia, arXiv
+search) are paced per call with paced(). Current per-host rates are logged
+and written to logs/rate_control.json.
+"""
+import os
+import json
+import time
+import logging
+import threading
+import requests
+from pathlib import Path
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from email.utils import parsedate_to_datetime
+
+THROTTLE_STATUSES = {429, 503}
+
+class BudgetExhausted(BaseException):
+    """Raised by acquire() once the collection deadline has passed or the
+    request limit is reached. Derived
+    from BaseException (like KeyboardInterrupt) so the collectors' broad
+    `except Exception` handlers do not swallow it."""
+
+class _Host:
+    def __init__(self, rate):
+        self.rate = rate
+        self.next_at = 0.0        # earliest start time of the next request
+        self.latency = None       # EWMA of response time, seconds
+        self.requests = self.bytes = self.throttled = self.errors = 0
+
+    def snapshot(self):
+        return {
+            "rate": round(self.rate, 3),
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "requests": self.requests, "bytes": self.bytes, "throttled": self.throttled, "errors": self.errors,
+        }
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when - (now or time.time()))
+
+class RateController:
+    def __init__(self, initial_rate=1.0, min_rate=0.05, max_rate=5.0, step=0.1,
+                 latency_target=2.0, max_retries=3, max_retry_after=300,
+                 metrics_path=None, metrics_interval=30):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.step = step
+        self.latency_target = latency_target
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+        self.metrics_path = Path(metrics_path) if metrics_path else None
+        self.metrics_interval = metrics_interval
+        self._last_metrics = 0.0
+        self.hosts = {}
+        # Run totals across hosts, read by the budget scheduler
+        self.total_requests = self.total_bytes = 0
+        # time.monotonic() after which no request starts; set by the budget scheduler
+        self.deadline = None
+        # total_requests value at which no further request starts; set by the budget scheduler
+        self.request_limit = None
+        self._cond = threading.Condition()
+
+    def _host(self, host):
+        if host not in self.hosts:
+            self.hosts[host] = _Host(self.initial_rate)
+        return self.hosts[host]
+
+    def acquire(self, host):
+        """Block until the pacing interval of `host` has passed."""
+        with self._cond:
+            h = self._host(host)
+            while True:
+                now = time.monotonic()
+                if self.deadline is not None and now >= self.deadline:
+                    raise BudgetExhausted(f"collection deadline passed before requesting {host}")
+                if self.request_limit is not None and self.total_requests >= self.request_limit:
+                    raise BudgetExhausted(f"request budget used up before requesting {host}")
+                if now >= h.next_at:
+                    break
+                wait = h.next_at - now
+                if self.deadline is not None:
+                    wait = min(wait, self.deadline - now)
+                self._cond.wait(wait)
+            h.next_at = now + 1.0 / h.rate
+            h.requests += 1
+            self.total_requests += 1
+
+    def set_deadline(self, deadline):
+        with self._cond:
+            self.deadline = deadline
+            self._cond.notify_all()
+
+    def set_request_limit(self, limit):
+        with self._cond:
+            self.request_limit = limit
+
+    def release(self, host, latency=None, status=None, retry_after=None, error=False, nbytes=0):
+        with self._cond:
+            h = self._host(host)
+            h.bytes += nbytes
+            self.total_bytes += nbytes
+            if latency is not None:
+                h.latency = latency if h.latency is None else 0.8 * h.latency + 0.2 * latency
+            if error or status in THROTTLE_STATUSES:
+                # Multiplicative decrease
+                if error:
+                    h.errors += 1
+                else:
+                    h.throttled += 1
+                h.rate = max(self.min_rate, h.rate / 2)
+                pause = min(retry_after, self.max_retry_after) if retry_after is not None else 1.0 / h.rate
+                h.next_at = max(h.next_at, time.monotonic() + pause)
+                logging.warning(f"Rate control: backing off {host} to {h.rate:.2f} req/s, "
+                                f"pause {pause:.1f}s "
+                                f"({'error' if error else status})")
+            elif latency is not None and latency > self.latency_target:
+                h.rate = max(self.min_rate, h.rate * 0.8)
+            else:
+                # Additive increase
+                h.rate = min(self.max_rate, h.rate + self.step)
+            self._cond.notify_all()
+        self._maybe_write_metrics()
+
+    def request(self, method, url, **kwargs):
+        """requests.request paced for the URL's host. 429/503 responses are
+        retried up to max_retries times; the last response is returned."""
+        host = urlparse(url).netloc
+        for attempt in range(self.max_retries + 1):
+            self.acquire(host)
+            start = time.monotonic()
+            resp, error = None, False
+            try:
+                resp = requests.request(method, url, **kwargs)
+            except requests.RequestException:
+                error = True
+                raise
+            finally:
+                if resp is None:
+                    self.release(host, time.monotonic() - start, error=error)
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+            self.release(host, time.monotonic() - start, resp.status_code, retry_after, nbytes=len(resp.content))
+            if resp.status_code not in THROTTLE_STATUSES or attempt == self.max_retries:
+                return resp
+            logging.info(f"Rate control: {resp.status_code} from {host}, retry {attempt + 1}/{self.max_retries}")
+        return resp
+
+    @contextmanager
+    def paced(self, host, backoff_on=()):
+        """Pace one client-library call that makes its own HTTP requests to
+        `host`. Connection errors and `backoff_on` exceptions back the host off;
+        a `status` attribute of 429/503 on them (e.g. arxiv.HTTPError) counts
+        as throttling."""
+        self.acquire(host)
+        start = time.monotonic()
+        status, error = None, False
+        try:
+            yield
+        except (requests.RequestException, *backoff_on) as e:
+            status = getattr(e, "status", None)
+            error = status not in THROTTLE_STATUSES
+            raise
+        finally:
+            self.release(host, time.monotonic() - start, status if not error else None, error=error)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request("HEAD", url, **kwargs)
+
+    def snapshot(self):
+        with self._cond:
+            return {host: h.snapshot() for host, h in sorted(self.hosts.items())}
+
+    def log_rates(self):
+        for host, s in self.snapshot().items():
+            logging.info(f"Rate control: {host} {s['rate']} req/s, "
+                         f"latency {s['latency']}s, {s['requests']} requests, "
+                         f"{s['throttled']} throttled, {s['errors']} errors")
+        self.write_metrics()
+
+    def write_metrics(self):
+        if self.metrics_path is None:
+            return
+        self._last_metrics = time.monotonic()
+        self.metrics_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.metrics_path.with_name(f"{self.metrics_path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"updated": time.time(), "hosts": self.snapshot()}, indent=1), encoding="utf-8")
+        os.replace(tmp, self.metrics_path)
+
+    def _maybe_write_metrics(self):
+        if self.metrics_path is not None and time.monotonic() - self._last_metrics >= self.metrics_interval:
+            try:
+                self.write_metrics()
+            except OSError as e:
+                logging.warning(f"Rate control: could not write metrics: {e}")
+
+_controller = None
+
+def get_rate_controller():
+    """Process-wide controller configured by RATE_* environment variables."""
+    global _controller
+    if _controller is None:
+        _controller = RateController(
+            initial_rate=float(os.getenv("RATE_INITIAL", 1.0)),
+            min_rate=float(os.getenv("RATE_MIN", 0.05)),
+            max_rate=float(os.getenv("RATE_MAX", 5.0)),
+            step=float(os.getenv("RATE_STEP", 0.1)),
+            latency_target=float(os.getenv("RATE_LATENCY_TARGET", 2.0)),
+            max_retries=int(os.getenv("RATE_MAX_RETRIES", 3)),
+            metrics_path=os.getenv("RATE_METRICS_PATH", "logs/rate_control.json"))
+    return _controller
+
+def polite_get(url, **kwargs):
+    return get_rate_controller().get(url, **kwargs)
+
+def polite_head(url, **kwargs):
+    return get_rate_controller().head(url, **kwargs)
@@ -0,0 +1,226 @@
+"""Budget-aware scheduling of collection jobs (one job = one topic or start URL).
+
+With a budget (BUDGET_SECONDS, BUDGET_REQUESTS, BUDGET_MB) the scheduler
+always runs next the source with the best observed yield: new documents per
+unit of the budget that is running out fastest. Each job gets an allowance
+equal to its source's yield-weighted share of what is left, divided over the
+source's remaining topics, and the plan is recomputed after every job. When
+the budget runs out, the current job stops after its current record, or at
+its next HTTP request if it is not yielding records (via the rate controller's
+deadline and request limit), and no further jobs are started. Without a
+budget, jobs run source by source in topic order, as before.
+"""
+import os
+import math
+import time
+import json
+import hashlib
+import logging
+from collections import deque
+
+class Budget:
+    def __init__(self, seconds=None, requests=None, bytes=None):
+        self.limits = {k: v for k, v in (("seconds", seconds), ("requests", requests), ("bytes", bytes)) if v}
+
+    @classmethod
+    def from_env(cls):
+        mb = float(os.getenv("BUDGET_MB", 0) or 0)
+        return cls(seconds=float(os.getenv("BUDGET_SECONDS", 0) or 0) or None,
+                   requests=int(os.getenv("BUDGET_REQUESTS", 0) or 0) or None,
+                   bytes=int(mb * 1024 ** 2) or None)
+
+    def __bool__(self):
+        return bool(self.limits)
+
+    def __str__(self):
+        return ", ".join(f"{k}={v:g}" for k, v in self.limits.items()) or "unlimited"
+
+class _Usage:
+    __slots__ = ("seconds", "requests", "bytes")
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.requests = self.bytes = 0
+
+    def get(self, dim):
+        return getattr(self, dim)
+
+class _SourceStats:
+    def __init__(self, name, topics):
+        self.name = name
+        self.topics = deque(topics)
+        self.used = _Usage()
+        self.jobs = self.records = self.accepted = 0
+
+    def yield_per(self, dim):
+        cost = self.used.get(dim)
+        return self.accepted / cost if cost else None
+
+class Job:
+    def __init__(self, source, topic, allowance):
+        self.source = source
+        self.topic = topic
+        self.allowance = allowance    # {dim: max usage} for this job; empty when unbudgeted
+        self.used = _Usage()
+        self.records = self.accepted = self.record_bytes = 0
+        self.started = time.monotonic()
+        self.counters = (0, 0)
+
+class CollectionScheduler:
+    """Iterate over Job objects; wrap each job's records with track(job, records)
+    and call finish(job) once they are consumed."""
+
+    def __init__(self, topics_by_source, budget=None, counters=None, set_deadline=None,
+                 set_request_limit=None):
+        self.sources = {name: _SourceStats(name, topics) for name, topics in topics_by_source.items()}
+        self.budget = budget or Budget()
+        # Callable returning (requests, bytes) seen by rate control so far
+        self.counters = counters or (lambda: (0, 0))
+        # Callable taking a time.monotonic() deadline (or None) for requests
+        self.set_deadline = set_deadline or (lambda deadline: None)
+        # Callable taking the request total (per counters()) at which requests stop, or None
+        self.set_request_limit = set_request_limit or (lambda limit: None)
+        self.used = _Usage()
+        self.start = time.monotonic()
+        self.stopped = False
+        self._seen = set()
+
+    def remaining(self, dim):
+        return self.budget.limits[dim] - self._current(dim)
+
+    def _current(self, dim):
+        if dim == "seconds":
+            return time.monotonic() - self.start
+        return self.used.get(dim)
+
+    def exhausted(self):
+        return any(self.remaining(dim) <= 0 for dim in self.budget.limits)
+
+    def _binding(self):
+        """The budget dimension with the smallest remaining fraction."""
+        return min(self.budget.limits, key=lambda d: self.remaining(d) / self.budget.limits[d])
+
+    def _scores(self, pending, dim):
+        # Untried sources score like the best tried one until measured
+        known = [y for y in (s.yield_per(dim) for s in pending) if y is not None]
+        default = max(known, default=1.0) or 1.0
+        return {s.name: default if s.yield_per(dim) is None else s.yield_per(dim) for s in pending}
+
+    def _next_job(self):
+        pending = [s for s in self.sources.values() if s.topics]
+        if not pending:
+            return None
+        if not self.budget:
+            stats = pending[0]
+            return Job(stats.name, stats.topics.popleft(), {})
+        if self.exhausted():
+            self.stopped = True
+            return None
+        dim = self._binding()
+        scores = self._scores(pending, dim)
+        # Every source is measured once before yield decides the order
+        stats = max(pending, key=lambda s: (s.yield_per(dim) is None, scores[s.name]))
+        total = sum(scores.values())
+        share = scores[stats.name] / total if total else 1.0 / len(pending)
+        allowance = {d: max(self.remaining(d) * share / len(stats.topics), 0)
+                     for d in self.budget.limits}
+        return Job(stats.name, stats.topics.popleft(), allowance)
+
+    def __iter__(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            job.started, job.counters = time.monotonic(), self.counters()
+            if "seconds" in job.allowance:
+                self.set_deadline(min(job.started + job.allowance["seconds"],
+                                      self.start + self.budget.limits["seconds"]))
+            if "requests" in job.allowance:
+                # At least one request, so a small allowance still lets the job start
+                allowed = min(job.allowance["requests"], self.remaining("requests"))
+                self.set_request_limit(job.counters[0] + max(math.ceil(allowed), 1))
+            yield job
+
+    def _update(self, job):
+        requests, nbytes = self.counters()
+        job.used.seconds = time.monotonic() - job.started
+        job.used.requests = requests - job.counters[0]
+        # Paced client-library calls report no bytes: count the records' size instead
+        job.used.bytes = max(nbytes - job.counters[1], job.record_bytes)
+
+    def _job_over(self, job):
+        self._update(job)
+        for dim, cap in job.allowance.items():
+            if job.used.get(dim) >= cap:
+                return True
+        for dim, limit in self.budget.limits.items():
+            if self._current(dim) + (job.used.get(dim) if dim != "seconds" else 0) >= limit:
+                return True
+        return False
+
+    def _is_new(self, record):
+        content = record.get("content") or ""
+        if not content.strip():
+            return False
+        keys = [("u", record.get("url")), ("t", (record.get("title") or "").strip().lower())]
+        digests = {hashlib.blake2b(f"{kind}:{value}".encode("utf-8"), digest_size=8).digest()
+                   for kind, value in keys if value}
+        new = not (digests & self._seen)
+        self._seen |= digests
+        return new
+
+    def track(self, job, records):
+        """Pass records through, counting yield; stops early once the job's
+        allowance or the run budget is used up."""
+        # Yield scoring and record sizes only matter when there is a budget to plan
+        score, measure = bool(self.budget), "bytes" in self.budget.limits
+        try:
+            for record in records:
+                job.records += 1
+                if measure:
+                    job.record_bytes += len(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+                if score and self._is_new(record):
+                    job.accepted += 1
+                yield record
+                if self.budget and self._job_over(job):
+                    logging.info(f"Scheduler: '{job.topic}' ({job.source}) reached its share of the budget "
+                                 f"after {job.records} records")
+                    return
+        finally:
+            if hasattr(records, "close"):
+                records.close()
+
+    def finish(self, job):
+        self.set_deadline(None)
+        self.set_request_limit(None)
+        self._update(job)
+        stats = self.sources[job.source]
+        stats.jobs += 1
+        stats.records += job.records
+        stats.accepted += job.accepted
+        for dim in _Usage.__slots__:
+            value = job.used.get(dim)
+            setattr(stats.used, dim, stats.used.get(dim) + value)
+            if dim != "seconds":
+                setattr(self.used, dim, self.used.get(dim) + value)
+        if self.budget:
+            left = ", ".join(f"{d} {max(self.remaining(d), 0):.0f}" for d in self.budget.limits)
+            logging.info(f"Scheduler: {job.source} '{job.topic}': {job.accepted}/{job.records} new documents, "
+                         f"{job.used.requests} requests, {job.used.bytes / 1024:.0f} KiB, "
+                         f"{job.used.seconds:.1f}s; left: {left}")
+
+    def log_summary(self):
+        for stats in self.sources.values():
+            if not stats.jobs and not self.budget:
+                continue
+            per_request = stats.yield_per("requests")
+            if not self.budget:
+                logging.info(f"Scheduler: {stats.name}: {stats.jobs} topics, {stats.records} records, "
+                             f"{stats.used.requests} requests, {stats.used.seconds:.0f}s")
+                continue
+            logging.info(f"Scheduler: {stats.name}: {stats.jobs} topics, {stats.accepted}/{stats.records} new documents, "
+                         f"{stats.used.requests} requests, {stats.used.bytes / 1024 ** 2:.1f} MiB, "
+                         f"{stats.used.seconds:.0f}s, yield {per_request or 0:.2f} docs/request, "
+                         f"{len(stats.topics)} topics not run")
+        if self.stopped:
+            logging.info(f"Scheduler: budget ({self.budget}) exhausted, collection stopped")
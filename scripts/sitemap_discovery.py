@@ -0,0 +1,179 @@
+import io
+import os
+import gzip
+import json
+import logging
+import threading
+from scripts.rate_control import polite_get, polite_head
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from urllib.parse import urlparse, urljoin
+from urllib.robotparser import RobotFileParser
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; saves are then merged without a lock
+    fcntl = None
+
+FALLBACK_SITEMAPS = ["/sitemap.xml", "/sitemap_index.xml"]
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+def load_robots(start_url):
+    """Fetch robots.txt for the site of `start_url`; returns a parser (allows all if missing)."""
+    root = f"{urlparse(start_url).scheme}://{urlparse(start_url).netloc}"
+    rp = RobotFileParser(urljoin(root, "/robots.txt"))
+    try:
+        resp = polite_get(rp.url, timeout=10)
+        if resp.status_code == 200:
+            rp.parse(resp.text.splitlines())
+        else:
+            rp.parse([])
+    except Exception as e:
+        logging.warning(f"robots.txt unavailable for {root}: {e}")
+        rp.parse([])
+    return rp
+
+def find_sitemaps(start_url, robots):
+    """Sitemaps declared in robots.txt, else the conventional locations that exist."""
+    declared = robots.site_maps() or []
+    if declared:
+        return list(dict.fromkeys(declared))
+    root = f"{urlparse(start_url).scheme}://{urlparse(start_url).netloc}"
+    found = []
+    for path in FALLBACK_SITEMAPS:
+        url = urljoin(root, path)
+        try:
+            resp = polite_head(url, timeout=10, allow_redirects=True)
+            if resp.status_code == 200:
+                found.append(url)
+                break
+        except Exception:
+            continue
+    return found
+
+def fetch_sitemap(url):
+    resp = polite_get(url, timeout=20)
+    resp.raise_for_status()
+    body = resp.content
+    # Gzipped sitemaps (*.xml.gz) are usually served without Content-Encoding
+    if body[:2] == b"\x1f\x8b":
+        body = gzip.decompress(body)
+    return body
+
+def iter_sitemap_entries(body):
+    """Stream (kind, loc, lastmod) from a urlset or sitemapindex document;
+    kind is "url" or "sitemap"."""
+    for _, elem in ET.iterparse(io.BytesIO(body), events=("end",)):
+        kind = _local(elem.tag)
+        if kind not in ("url", "sitemap"):
+            continue
+        loc = lastmod = None
+        for child in elem:
+            name = _local(child.tag)
+            if name == "loc" and child.text:
+                loc = child.text.strip()
+            elif name == "lastmod" and child.text:
+                lastmod = child.text.strip()
+        elem.clear()
+        if loc:
+            yield kind, loc, lastmod
+
+def discover_urls(start_url, sitemaps, robots, state=None, max_sitemaps=200, accept=None):
+    """Yield (url, lastmod) for same-site URLs under the path of `start_url`
+    that pass `accept` (if given).
+
+    Nested sitemap indexes are followed; child sitemaps whose lastmod is
+    unchanged since the previous run (per `state`) are not re-downloaded.
+    The caller marks each yielded URL in `state` once it was fetched, before
+    asking for the next one; a child sitemap is only marked when all of its
+    URLs were, so a failed page keeps its sitemap on the next run's list.
+    """
+    site = urlparse(start_url)
+    scope = site.path.rsplit("/", 1)[0] + "/"
+    seen = set()
+
+    def walk(sm_url, sm_lastmod):
+        # Returns True when every URL in this sitemap (and its children) is marked
+        if sm_url in seen:
+            return state is not None and not state.is_changed(sm_url, sm_lastmod)
+        if len(seen) >= max_sitemaps:
+            return False
+        seen.add(sm_url)
+        try:
+            body = fetch_sitemap(sm_url)
+        except Exception as e:
+            logging.warning(f"Sitemap fetch failed {sm_url}: {e}")
+            return False
+        complete = state is not None
+        try:
+            for kind, loc, lastmod in iter_sitemap_entries(body):
+                if kind == "sitemap":
+                    if state is None or state.is_changed(loc, lastmod):
+                        complete = (yield from walk(loc, lastmod)) and complete
+                    continue
+                parsed = urlparse(loc)
+                if site.netloc not in parsed.netloc or not parsed.path.startswith(scope):
+                    continue
+                if not robots.can_fetch("*", loc):
+                    continue
+                if accept is not None and not accept(loc):
+                    continue
+                yield loc, lastmod
+                complete = complete and not state.is_changed(loc, lastmod)
+        except ET.ParseError as e:
+            logging.warning(f"Malformed sitemap {sm_url}: {e}")
+            return False
+        if complete and sm_lastmod:
+            state.mark(sm_url, sm_lastmod)
+        return complete
+
+    for sm_url in sitemaps:
+        yield from walk(sm_url, None)
+
+class SitemapState:
+    """Persisted lastmod per URL so refreshes only fetch changed pages.
+
+    Several queue workers may share one state file: save() merges this
+    instance's marks into the file's current contents under a lock, so
+    workers never drop each other's updates.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lastmod = self._read()
+        self.updates = {}
+
+    def _read(self):
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Ignoring unreadable sitemap state {self.path}: {e}")
+            return {}
+
+    def is_changed(self, url, lastmod):
+        return lastmod is None or self.lastmod.get(url) != lastmod
+
+    def mark(self, url, lastmod):
+        # Without a lastmod a change cannot be detected, so the URL is refetched every run
+        if lastmod is not None:
+            self.lastmod[url] = lastmod
+            self.updates[url] = lastmod
+
+    def save(self):
+        if not self.updates:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(self.path.name + ".lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            merged = self._read()
+            merged.update(self.updates)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps(merged), encoding="utf-8")
+            tmp.replace(self.path)
+        self.lastmod = merged
+        self.updates = {}
@@ -0,0 +1,70 @@
+"""Registry of collectors. A collector module is imported only when its
+source is enabled, so a preprocessing-only or single-source run never pays
+for wikipedia/arxiv/fitz/newspaper imports it does not use.
+
+Topic and URL lists live in data/*.txt: one entry per line, blank lines
+and `#` comments (whole-line or after whitespace) ignored.
+"""
+import os
+import logging
+import importlib
+from pathlib import Path
+
+DATA_DIR = Path(os.getenv("TOPICS_DIR", Path(__file__).resolve().parent.parent / "data"))
+
+class Source:
+    """A collector `module.function` called as function(<key_arg>=key, **options)
+    for every entry of its topics file; records go to output/<name>.jsonl."""
+
+    def __init__(self, name, module, function, topics, key_arg="query", label=None, unit="records"):
+        self.name = name
+        self.module = module
+        self.function = function
+        self.topics_file = topics
+        self.key_arg = key_arg
+        self.label = label or name
+        self.unit = unit
+        self._collector = None
+
+    @property
+    def collector(self):
+        if self._collector is None:
+            self._collector = getattr(importlib.import_module(self.module), self.function)
+        return self._collector
+
+    def topics(self):
+        return load_list(self.topics_file)
+
+    def collect(self, key, **options):
+        return self.collector(**{self.key_arg: key}, **options)
+
+SOURCES = {}
+
+def register_source(name, module, function, topics, **kwargs):
+    SOURCES[name] = Source(name, module, function, topics, **kwargs)
+    return SOURCES[name]
+
+register_source("wiki", "scripts.wikipedia_scraper", "get_energy_articles", "wiki_topics.txt",
+                label="Wiki", unit="articles")
+register_source("news", "scripts.news_scraper", "get_energy_news", "news_topics.txt",
+                label="News", unit="articles")
+register_source("arxiv", "scripts.arxiv_scraper", "search_arxiv_papers", "arxiv_topics.txt",
+                label="arXiv", unit="papers")
+register_source("gov", "scripts.gov_scraper", "get_government_documents", "gov_urls.txt",
+                key_arg="start_url", label="Gov", unit="docs")
+
+def load_list(name):
+    path = Path(name) if Path(name).is_absolute() else DATA_DIR / name
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split(" #", 1)[0].split("\t#", 1)[0].strip()
+            if line and not line.startswith("#"):
+                items.append(line)
+    logging.debug(f"Loaded {len(items)} entries from {path}")
+    return items
+
+def country_energy_topics():
+    """Exact Wikipedia titles such as "Wind power in Spain" for every EU member state."""
+    return [topic.format(country) for country in load_list("eu_countries.txt")
+            for topic in load_list("country_topics.txt")]
@@ -0,0 +1,252 @@
+"""Offline Wikipedia source: energy-relevant articles from a local dump.
+
+Reads enwiki-*-pages-articles-multistream.xml.bz2. With its companion
+*-multistream-index.txt.bz2 the dump is split at bz2 stream boundaries (about
+100 pages each) and worker processes decompress and parse streams in parallel;
+without an index it is decompressed sequentially and only the parsing is
+parallel. Pages are scored with wikipedia_scraper._score_page, using the
+[[Category:...]] links as categories, and kept pages are emitted in the same
+record format as the live API source.
+
+    python -m scripts.wiki_dump enwiki-latest-pages-articles-multistream.xml.bz2 \\
+        --index enwiki-latest-pages-articles-multistream-index.txt.bz2 --workers 8
+"""
+import io
+import os
+import re
+import bz2
+import sys
+import html
+import json
+import logging
+import argparse
+from itertools import islice
+from multiprocessing import Pool
+from urllib.parse import quote
+from lxml import etree
+from scripts.wikipedia_scraper import _score_page, _kw_re, _cat_re
+
+STREAMS_PER_TASK = 8
+
+class DumpPage:
+    """The attributes _score_page reads from a wikipedia.WikipediaPage."""
+    __slots__ = ("title", "content", "categories")
+
+    def __init__(self, title, content, categories):
+        self.title = title
+        self.content = content
+        self.categories = categories
+
+    @property
+    def url(self):
+        return "https://en.wikipedia.org/wiki/" + quote(self.title.replace(" ", "_"))
+
+# --- wikitext to plain text ---
+
+_comment_re = re.compile(r"<!--.*?-->", re.S)
+_ref_re = re.compile(r"<ref[^>/]*/>|<ref[^>]*>.*?</ref>", re.S | re.I)
+_drop_tags_re = re.compile(r"<(gallery|math|timeline|score|syntaxhighlight|source|chem)\b[^>]*>.*?</\1>", re.S | re.I)
+_template_re = re.compile(r"\{\{[^{}]*\}\}")
+_table_re = re.compile(r"\{\|[^{}]*?\|\}", re.S)
+_category_re = re.compile(r"\[\[\s*Category\s*:\s*([^|\]]+)[^\]]*\]\]", re.I)
+_file_re = re.compile(r"\[\[\s*(?:File|Image|Media)\s*:[^\[\]]*(?:\[\[[^\]]*\]\][^\[\]]*)*\]\]", re.I)
+_interwiki_re = re.compile(r"\[\[[a-z\-]{2,12}:[^\]]*\]\]")
+_link_re = re.compile(r"\[\[(?:[^|\]]*\|)?([^\]]*)\]\]")
+_ext_link_re = re.compile(r"\[(?:https?:)?//[^\s\]]+\s*([^\]]*)\]")
+_heading_re = re.compile(r"^(=+)\s*(.*?)\s*\1\s*$", re.M)
+_emphasis_re = re.compile(r"'{2,}")
+_tag_re = re.compile(r"</?[a-zA-Z][^>]*>")
+_list_re = re.compile(r"^[*#:;]+\s*", re.M)
+_magic_re = re.compile(r"__[A-Z]+__")
+_blank_re = re.compile(r"\n{3,}")
+
+def wikitext_categories(text):
+    return [c.strip() for c in _category_re.findall(text)]
+
+def wikitext_to_text(text):
+    """Readable plain text from wikitext: templates, tables, references, files
+    and categories are dropped; links and headings keep their visible text."""
+    text = _comment_re.sub("", text)
+    text = _ref_re.sub("", text)
+    text = _drop_tags_re.sub("", text)
+    # Templates and tables nest; strip innermost first until none are left
+    for _ in range(10):
+        stripped = _table_re.sub("", _template_re.sub("", text))
+        if stripped == text:
+            break
+        text = stripped
+    text = _category_re.sub("", text)
+    text = _file_re.sub("", text)
+    text = _interwiki_re.sub("", text)
+    text = _link_re.sub(r"\1", text)
+    text = _ext_link_re.sub(r"\1", text)
+    text = _heading_re.sub(r"\2", text)
+    text = _emphasis_re.sub("", text)
+    text = _tag_re.sub("", text)
+    text = _magic_re.sub("", text)
+    text = _list_re.sub("", text)
+    text = html.unescape(text)
+    lines = [line.strip() for line in text.split("\n")]
+    return _blank_re.sub("\n\n", "\n".join(lines)).strip()
+
+# --- dump parsing ---
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+def _article(page):
+    """(title, wikitext) for an article <page> element (namespace 0, not a redirect), else None."""
+    fields = {_local(child.tag): child for child in page}
+    ns, title, revision = fields.get("ns"), fields.get("title"), fields.get("revision")
+    if ns is None or ns.text != "0" or "redirect" in fields or title is None or revision is None:
+        return None
+    text = next((c.text for c in revision if _local(c.tag) == "text"), None)
+    return (title.text, text) if title.text and text else None
+
+def _iter_articles(source):
+    for _, el in etree.iterparse(source, events=("end",), huge_tree=True, recover=True):
+        if _local(el.tag) != "page":
+            continue
+        article = _article(el)
+        if article is not None:
+            yield article
+        # Free parsed pages as we go
+        el.clear()
+        while el.getprevious() is not None:
+            del el.getparent()[0]
+
+def iter_raw_pages(xml_bytes):
+    """(title, wikitext) of the articles in one decompressed stream, an XML
+    fragment of <page> elements (the first and last streams also carry the
+    <mediawiki> header and footer)."""
+    start = xml_bytes.find(b"<page>")
+    end = xml_bytes.rfind(b"</page>")
+    if start < 0 or end < 0:
+        return
+    yield from _iter_articles(io.BytesIO(b"<pages>" + xml_bytes[start:end + len(b"</page>")] + b"</pages>"))
+
+_worker = {}
+
+def _init_worker(dump_path, threshold, titles):
+    _worker.update(dump_path=dump_path, threshold=threshold, titles=titles)
+
+def score_raw_page(title, wikitext, threshold, titles=None):
+    """Record for a page if it is relevant (or listed in `titles`), else None."""
+    if titles is not None and title not in titles:
+        return None
+    categories = wikitext_categories(wikitext)
+    # Cheap pre-check on raw wikitext before the costly conversion
+    if titles is None and not (_kw_re.search(title) or _kw_re.search(wikitext[:4000])
+                               or any(_cat_re.search(c) for c in categories)):
+        return None
+    page = DumpPage(title, wikitext_to_text(wikitext), categories)
+    score = _score_page(page)
+    if score < threshold:
+        return None
+    return {
+        "title": page.title,
+        "url": page.url,
+        "document_type": "wikipedia",
+        "categories": page.categories,
+        "content": page.content,
+    }
+
+def _process_pages(pages):
+    kept, seen = [], 0
+    for title, wikitext in pages:
+        seen += 1
+        record = score_raw_page(title, wikitext, _worker["threshold"], _worker["titles"])
+        if record is not None:
+            kept.append(record)
+    return seen, kept
+
+def _process_streams(ranges):
+    """Decompress and parse byte ranges of the multistream dump (worker side)."""
+    pages = []
+    with open(_worker["dump_path"], "rb") as f:
+        for start, end in ranges:
+            f.seek(start)
+            data = f.read(end - start)
+            pages.extend(iter_raw_pages(bz2.decompress(data)))
+    return _process_pages(pages)
+
+def read_stream_offsets(index_path):
+    """Sorted distinct stream start offsets from a multistream index (offset:page_id:title)."""
+    offsets = set()
+    opener = bz2.open if str(index_path).endswith(".bz2") else open
+    with opener(index_path, "rt", encoding="utf-8") as f:
+        for line in f:
+            offset = line.split(":", 1)[0]
+            if offset.isdigit():
+                offsets.add(int(offset))
+    return sorted(offsets)
+
+def _stream_tasks(offsets, dump_size):
+    it = iter(zip(offsets, offsets[1:] + [dump_size]))
+    while True:
+        task = list(islice(it, STREAMS_PER_TASK))
+        if not task:
+            return
+        yield task
+
+def _sequential_batches(dump_path, batch_size=500):
+    """Page batches from a sequential decompression (no index available)."""
+    with bz2.open(dump_path, "rb") as f:
+        batch = []
+        for article in _iter_articles(f):
+            batch.append(article)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+def get_dump_articles(dump_path, index_path=None, threshold=1.0, titles=None, workers=None, max_articles=0):
+    """Yield records for energy-relevant articles in a local Wikipedia dump.
+
+    `titles` (optional) restricts the output to exactly these page titles,
+    like the live source's exact mode.
+    """
+    workers = workers or os.cpu_count() or 1
+    titles = set(titles) if titles else None
+    logging.info(f"Wikipedia dump: {dump_path} ({'indexed, parallel streams' if index_path else 'sequential'}, "
+                 f"{workers} workers, threshold {threshold})")
+    seen = kept = 0
+    with Pool(workers, initializer=_init_worker, initargs=(dump_path, threshold, titles)) as pool:
+        if index_path:
+            offsets = read_stream_offsets(index_path)
+            results = pool.imap_unordered(_process_streams, _stream_tasks(offsets, os.path.getsize(dump_path)))
+        else:
+            results = pool.imap_unordered(_process_pages, _sequential_batches(dump_path))
+        for n_pages, records in results:
+            seen += n_pages
+            for record in records:
+                kept += 1
+                yield record
+                if max_articles and kept >= max_articles:
+                    pool.terminate()
+                    logging.info(f"Wikipedia dump: reached {max_articles} articles")
+                    return
+            if seen and seen % 100000 < n_pages:
+                logging.info(f"Wikipedia dump: {seen} articles scanned, {kept} kept")
+    logging.info(f"Wikipedia dump: {seen} articles scanned, {kept} kept")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract energy-relevant articles from a Wikipedia dump.")
+    parser.add_argument("dump")
+    parser.add_argument("--index", default=None)
+    parser.add_argument("--out", default="output/wiki.jsonl")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("WIKI_RELEVANCE_THRESHOLD", 1.0)))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WIKI_DUMP_WORKERS", 0)) or None)
+    parser.add_argument("--max-articles", type=int, default=0)
+    args = parser.parse_args(argv)
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "a", encoding="utf-8") as f:
+        for record in get_dump_articles(args.dump, args.index, args.threshold,
+                                        workers=args.workers, max_articles=args.max_articles):
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    sys.exit(main())
@@ -2,7 +2,10 @@ import logging
 import wikipedia
 import re
 from collections import Counter
-from wikipedia.exceptions import DisambiguationError, PageError 
+from wikipedia.exceptions import DisambiguationError, PageError, HTTPTimeoutError
+from scripts.rate_control import get_rate_controller
+
+WIKI_HOST = "en.wikipedia.org"
 
 # Define keywords and categories for energy relevance scoring
 ENERGY_KEYWORDS = [
@@ -43,25 +46,34 @@ def _score_page(page) -> float:
 
     return score
 
+def _load_page(title):
+    # The library fetches lazily: load everything the scorer and the record
+    # need inside one paced call, so rate control covers Wikipedia too
+    with get_rate_controller().paced(WIKI_HOST, backoff_on=(HTTPTimeoutError,)):
+        page = wikipedia.page(title, auto_suggest=False)
+        page.content, getattr(page, "categories", [])
+    return page
+
 def get_energy_articles(query="energy", max_articles=5, threshold=1.0, exact=False):
     logging.info(f"Wikipedia: searching '{query}' (max {max_articles})")
 
     if exact:
         results = [query]
     else:
-        results = wikipedia.search(query, results=max_articles)
+        with get_rate_controller().paced(WIKI_HOST, backoff_on=(HTTPTimeoutError,)):
+            results = wikipedia.search(query, results=max_articles)
     
-    articles = []
+    kept = 0
     for title in results:
         try:
-            page = wikipedia.page(title, auto_suggest=False)
+            page = _load_page(title)
 
         except DisambiguationError as e: 
             # pick the first disambiguation option (or you could loop over a few)
             choice = e.options[0]
             logging.info(f"Disambiguation for '{title}', trying '{choice}'")
             try:
-                page = wikipedia.page(choice, auto_suggest=False)
+                page = _load_page(choice)
             except Exception as e2:
                 logging.warning(f"Failed to resolve '{choice}' for '{title}': {e2}")
                 continue
@@ -76,17 +88,16 @@ def get_energy_articles(query="energy", max_articles=5, threshold=1.0, exact=Fal
 
         score = _score_page(page)
         if score >= threshold:
-            articles.append({
+            kept += 1
+            logging.info(f"Accepted: '{page.title}' (score: {score:.2f})")
+            yield {
                 "title": page.title,
                 "url": page.url,
                 "document_type": "wikipedia",
                 "categories": getattr(page, "categories", []),
                 "content": page.content
-            })
-            logging.info(f"Accepted: '{page.title}' (score: {score:.2f})")
+            }
         else:
             logging.info(f"Rejected: '{page.title}' (score: {score:.2f})")
 
-    logging.info(f"Total kept for '{query}': {len(articles)}")
-
-    return articles
\ No newline at end of file
+    logging.info(f"Total kept for '{query}': {kept}")
\ No newline at end of file
@@ -0,0 +1,170 @@
+import json
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind          TEXT NOT NULL,
+    key           TEXT NOT NULL,
+    payload       TEXT NOT NULL DEFAULT '{}',
+    status        TEXT NOT NULL DEFAULT 'pending',
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    lease_owner   TEXT,
+    lease_expires REAL,
+    last_error    TEXT,
+    UNIQUE (kind, key)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_expires);
+"""
+
+class LeaseLost(Exception):
+    """Raised by a handler to abandon a job whose lease another worker took over."""
+
+class WorkQueue:
+    """Shared job queue in a SQLite file that several worker processes or
+    containers lease from.
+
+    A job is leased for `lease_seconds`; if the worker neither completes nor
+    renews it in time, the lease expires and another worker picks it up.
+    Jobs that fail or expire `max_attempts` times are marked 'failed'.
+    """
+
+    def __init__(self, path, lease_seconds=600, max_attempts=3):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA busy_timeout=60000")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def enqueue(self, kind, key, payload=None):
+        """Add a job unless one with the same (kind, key) exists; returns True if added."""
+        cur = self.conn.execute(
+            "INSERT OR IGNORE INTO jobs (kind, key, payload) VALUES (?, ?, ?)",
+            (kind, key, json.dumps(payload or {}, ensure_ascii=False)))
+        return cur.rowcount == 1
+
+    def enqueue_many(self, kind, keys):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            added = sum(self.enqueue(kind, key) for key in keys)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def lease(self, worker):
+        """Atomically claim the next pending (or expired) job; None when nothing is available."""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Expired leases that already used every attempt are given up on
+            self.conn.execute(
+                "UPDATE jobs SET status='failed', last_error=COALESCE(last_error, 'lease expired') "
+                "WHERE status='leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts))
+            row = self.conn.execute(
+                "SELECT id, kind, key, payload, attempts FROM jobs "
+                "WHERE status='pending' OR (status='leased' AND lease_expires < ?) "
+                "ORDER BY id LIMIT 1", (now,)).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            job_id, kind, key, payload, attempts = row
+            self.conn.execute(
+                "UPDATE jobs SET status='leased', attempts=attempts+1, lease_owner=?, lease_expires=? "
+                "WHERE id=?", (worker, now + self.lease_seconds, job_id))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return {"id": job_id, "kind": kind, "key": key,
+                "payload": json.loads(payload), "attempt": attempts + 1}
+
+    def renew(self, job_id, worker):
+        """Extend a lease that is still held by `worker`; returns False if it was lost."""
+        cur = self.conn.execute(
+            "UPDATE jobs SET lease_expires=? WHERE id=? AND lease_owner=? AND status='leased'",
+            (time.time() + self.lease_seconds, job_id, worker))
+        return cur.rowcount == 1
+
+    def complete(self, job_id, worker):
+        self.conn.execute(
+            "UPDATE jobs SET status='done', lease_expires=NULL WHERE id=? AND lease_owner=?",
+            (job_id, worker))
+
+    def fail(self, job_id, worker, error):
+        """Release a failed job for retry, or mark it failed once out of attempts."""
+        self.conn.execute(
+            "UPDATE jobs SET status=CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "lease_owner=NULL, lease_expires=NULL, last_error=? WHERE id=? AND lease_owner=?",
+            (self.max_attempts, str(error)[:2000], job_id, worker))
+
+    def counts(self):
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def _heartbeat(self, job, worker, stop, lost):
+        # Runs in its own thread with its own connection: renews the lease every
+        # third of its length, even while the handler is stuck in one slow request
+        conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        try:
+            while not stop.wait(self.lease_seconds / 3):
+                cur = conn.execute(
+                    "UPDATE jobs SET lease_expires=? WHERE id=? AND lease_owner=? AND status='leased'",
+                    (time.time() + self.lease_seconds, job["id"], worker))
+                if cur.rowcount != 1:
+                    logging.warning(f"Worker {worker}: lease lost for {job['kind']} '{job['key']}'")
+                    lost.set()
+                    return
+        except sqlite3.Error as e:
+            # The lease may still expire; the next attempt re-runs the job
+            logging.error(f"Worker {worker}: cannot renew lease for {job['kind']} '{job['key']}': {e}")
+        finally:
+            conn.close()
+
+    def drain(self, worker, handler, poll_seconds=10):
+        """Lease and run jobs until none are pending or leased by anyone.
+
+        A background thread renews the lease while `handler(job, renew)` runs;
+        `renew()` returns False once the lease was lost, and the handler should
+        then stop (raise LeaseLost). Exceptions release the job for retry.
+        """
+        while True:
+            job = self.lease(worker)
+            if job is None:
+                counts = self.counts()
+                if not counts.get("pending") and not counts.get("leased"):
+                    logging.info(f"Queue drained: {counts}")
+                    return
+                # Other workers still hold leases that may expire and need a retry
+                time.sleep(poll_seconds)
+                continue
+
+            logging.info(f"Worker {worker}: {job['kind']} '{job['key']}' (attempt {job['attempt']})")
+            stop, lost = threading.Event(), threading.Event()
+            heartbeat = threading.Thread(target=self._heartbeat, args=(job, worker, stop, lost),
+                                         name=f"lease-{job['id']}", daemon=True)
+            heartbeat.start()
+            try:
+                handler(job, lambda: not lost.is_set())
+            except LeaseLost:
+                # Another worker owns the job now; leave its state alone
+                logging.warning(f"Worker {worker}: abandoned {job['kind']} '{job['key']}'")
+            except Exception as e:
+                logging.error(f"Worker {worker}: {job['kind']} '{job['key']}' failed: {e}")
+                self.fail(job["id"], worker, e)
+            else:
+                self.complete(job["id"], worker)
+            finally:
+                stop.set()
+                heartbeat.join()
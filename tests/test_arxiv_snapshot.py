@@ -0,0 +1,40 @@
+import json
+import scripts.arxiv_snapshot as arxiv_snapshot
+from scripts.arxiv_snapshot import SnapshotIndex
+
+def _line(pid, title, abstract="", pad=0):
+    meta = {"id": pid, "title": title, "abstract": abstract + " " * pad, "categories": "cs.LG",
+            "versions": [{"version": "v1"}], "update_date": "2023-01-01"}
+    return json.dumps(meta) + "\n"
+
+def test_record_starting_on_span_boundary_is_indexed(tmp_path):
+    path = tmp_path / "meta.json"
+    boundary = 1 << 20    # the smallest span size
+    filler = _line("0000.00000", "filler")
+    head = filler * (boundary // len(filler) - 1)
+    # Pad the last filler line so the target line starts exactly at the boundary
+    head += _line("0000.00001", "filler", pad=boundary - len(head) - len(_line("0000.00001", "filler")))
+    assert len(head.encode()) == boundary
+    target = _line("2301.00001", "A smart grid study")
+    path.write_text(head + target + filler * 20000)
+
+    index = SnapshotIndex(path, workers=2)
+    matches = index.search('all:"smart grid"')
+    assert [m["id"] for m in matches] == ["2301.00001"]
+    index.close()
+
+def test_one_pool_serves_every_topic(tmp_path, monkeypatch):
+    path = tmp_path / "meta.json"
+    path.write_text(_line("2301.00001", "A smart grid study") + _line("2301.00002", "Offshore wind forecasting"))
+    created = []
+    real_pool = arxiv_snapshot.Pool
+    monkeypatch.setattr(arxiv_snapshot, "Pool", lambda *a, **kw: created.append(real_pool(*a, **kw)) or created[-1])
+    monkeypatch.setattr(arxiv_snapshot, "_indexes", {})
+
+    found = []
+    for query in ('all:"smart grid"', 'ti:"offshore wind"'):
+        # Without `queries`, every topic brings new words to index
+        found += [r["title"] for r in arxiv_snapshot.search_snapshot_papers(query, str(path), workers=2)]
+    assert found == ["A smart grid study", "Offshore wind forecasting"]
+    assert len(created) == 1
+    arxiv_snapshot.get_snapshot_index(str(path)).close()
@@ -0,0 +1,43 @@
+import json
+import math
+from collections import Counter
+from scripts.bm25_index import update_index, BM25Index, tokenize
+
+DOCS = [("wikipedia", "offshore wind auctions in the north sea"),
+        ("government", "offshore wind auctions and grid connection rules"),
+        ("news", "grid operators report record solar output"),
+        ("government", "wind wind wind energy policy"),
+        ("arxiv", "forecasting solar and wind generation")]
+
+def _brute_force(query, k1=1.2, b=0.75, doc_type=None):
+    tokens = [tokenize(f"Doc {i}\n{text}") for i, (_, text) in enumerate(DOCS)]
+    avgdl = sum(map(len, tokens)) / len(tokens)
+    scores = {}
+    for term in dict.fromkeys(tokenize(query)):
+        df = sum(term in t for t in tokens)
+        idf = math.log(1 + (len(DOCS) - df + 0.5) / (df + 0.5))
+        for i, t in enumerate(tokens):
+            tf = Counter(t)[term]
+            if tf and (doc_type is None or DOCS[i][0] == doc_type):
+                norm = k1 * (1 - b + b * len(t) / avgdl)
+                scores[i] = scores.get(i, 0.0) + idf * (k1 + 1) * tf / (tf + norm)
+    return sorted(round(s, 4) for s in scores.values())[::-1]
+
+def test_search_matches_bm25_across_segments(tmp_path):
+    processed = tmp_path / "processed"
+    processed.mkdir()
+    with (processed / "corpus.jsonl").open("w", encoding="utf-8") as f:
+        for i, (doc_type, text) in enumerate(DOCS):
+            f.write(json.dumps({"title": f"Doc {i}", "url": f"https://example.eu/{i}",
+                                "document_type": doc_type, "content": text}) + "\n")
+    update_index(processed, tmp_path / "index", segment_docs=2)
+    index = BM25Index(tmp_path / "index")
+    assert len(index.segments) == 3
+
+    for query in ["wind", "offshore wind auctions", "solar grid"]:
+        assert [d["score"] for d in index.search(query, k=10)] == _brute_force(query)
+    hits = index.search("wind", k=10, document_type="government")
+    assert {d["document_type"] for d in hits} == {"government"}
+    assert [d["score"] for d in hits] == _brute_force("wind", doc_type="government")
+    assert len(index.search("wind", k=2)) == 2
+    assert index.search("hydrogen") == []
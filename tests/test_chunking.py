@@ -0,0 +1,54 @@
+import json
+import pytest
+import scripts.chunking as chunking
+from scripts.chunking import chunk_corpus
+from scripts.html_extract import html_to_text
+
+def _write(path, records):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+
+def test_chunks_never_exceed_max_tokens(tmp_path):
+    processed = tmp_path / "processed"
+    processed.mkdir()
+    table = ",".join(str(i) for i in range(3000))       # 4096+ chars with no spaces
+    _write(processed / "gov.jsonl", [
+        {"title": "Tariff table", "content": f"Network tariffs for 2024.\n\n{table}\n\nSource: regulator."},
+        {"title": "Symbols", "content": "|" * 5000},
+        {"title": "Prose", "content": "\n\n".join("Wind and solar output rose again this year. " * 40
+                                                 for _ in range(10))},
+    ])
+    for tokenizer, max_tokens in (("regex", 1024), ("regex", 64), ("chars", 300)):
+        manifest = chunk_corpus(processed, tmp_path / f"chunks-{tokenizer}-{max_tokens}", tokenizer=tokenizer,
+                                max_tokens=max_tokens, overlap=16, workers=1)
+        chunks = [json.loads(line) for shard in manifest["shards"]
+                  for line in (tmp_path / f"chunks-{tokenizer}-{max_tokens}" / shard["file"]).open()]
+        assert chunks and all(c["n_tokens"] <= max_tokens for c in chunks)
+        assert {c["title"] for c in chunks} == {"Tariff table", "Symbols", "Prose"}
+
+def test_preprocessed_text_keeps_paragraph_breaks():
+    assert html_to_text("First  paragraph\nwrapped.\n\n\n  Second one.", paragraphs=True) == \
+        "First paragraph wrapped.\n\nSecond one."
+    assert html_to_text("<div><p>One\n line.</p><p>Two.</p></div>", paragraphs=True) == "One line.\n\nTwo."
+    assert html_to_text("<p>One.</p><p>Two.</p>") == "One. Two."
+
+def test_unavailable_tokenizer_fails_fast(tmp_path):
+    processed = tmp_path / "processed"
+    processed.mkdir()
+    _write(processed / "gov.jsonl", [{"title": "Doc", "content": "Some text."}])
+    with pytest.raises(ValueError, match="not available locally"):
+        chunk_corpus(processed, tmp_path / "chunks", tokenizer=str(tmp_path / "missing.json"), workers=2)
+
+class _MergingTokenizer:
+    """Counts words plus one token per paragraph break, like a BPE vocabulary
+    with a dedicated "\\n\\n" token: joined windows cost more than their units."""
+    def count_batch(self, texts):
+        return [len(t.split()) + t.count("\n\n") for t in texts]
+
+def test_n_tokens_counts_the_joined_chunk_text(monkeypatch):
+    tokenizer = _MergingTokenizer()
+    monkeypatch.setattr(chunking, "_worker_tokenizer", tokenizer)
+    content = "\n\n".join(f"Paragraph {i} has five words." for i in range(40))
+    chunks = chunking.chunk_batch(([{"title": "Doc", "content": content}], 32, 4, 128))
+    assert len(chunks) > 1
+    for c in chunks:
+        assert c["n_tokens"] == tokenizer.count_batch([c["text"]])[0] <= 32
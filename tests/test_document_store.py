@@ -0,0 +1,60 @@
+import pytest
+import scripts.preprocessing as preprocessing
+from scripts.document_store import DocumentStore
+from scripts.rate_control import BudgetExhausted
+
+def _record(i, content=None):
+    return {"title": f"Grid report {i}", "url": f"https://example.eu/{i}", "document_type": "government",
+            "content": content or f"Report {i} describes how the transmission grid integrates offshore wind."}
+
+def test_insert_and_lookup(tmp_path):
+    store = DocumentStore(tmp_path / "documents.db", batch_size=2)
+    assert store.insert_many("gov", (_record(i) for i in range(5))) == 5
+    assert store.count("gov") == 5 and store.sources() == ["gov"]
+    assert store.get_by_url("https://example.eu/3")["title"] == "Grid report 3"
+    assert store.has_title("gov", " Grid report 4 ") and not store.has_title("wiki", "Grid report 4")
+    assert store.has_content(_record(0)["content"]) and not store.has_content("other")
+    assert [r["url"] for r in store.iter_records("gov", after_id=3)] == ["https://example.eu/3", "https://example.eu/4"]
+    store.close()
+
+def test_insert_upserts_on_url(tmp_path):
+    store = DocumentStore(tmp_path / "documents.db")
+    store.insert_many("gov", [_record(1)])
+    store.insert_many("gov", [_record(1, content="Revised report.")])
+    assert store.count("gov") == 1
+    assert store.get_by_url("https://example.eu/1")["content"] == "Revised report."
+    store.close()
+
+def test_records_yielded_before_the_budget_ran_out_are_stored(tmp_path):
+    # Collectors stop mid-batch with BudgetExhausted; what they already
+    # yielded is kept, as the JSONL writer would have written it
+    def collector():
+        yield from (_record(i) for i in range(3))
+        raise BudgetExhausted("deadline")
+
+    store = DocumentStore(tmp_path / "documents.db", batch_size=500)
+    with pytest.raises(BudgetExhausted):
+        store.insert_many("gov", collector())
+    assert store.count("gov") == 3
+    store.close()
+
+def test_failed_preprocessing_keeps_the_previous_processed_records(tmp_path, monkeypatch):
+    store = DocumentStore(tmp_path / "documents.db", batch_size=2)
+    store.insert_many("gov", (_record(i) for i in range(5)))
+    store.insert_many("processed/gov", [_record(100), _record(101)])
+
+    def crashing(records, name, **kwargs):
+        for i, r in enumerate(records):
+            if i == 3:
+                raise RuntimeError("worker died")
+            yield r
+    monkeypatch.setattr(preprocessing, "preprocess_records", crashing)
+    with pytest.raises(RuntimeError):
+        preprocessing.preprocess_store(store, "gov")
+    assert sorted(r["url"] for r in store.iter_records("processed/gov")) == \
+        ["https://example.eu/100", "https://example.eu/101"]
+
+    monkeypatch.setattr(preprocessing, "preprocess_records", lambda records, name, **kwargs: records)
+    preprocessing.preprocess_store(store, "gov")
+    assert store.count("processed/gov") == 5
+    store.close()
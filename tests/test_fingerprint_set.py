@@ -0,0 +1,58 @@
+import pytest
+from scripts.fingerprint_set import FingerprintSet, BloomFilter, PythonSet, make_seen_set
+
+def test_exact_set_membership_across_growth():
+    seen = FingerprintSet(capacity=16)
+    size = seen.nbytes
+    assert all(seen.add(f"Grid report {i}") for i in range(1000))
+    assert seen.nbytes > size and len(seen) == 1000
+    assert not seen.add("Grid report 7")
+    assert "Grid report 999" in seen and "Grid report 1000" not in seen
+    assert seen.add(b"Grid report 1000") and "Grid report 1000" in seen   # str and bytes keys agree
+
+def test_exact_set_persists_and_reloads(tmp_path):
+    path = tmp_path / "titles.exact"
+    seen = FingerprintSet(capacity=16, path=path)
+    for i in range(500):                   # grows the file several times
+        seen.add(f"Grid report {i}")
+    seen.close()
+    assert not path.with_name("titles.exact.tmp").exists()
+
+    reopened = FingerprintSet(capacity=16, path=path)
+    assert len(reopened) == 500
+    assert "Grid report 0" in reopened and not reopened.add("Grid report 499")
+    assert reopened.add("Grid report 500")
+    reopened.close()
+
+def test_bloom_filter_has_no_false_negatives_and_persists(tmp_path):
+    path = tmp_path / "titles.bloom"
+    bloom = BloomFilter(capacity=1000, fp_rate=1e-4, path=path)
+    assert all(bloom.add(f"Grid report {i}") for i in range(1000))
+    bloom.close()
+    reopened = BloomFilter(capacity=1000, fp_rate=1e-4, path=path)
+    assert len(reopened) == 1000
+    assert all(f"Grid report {i}" in reopened for i in range(1000))
+    reopened.close()
+    with pytest.raises(ValueError):
+        FingerprintSet(path=path)
+
+def test_bloom_false_positive_rate_stays_under_the_bound():
+    fp_rate, capacity = 1e-2, 10_000
+    bloom = BloomFilter(capacity=capacity, fp_rate=fp_rate)
+    for i in range(capacity):
+        bloom.add(f"Grid report {i}")
+    assert bloom.false_positive_rate() <= fp_rate
+    probes = 100_000
+    hits = sum(f"Other title {i}" in bloom for i in range(probes))
+    # Filled to capacity the expected rate is fp_rate; allow for sampling noise
+    assert hits / probes <= 1.25 * fp_rate
+
+def test_make_seen_set_modes(monkeypatch):
+    assert isinstance(make_seen_set("exact"), FingerprintSet)
+    assert isinstance(make_seen_set("set"), PythonSet)
+    monkeypatch.setenv("DEDUP_MODE", "bloom")
+    monkeypatch.setenv("DEDUP_FP_RATE", "1e-3")
+    bloom = make_seen_set(capacity=100)
+    assert isinstance(bloom, BloomFilter) and bloom.k == 8
+    with pytest.raises(ValueError):
+        make_seen_set("fuzzy")
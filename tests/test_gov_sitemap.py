@@ -0,0 +1,75 @@
+import scripts.gov_scraper as gov
+from scripts.sitemap_discovery import SitemapState
+
+SITE = "https://energy.example.eu/en/"
+PAGES = {
+    SITE + "ok": ("2024-05-01", "Grid connection rules for new wind farms."),
+    SITE + "broken": ("2024-05-01", ""),
+    SITE + "undated": (None, "Page without a lastmod."),
+}
+
+def _run(monkeypatch, tmp_path, pdf_ok):
+    monkeypatch.setattr(gov, "load_robots", lambda url: None)
+    monkeypatch.setattr(gov, "find_sitemaps", lambda url, robots: [SITE + "sitemap.xml"])
+    entries = [(url, lastmod) for url, (lastmod, _) in PAGES.items()] + [(SITE + "report_en.pdf", "2024-04-01")]
+    monkeypatch.setattr(gov, "discover_urls",
+                        lambda start, sitemaps, robots, state, accept=None: iter([e for e in entries if state.is_changed(*e)]))
+    monkeypatch.setattr(gov, "extract_page_content", lambda url: (PAGES[url][1], [], url))
+    monkeypatch.setattr(gov, "get_pdf_document",
+                        lambda title, url: {"title": title, "url": url, "content": "pdf"} if pdf_ok else None)
+    path = tmp_path / "sitemap_state.json"
+    records = list(gov.get_government_documents(SITE, discovery="sitemap", sitemap_state_path=path))
+    return [r["url"] for r in records], SitemapState(path).lastmod
+
+def test_only_successful_dated_fetches_are_marked(monkeypatch, tmp_path):
+    urls, marked = _run(monkeypatch, tmp_path, pdf_ok=False)
+    assert sorted(urls) == [SITE + "ok", SITE + "undated"]
+    assert marked == {SITE + "ok": "2024-05-01"}
+
+    # Failed and undated URLs are fetched again on the next run
+    urls, marked = _run(monkeypatch, tmp_path, pdf_ok=True)
+    assert sorted(urls) == [SITE + "report_en.pdf", SITE + "undated"]
+    assert marked == {SITE + "ok": "2024-05-01", SITE + "report_en.pdf": "2024-04-01"}
+
+def _urlset(tag, entries):
+    items = "".join(f"<{tag}><loc>{loc}</loc><lastmod>{lastmod}</lastmod></{tag}>" for loc, lastmod in entries)
+    root = "sitemapindex" if tag == "sitemap" else "urlset"
+    return f'<{root} xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{items}</{root}>'.encode()
+
+def test_child_sitemap_with_failed_page_is_revisited(monkeypatch, tmp_path):
+    import scripts.sitemap_discovery as sd
+    from urllib.robotparser import RobotFileParser
+    robots = RobotFileParser()
+    robots.parse([])
+    sitemaps = {
+        SITE + "sitemap.xml": _urlset("sitemap", [(SITE + "child.xml", "2024-01-01")]),
+        SITE + "child.xml": _urlset("url", [(SITE + "ok", "2024-05-01"), (SITE + "broken", "2024-05-01"),
+                                            (SITE + "page_fr", "2024-05-01")]),
+    }
+    pages = {SITE + "ok": "Grid connection rules.", SITE + "broken": ""}
+    fetches = []
+    monkeypatch.setattr(gov, "load_robots", lambda url: robots)
+    monkeypatch.setattr(gov, "find_sitemaps", lambda url, robots: [SITE + "sitemap.xml"])
+    monkeypatch.setattr(sd, "fetch_sitemap", lambda url: fetches.append(url) or sitemaps[url])
+    monkeypatch.setattr(gov, "extract_page_content", lambda url: fetches.append(url) or (pages[url], [], url))
+    path = tmp_path / "sitemap_state.json"
+
+    def run():
+        fetches.clear()
+        records = list(gov.get_government_documents(SITE, discovery="sitemap", sitemap_state_path=path))
+        return [r["url"] for r in records], list(fetches), SitemapState(path).lastmod
+
+    urls, fetched, marked = run()
+    assert urls == [SITE + "ok"]
+    assert marked == {SITE + "ok": "2024-05-01"}
+
+    # The child stays unmarked, so the failed page is retried and the good one skipped
+    pages[SITE + "broken"] = "Recovered page."
+    urls, fetched, marked = run()
+    assert urls == [SITE + "broken"]
+    assert fetched == [SITE + "sitemap.xml", SITE + "child.xml", SITE + "broken"]
+    assert marked[SITE + "child.xml"] == "2024-01-01"
+
+    # Everything in the child is done, so it is no longer downloaded
+    urls, fetched, _ = run()
+    assert urls == [] and fetched == [SITE + "sitemap.xml"]
@@ -0,0 +1,38 @@
+from scripts.html_extract import extract_html, html_to_text
+from scripts.gov_scraper import parse_page
+
+ASPNET_PAGE = """<!DOCTYPE html><html><head><title>Electricity market | GME</title></head>
+<body><form method="post" action="./default.aspx" id="aspnetForm">
+<input type="hidden" name="__VIEWSTATE" value="abc" />
+<div id="s4-workspace"><nav class="top-nav"><a href="/en/">Home</a></nav>
+<div class="page-content"><h1>Day-ahead electricity market</h1>
+<p>The day-ahead market hosts most of the electricity trading in Italy.</p>
+<p>Bids are submitted by producers, wholesalers and final customers.</p></div>
+<button type="submit">Search</button></div></form></body></html>"""
+
+PAGE_HEADER_PAGE = """<html><body><header class="site-header"><a href="/en/">Ministry</a></header>
+<main><article><header class="page-header"><h1>National energy and climate plan</h1></header>
+<p>The plan sets targets for renewables and energy efficiency until 2030.</p></article></main>
+<div class="shareholder-info"><p>Shareholder structure of the transmission operator.</p></div>
+<div class="social-share"><a href="https://x.com/share">Share</a></div>
+<footer><p>Contact us</p></footer></body></html>"""
+
+def test_form_wrapped_page_keeps_body():
+    text, _, title, _ = parse_page("https://www.mercatoelettrico.org/en/", ASPNET_PAGE)
+    assert title == "Electricity market | GME"
+    assert "Day-ahead electricity market" in text
+    assert "most of the electricity trading in Italy" in text
+    assert "Home" not in text and "Search" not in text
+    assert "Bids are submitted" in html_to_text(ASPNET_PAGE)
+
+def test_page_header_and_class_tokens():
+    page = extract_html(PAGE_HEADER_PAGE)
+    assert page["blocks"][0] == "National energy and climate plan"
+    assert "Shareholder structure of the transmission operator." in page["blocks"]
+    text = html_to_text(PAGE_HEADER_PAGE)
+    assert "Ministry" not in text
+    assert "Share" not in text.replace("Shareholder", "")
+    assert "Contact us" not in text
+
+def test_header_outside_main_is_chrome():
+    assert html_to_text("<body><header><p>Site title</p></header><p>Body text</p></body>") == "Body text"
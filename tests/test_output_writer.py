@@ -0,0 +1,64 @@
+import json
+import threading
+from scripts.output_writer import OutputWriter
+
+def test_unserializable_record_is_skipped(tmp_path):
+    writer = OutputWriter(tmp_path / "gov.jsonl", flush_interval=0.05)
+    assert writer.write({"title": "first"})
+    assert not writer.write({"title": "bad", "content": object()})
+    assert writer.write({"title": "after"})
+    writer.close()
+    lines = [json.loads(line)["title"] for line in (tmp_path / "gov.jsonl").open(encoding="utf-8")]
+    assert lines == ["first", "after"]
+    assert writer.skipped == 1
+
+def test_queue_is_bounded_by_bytes(tmp_path):
+    writer = OutputWriter(tmp_path / "arxiv.jsonl", queue_bytes=64 * 1024, flush_interval=0.05)
+    release = threading.Event()
+    original = writer._file.write
+    peak = [0]
+
+    def slow_write(data):
+        release.wait()
+        peak[0] = max(peak[0], writer._pending)
+        return original(data)
+
+    writer._file.write = slow_write
+    big = "x" * 40 * 1024
+    done = threading.Event()
+
+    def produce():
+        for i in range(20):
+            writer.write({"title": str(i), "content": big})
+        done.set()
+
+    threading.Thread(target=produce, daemon=True).start()
+    # The writer is stalled, so the producer must block once ~64 KiB are queued
+    assert not done.wait(0.3)
+    assert writer._pending <= 64 * 1024 + len(big) + 100
+    release.set()
+    assert done.wait(5)
+    writer.close()
+    assert sum(1 for _ in (tmp_path / "arxiv.jsonl").open(encoding="utf-8")) == 20
+
+def test_rotation_ignores_worker_shards(tmp_path):
+    (tmp_path / "gov.00007.jsonl").write_text("")
+    (tmp_path / "gov.w1.rot00004.jsonl").write_text("")
+    writer = OutputWriter(tmp_path / "gov.jsonl", flush_interval=0.05, rotate_bytes=100)
+    for i in range(2):
+        writer.write({"title": str(i), "content": "x" * 200})
+        writer.sync()
+    writer.close()
+    assert sorted(p.name for p in tmp_path.glob("gov.rot*.jsonl")) == ["gov.rot00001.jsonl", "gov.rot00002.jsonl"]
+
+def test_pending_counts_encoded_bytes(tmp_path):
+    writer = OutputWriter(tmp_path / "wiki.jsonl", flush_interval=0.05)
+    release = threading.Event()
+    original = writer._file.write
+    writer._file.write = lambda data: release.wait() and original(data)
+    line = json.dumps({"title": "€" * 100}, ensure_ascii=False) + "\n"
+    writer.write({"title": "€" * 100})
+    assert writer._pending == len(line.encode("utf-8"))
+    release.set()
+    writer.close()
+    assert writer._pending == 0
@@ -0,0 +1,30 @@
+import hashlib
+import scripts.pdf_cache as pdf_cache
+from scripts.pdf_cache import PdfTextCache
+
+def test_hit_after_miss_hashes_pdf_once_per_call(tmp_path, monkeypatch):
+    cache = PdfTextCache(tmp_path / "cache")
+    calls = []
+    real_sha256 = hashlib.sha256
+
+    def counting_sha256(data=b""):
+        calls.append(len(data))
+        return real_sha256(data)
+
+    monkeypatch.setattr(pdf_cache.hashlib, "sha256", counting_sha256)
+    pdf = b"%PDF-1.7 " + b"x" * 100_000
+    assert cache.get_or_extract(pdf, "test-v1", lambda b: "text") == "text"
+    assert cache.get_or_extract(pdf, "test-v1", lambda b: "other") == "text"
+    assert sum(1 for n in calls if n == len(pdf)) == 2
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_write_errors_do_not_lose_the_text(tmp_path, monkeypatch):
+    cache = PdfTextCache(tmp_path / "cache")
+
+    def disk_full(self, data):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(pdf_cache.Path, "write_bytes", disk_full)
+    assert cache.get_or_extract(b"%PDF-1.7 report", "test-v1", lambda b: "extracted") == "extracted"
+    assert cache.total_bytes == 0
+    assert not list((tmp_path / "cache").glob("*/*"))
@@ -0,0 +1,57 @@
+import json
+import pytest
+import scripts.preprocessing as preprocessing
+from scripts.preprocessing import preprocess_jsonl_file
+
+def _record(i):
+    return {"title": f"Grid report {i}", "url": f"https://example.eu/{i}",
+            "content": f"Report {i} describes how the transmission grid integrates offshore wind "
+                       f"and solar generation across neighbouring member states."}
+
+def _append(path, records):
+    with path.open("a", encoding="utf-8") as f:
+        for r in records:
+            f.write(json.dumps(r) + "\n")
+
+def _titles(path):
+    return [json.loads(line)["title"] for line in path.open(encoding="utf-8")]
+
+def test_full_rebuild_invalidates_previous_state(tmp_path, monkeypatch):
+    raw, out = tmp_path / "gov.jsonl", tmp_path / "processed" / "gov.jsonl"
+    out.parent.mkdir()
+    _append(raw, [_record(i) for i in range(5)])
+    preprocess_jsonl_file(raw, out)
+    state_file = out.parent / ".state" / "gov.json"
+    assert state_file.exists()
+
+    # A new shard sorts before the old file, so a rebuild reorders the output
+    _append(tmp_path / "gov.a.jsonl", [_record(i) for i in range(100, 110)])
+    inputs = [tmp_path / "gov.a.jsonl", raw]
+    monkeypatch.setenv("DEDUP_MODE", "set")
+    preprocess_jsonl_file(inputs, out)
+    assert not state_file.exists()
+
+    monkeypatch.setenv("DEDUP_MODE", "exact")
+    preprocess_jsonl_file(inputs, out)
+    titles = _titles(out)
+    assert sorted(titles) == sorted(r["title"] for r in [_record(i) for i in range(5)] +
+                                    [_record(i) for i in range(100, 110)])
+    assert len(titles) == len(set(titles))
+
+def test_missing_inputs_are_skipped_and_failures_leave_no_temp_file(tmp_path, monkeypatch):
+    raw, out = tmp_path / "gov.jsonl", tmp_path / "processed" / "gov.jsonl"
+    out.parent.mkdir()
+    preprocess_jsonl_file(raw, out)
+    assert not out.exists()
+
+    _append(raw, [_record(i) for i in range(3)])
+    preprocess_jsonl_file([tmp_path / "gov.w1.jsonl", raw], out, mode="full")
+    assert len(_titles(out)) == 3
+
+    def crash(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(preprocessing.json, "dump", crash)
+    with pytest.raises(OSError):
+        preprocess_jsonl_file(raw, out, mode="full")
+    assert not out.with_name("gov.jsonl.tmp").exists()
+    assert len(_titles(out)) == 3
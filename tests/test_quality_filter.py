@@ -0,0 +1,58 @@
+import pytest
+from scripts.quality_filter import QualityFilter, CORRUPTION_RULES, text_stats
+
+PROSE = "Offshore wind auctions in the North Sea set new records for grid connection capacity this year."
+
+def _rule(text, **kwargs):
+    return QualityFilter(rules="all", **kwargs).failed_rule(text)
+
+def test_ascii_whitespace_and_accents_are_printable():
+    text = "Page 1\x0c\x0bRéseau de transport d'électricité, 12 € per MWh.\tMüller\r\n"
+    assert text_stats(text)["printable_ratio"] == 1.0
+    assert QualityFilter().failed_rule(text) is None
+
+def test_printable_threshold():
+    assert _rule("\x01" * 30 + "a" * 70) is None            # exactly 0.7 printable
+    assert _rule("\x01" * 31 + "a" * 69) == "printable"
+    assert _rule("\u0085" * 31 + "a" * 69) == "printable"    # C1 controls count too
+
+def test_replacement_threshold():
+    assert QualityFilter().failed_rule("�" * 5 + "a" * 95) is None
+    assert QualityFilter().failed_rule("�" * 6 + "a" * 94) == "replacement"
+
+def test_empty_and_min_chars():
+    assert QualityFilter().failed_rule("") == "empty"
+    assert QualityFilter(min_chars=200).failed_rule(PROSE) == "empty"
+
+def test_symbol_and_digit_thresholds():
+    assert _rule("#" * 25 + "a" * 75) is None
+    assert _rule("#" * 26 + "a" * 74) == "symbols"
+    assert _rule("1" * 50 + "a" * 50) is None
+    assert _rule("1" * 51 + "a" * 49) == "digits"
+
+def test_word_length_bounds_need_enough_words():
+    assert _rule(" ".join(["a"] * 19)) is None                   # below min_words_for_word_rules
+    assert _rule(" ".join(["a"] * 20)) == "word_length"          # average 1.0 < 2.0
+    assert _rule(" ".join(["ab"] * 20)) is None
+    assert _rule(" ".join(["x" * 15] * 20)) is None
+    assert _rule(" ".join(["x" * 16] * 20)) == "word_length"
+
+def test_repeated_lines_need_enough_lines():
+    assert _rule("\n".join(["Menu"] * 9)) is None                # below min_lines_for_line_rules
+    # 6 of 10 lines repeat an earlier one: ratio 0.6 > 0.5; 5 of 10 is allowed
+    assert _rule("\n".join(["Menu"] * 7 + [f"Line {i}" for i in range(3)])) == "repeated_lines"
+    assert _rule("\n".join(["Menu"] * 6 + [f"Line {i}" for i in range(4)])) is None
+
+def test_content_rules_are_opt_in(monkeypatch):
+    spam = "\n".join(["#### 1234 ####"] * 20)
+    assert QualityFilter().failed_rule(spam) is None
+    monkeypatch.setenv("QUALITY_RULES", "repeated_lines")
+    qf = QualityFilter.from_env()
+    assert qf.check(spam) == "repeated_lines" and qf.drops == {"repeated_lines": 1}
+    assert qf.failed_rule(spam, CORRUPTION_RULES) is None
+    monkeypatch.setenv("QUALITY_RULES", "all")
+    assert QualityFilter.from_env().failed_rule(spam) == "symbols"
+    monkeypatch.setenv("QUALITY_MAX_SYMBOL_RATIO", "0.9")
+    assert QualityFilter.from_env().failed_rule(spam) == "repeated_lines"
+    with pytest.raises(ValueError):
+        QualityFilter(rules=["shouting"])
@@ -0,0 +1,78 @@
+import json
+import time
+import multiprocessing
+import pytest
+from main import _renewing
+from scripts.work_queue import WorkQueue, LeaseLost
+from scripts.sitemap_discovery import SitemapState
+
+def test_job_stops_when_its_lease_is_lost(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.db", lease_seconds=60)
+    queue.enqueue("gov", "https://energy.example.eu/en/")
+    job = queue.lease("w1")
+
+    def records():
+        for i in range(10):
+            if i == 3:
+                # The lease expired and another worker took the job over
+                queue.conn.execute("UPDATE jobs SET lease_owner='w2' WHERE id=?", (job["id"],))
+            yield {"title": f"page {i}"}
+
+    written = []
+    with pytest.raises(LeaseLost):
+        for record in _renewing(records(), lambda: queue.renew(job["id"], "w1")):
+            written.append(record)
+    assert [r["title"] for r in written] == ["page 0", "page 1", "page 2"]
+    queue.close()
+
+def _save_marks(path, worker):
+    state = SitemapState(path)
+    for i in range(200):
+        state.mark(f"https://site{worker}.example.eu/{i}", "2024-01-01")
+        if i % 20 == 19:
+            state.save()
+
+def test_concurrent_sitemap_state_saves_are_merged(tmp_path):
+    path = tmp_path / "sitemap_state.json"
+    workers = [multiprocessing.Process(target=_save_marks, args=(path, w)) for w in range(4)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+    assert all(p.exitcode == 0 for p in workers)
+    assert len(json.loads(path.read_text())) == 800
+    assert not list(tmp_path.glob("*.tmp"))
+
+def test_lease_is_renewed_during_a_slow_request(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.db", lease_seconds=0.6)
+    queue.enqueue("gov", "https://energy.example.eu/en/")
+    other = WorkQueue(tmp_path / "queue.db", lease_seconds=0.6)
+    stolen = []
+
+    def handle(job, renew):
+        # One request that outlives the lease: no record is yielded meanwhile
+        time.sleep(1.5)
+        stolen.append(other.lease("w2"))
+        assert renew()
+
+    queue.drain("w1", handle, poll_seconds=0.1)
+    assert stolen == [None]
+    assert queue.counts() == {"done": 1}
+    queue.close()
+    other.close()
+
+def test_renew_reports_a_lease_taken_over(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.db", lease_seconds=0.3)
+    queue.enqueue("gov", "https://energy.example.eu/en/")
+    seen = []
+
+    def handle(job, renew):
+        queue.conn.execute("UPDATE jobs SET lease_owner='w2' WHERE id=?", (job["id"],))
+        time.sleep(0.3)
+        seen.append(renew())
+        queue.conn.execute("UPDATE jobs SET status='done' WHERE id=?", (job["id"],))
+        raise LeaseLost()
+
+    queue.drain("w1", handle, poll_seconds=0.1)
+    assert seen == [False]
+    queue.close()
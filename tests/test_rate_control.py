@@ -0,0 +1,83 @@
+import time
+import pytest
+import requests
+import scripts.rate_control as rate_control_module
+from email.utils import formatdate
+from scripts.rate_control import RateController, BudgetExhausted, parse_retry_after
+
+HOST = "energy.example.eu"
+
+class _Response:
+    def __init__(self, status, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+        self.content = b"ok"
+
+def test_additive_increase_and_multiplicative_decrease():
+    rc = RateController(initial_rate=1.0, max_rate=1.25, step=0.1, latency_target=2.0)
+    rc.release(HOST, latency=0.1)
+    assert rc.hosts[HOST].rate == pytest.approx(1.1)
+    rc.release(HOST, latency=0.1)
+    rc.release(HOST, latency=0.1)
+    assert rc.hosts[HOST].rate == pytest.approx(1.25)      # capped at max_rate
+    rc.release(HOST, latency=5.0)
+    assert rc.hosts[HOST].rate == pytest.approx(1.0)       # slow: x0.8
+    rc.release(HOST, latency=0.1, status=429)
+    assert rc.hosts[HOST].rate == pytest.approx(0.5)       # throttled: halved
+    rc.release(HOST, error=True)
+    assert rc.hosts[HOST].rate == pytest.approx(0.25)
+    assert (rc.hosts[HOST].throttled, rc.hosts[HOST].errors) == (1, 1)
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after(formatdate(1_000_030, usegmt=True), now=1_000_000) == pytest.approx(30)
+    assert parse_retry_after(formatdate(999_000, usegmt=True), now=1_000_000) == 0.0
+    assert parse_retry_after("soon") is None and parse_retry_after(None) is None
+
+def test_throttled_request_waits_for_retry_after(monkeypatch):
+    responses = [_Response(429, {"Retry-After": "1"}), _Response(200)]
+    monkeypatch.setattr(rate_control_module.requests, "request", lambda method, url, **kw: responses.pop(0))
+    rc = RateController(initial_rate=100, max_rate=100)
+    start = time.monotonic()
+    resp = rc.get(f"https://{HOST}/en/")
+    assert resp.status_code == 200 and not responses
+    assert time.monotonic() - start >= 1.0
+    assert rc.hosts[HOST].requests == 2 and rc.hosts[HOST].throttled == 1
+
+def test_failed_requests_are_always_released(monkeypatch):
+    def fail(method, url, **kw):
+        raise ValueError("bad header")
+    monkeypatch.setattr(rate_control_module.requests, "request", fail)
+    rc = RateController(initial_rate=100, max_rate=100)
+    with pytest.raises(ValueError):
+        rc.get(f"https://{HOST}/en/")
+    assert rc.hosts[HOST].errors == 0 and rc.hosts[HOST].latency is not None
+
+def test_paced_library_calls_back_off_on_errors():
+    class HTTPError(Exception):
+        def __init__(self, status):
+            self.status = status
+
+    rc = RateController(initial_rate=100, max_rate=200, step=0.1)
+    with rc.paced(HOST):
+        pass
+    assert rc.hosts[HOST].rate == pytest.approx(100.1)
+    with pytest.raises(HTTPError), rc.paced(HOST, backoff_on=(HTTPError,)):
+        raise HTTPError(503)
+    assert rc.hosts[HOST].throttled == 1
+    with pytest.raises(requests.ConnectionError), rc.paced(HOST):
+        raise requests.ConnectionError()
+    assert rc.hosts[HOST].errors == 1
+    # Application errors (e.g. a missing page) are not the server pushing back
+    rate = rc.hosts[HOST].rate
+    with pytest.raises(KeyError), rc.paced(HOST):
+        raise KeyError("no such page")
+    assert rc.hosts[HOST].rate > rate
+
+def test_request_limit_stops_requests():
+    rc = RateController(initial_rate=1000, max_rate=1000)
+    rc.set_request_limit(2)
+    for _ in range(2):
+        rc.acquire(HOST)
+    with pytest.raises(BudgetExhausted):
+        rc.acquire(HOST)
@@ -0,0 +1,55 @@
+import time
+import pytest
+import scripts.scheduler as scheduler_module
+from scripts.scheduler import Budget, CollectionScheduler
+from scripts.rate_control import RateController, BudgetExhausted
+
+def test_unbudgeted_run_does_not_serialize_records(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("records serialized without a budget")
+    monkeypatch.setattr(scheduler_module.json, "dumps", fail)
+    scheduler = CollectionScheduler({"gov": ["https://energy.example.eu/en/"]})
+    for job in scheduler:
+        records = list(scheduler.track(job, ({"title": str(i), "content": "x"} for i in range(100))))
+        scheduler.finish(job)
+    assert len(records) == 100 and scheduler.sources["gov"].records == 100
+
+def test_job_yielding_nothing_stops_at_the_deadline():
+    rate_control = RateController(initial_rate=1000, max_rate=1000)
+    scheduler = CollectionScheduler({"gov": ["https://energy.example.eu/en/"]}, Budget(seconds=0.3),
+                                    set_deadline=rate_control.set_deadline)
+
+    def filtered_crawl():
+        # Fetches pages forever without any of them passing the filters
+        while True:
+            rate_control.acquire("energy.example.eu")
+            rate_control.release("energy.example.eu", latency=0.0)
+        yield
+
+    start = time.monotonic()
+    for job in scheduler:
+        with pytest.raises(BudgetExhausted):
+            list(scheduler.track(job, filtered_crawl()))
+        scheduler.finish(job)
+    assert time.monotonic() - start < 1.0
+    assert rate_control.deadline is None
+
+def test_job_yielding_nothing_stops_at_the_request_budget():
+    rate_control = RateController(initial_rate=1000, max_rate=1000)
+    scheduler = CollectionScheduler(
+        {"gov": ["https://energy.example.eu/en/", "https://grid.example.eu/en/"]}, Budget(requests=10),
+        counters=lambda: (rate_control.total_requests, rate_control.total_bytes),
+        set_request_limit=rate_control.set_request_limit)
+
+    def filtered_crawl():
+        while True:
+            rate_control.acquire("energy.example.eu")
+            rate_control.release("energy.example.eu", latency=0.0)
+        yield
+
+    for job in scheduler:
+        with pytest.raises(BudgetExhausted):
+            list(scheduler.track(job, filtered_crawl()))
+        scheduler.finish(job)
+    assert rate_control.total_requests == 10
+    assert rate_control.request_limit is None
@@ -0,0 +1,44 @@
+import re
+import logging
+import pytest
+import main
+from scripts.sources import SOURCES, load_list, country_energy_topics
+
+LISTS = ["wiki_topics.txt", "news_topics.txt", "arxiv_topics.txt", "gov_urls.txt",
+         "eu_countries.txt", "country_topics.txt"]
+
+@pytest.mark.parametrize("name", LISTS)
+def test_topic_lists_have_no_fused_entries(name):
+    items = load_list(name)
+    assert items
+    for item in items:
+        # Leftovers of the old Python lists: two quoted entries joined by a comma
+        # or run together ("Smart grid" "Energy storage"), or an unpaired quote.
+        # arXiv queries quote phrases themselves (all:"energy storage").
+        assert not re.search(r'"\s*,?\s*"', item) and item.count('"') % 2 == 0, item
+        assert not item.endswith(","), item
+        if name == "gov_urls.txt":
+            assert item.startswith("http") and item.count("http") == 1, item
+
+def test_topic_counts():
+    assert len(load_list("arxiv_topics.txt")) == 85
+    assert len(country_energy_topics()) == len(load_list("eu_countries.txt")) * len(load_list("country_topics.txt"))
+    assert all(source.topics() for source in SOURCES.values())
+
+def _run_main(tmp_path, monkeypatch, caplog, news):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "logs").mkdir(exist_ok=True)
+    monkeypatch.delenv("NEWS_API_KEY", raising=False)
+    for name in SOURCES:
+        monkeypatch.setenv(f"RUN_{name.upper()}", "1" if news and name == "news" else "0")
+    monkeypatch.setenv("RUN_PREPROCESSING", "0")
+    with caplog.at_level(logging.INFO):
+        main.main()
+    return caplog.text
+
+def test_news_api_key_is_required_only_for_news(tmp_path, monkeypatch, caplog):
+    log = _run_main(tmp_path, monkeypatch, caplog, news=False)
+    assert "Missing NEWS_API_KEY" not in log and "Collection complete" in log
+    caplog.clear()
+    log = _run_main(tmp_path, monkeypatch, caplog, news=True)
+    assert "Missing NEWS_API_KEY" in log and "Collection complete" not in log
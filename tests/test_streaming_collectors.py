@@ -0,0 +1,48 @@
+import json
+import tracemalloc
+import scripts.gov_scraper as gov_scraper
+from main import append_records
+from scripts.output_writer import get_writer, close_writers
+
+def test_append_records_streams_a_generator(tmp_path, monkeypatch):
+    monkeypatch.setenv("OUTPUT_QUEUE_MB", "1")
+    monkeypatch.setenv("OUTPUT_FSYNC", "0")
+    path = tmp_path / "gov.jsonl"
+    seen_on_disk = []
+
+    def records():
+        for i in range(200):
+            if i == 1:
+                get_writer(path).sync()
+                seen_on_disk.append(sum(1 for _ in path.open(encoding="utf-8")))
+            yield {"title": str(i), "content": f"{i} " + "x" * 100_000}
+
+    tracemalloc.start()
+    try:
+        count = append_records(path, records())
+        close_writers()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert count == 200
+    # The first record was written before the collector produced the second
+    assert seen_on_disk == [1]
+    # 200 records are about 20 MB; only the bounded queue is held at once
+    assert peak < 5 * 1024 ** 2
+    assert [json.loads(line)["title"] for line in path.open(encoding="utf-8")] == [str(i) for i in range(200)]
+
+def test_crawl_site_fetches_pages_on_demand(monkeypatch):
+    fetched = []
+
+    def fake_fetch(url, base_domain=None):
+        fetched.append(url)
+        n = len(fetched)
+        return f"page {n}", [], f"Page {n}", [(f"https://energy.example.eu/en/{n}", "energy")]
+
+    monkeypatch.setattr(gov_scraper, "fetch_page", fake_fetch)
+    pages = gov_scraper.crawl_site("https://energy.example.eu/en/", max_pages=50, max_depth=50)
+    url, page = next(pages)
+    assert fetched == ["https://energy.example.eu/en/"]
+    assert page["text"] == "page 1"
+    next(pages)
+    assert len(fetched) == 2
@@ -0,0 +1,63 @@
+import bz2
+from xml.sax.saxutils import escape
+import scripts.wiki_dump as wiki_dump
+from scripts.wiki_dump import get_dump_articles, read_stream_offsets, wikitext_to_text
+
+HEADER = b'<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/"><siteinfo><sitename>Wikipedia</sitename></siteinfo>\n'
+FOOTER = b"</mediawiki>\n"
+ENERGY = ("'''{title}''' is covered by the [[European Union]] energy transition.{{{{Infobox|a=1}}}}<ref>Source</ref>\n"
+          "== Grid ==\nRenewable electricity from wind and solar power feeds the grid.\n"
+          "[[Category:Wind power]]\n[[Category:Renewable energy]]")
+
+def _page(page_id, title, text, ns=0, redirect=False):
+    return (f"<page><title>{title}</title><ns>{ns}</ns><id>{page_id}</id>"
+            + ('<redirect title="Elsewhere" />' if redirect else "")
+            + f"<revision><id>1</id><text xml:space=\"preserve\">{escape(text)}</text></revision></page>\n").encode()
+
+STREAMS = [
+    [(1, "Wind power in Spain", ENERGY, {}), (2, "Football", "A sport played with a ball.", {})],
+    [(3, "Solar power in Italy", ENERGY, {}), (4, "Talk:Solar power in Italy", ENERGY, {"ns": 1})],
+    [(5, "Energy in Malta", ENERGY, {}), (6, "Wind energy in Spain", ENERGY, {"redirect": True})],
+]
+
+def _write_dump(tmp_path):
+    dump, index = tmp_path / "dump-multistream.xml.bz2", tmp_path / "dump-multistream-index.txt.bz2"
+    data, lines = bz2.compress(HEADER), []
+    offsets = []
+    for stream in STREAMS:
+        offsets.append(len(data))
+        lines += [f"{len(data)}:{page_id}:{title}" for page_id, title, _, _ in stream]
+        pages = b"".join(_page(page_id, title, text.format(title=title), **kw) for page_id, title, text, kw in stream)
+        data += bz2.compress(pages + (FOOTER if stream is STREAMS[-1] else b""))
+    dump.write_bytes(data)
+    index.write_bytes(bz2.compress("\n".join(lines).encode() + b"\n"))
+    return dump, index, offsets
+
+def test_index_offsets_and_seeking_one_stream(tmp_path):
+    dump, index, offsets = _write_dump(tmp_path)
+    assert read_stream_offsets(index) == offsets
+    wiki_dump._init_worker(str(dump), 1.0, None)
+    # Only the second stream is decompressed: its article, not its talk page
+    seen, kept = wiki_dump._process_streams([(offsets[1], offsets[2])])
+    assert seen == 1 and [r["title"] for r in kept] == ["Solar power in Italy"]
+
+def test_indexed_and_sequential_reads_agree(tmp_path):
+    dump, index, _ = _write_dump(tmp_path)
+    indexed = list(get_dump_articles(str(dump), str(index), threshold=1.0, workers=2))
+    sequential = list(get_dump_articles(str(dump), None, threshold=1.0, workers=1))
+    assert sorted(r["title"] for r in indexed) == sorted(r["title"] for r in sequential) == \
+        ["Energy in Malta", "Solar power in Italy", "Wind power in Spain"]
+    record = next(r for r in indexed if r["title"] == "Wind power in Spain")
+    assert record["url"] == "https://en.wikipedia.org/wiki/Wind_power_in_Spain"
+    assert record["categories"] == ["Wind power", "Renewable energy"]
+    assert record["content"].startswith("Wind power in Spain is covered by the European Union energy transition.")
+    assert "Infobox" not in record["content"] and "Source" not in record["content"]
+
+    only = list(get_dump_articles(str(dump), str(index), threshold=99, titles=["Football"], workers=1))
+    assert only == []
+    exact = list(get_dump_articles(str(dump), str(index), threshold=0, titles=["Football"], workers=1))
+    assert [r["title"] for r in exact] == ["Football"]
+
+def test_wikitext_to_text():
+    assert wikitext_to_text("== History ==\n'''[[Wind farm|Wind farms]]''' grew.<!-- x -->\n* [[File:a.png|thumb|A [[b]]]]One") == \
+        "History\nWind farms grew.\nOne"